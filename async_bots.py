@@ -0,0 +1,125 @@
+"""
+Async bot protocol: a bot may define `async def send_messages(self, book)` and await whatever it waits
+on (a local model server, another process) instead of blocking.
+
+An AsyncBotScheduler runs those coroutines on its own event loop with a per-bot deadline. A bot that
+misses its deadline has its coroutine cancelled and sends nothing that tick. gather() collects a whole
+tick's decisions concurrently, so one slow bot no longer holds up the others, and merges the messages in
+the order the bots were given, never in the order they finished:
+
+    scheduler = AsyncBotScheduler(deadline_ms=50, deadlines={"ModelBot": 200})
+    decisions = scheduler.gather(bots, book)   # decisions.messages, .by_bot, .missed, .latency_ms
+
+Each bot must have its order ids set (set_idx) before the gather, since orders are created concurrently.
+
+run_game supports async players directly (the engine instantiates only the player from our code, and
+calls it once per tick): runner.run_game(MyAsyncAlgo, ..., async_deadline_ms=50).
+
+With a deadline, whether a bot makes it in time depends on the machine, so for a fully reproducible run
+leave deadlines off (every bot is waited for) and only read the misses as a diagnostic.
+"""
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
+from typing import Dict, List
+
+
+def is_async_bot(bot) -> bool:
+    """True if bot (an instance or class) implements send_messages as a coroutine function"""
+    return inspect.iscoroutinefunction(getattr(bot, "send_messages", None))
+
+
+def _name(bot):
+    return getattr(bot, "name", type(bot).__name__)
+
+
+class TickDecisions:
+    """
+    One tick gathered by AsyncBotScheduler.gather. messages are every bot's messages, merged in bot
+    order; by_bot maps each bot's name to its list ([] if it missed its deadline).
+    """
+    def __init__(self, messages, by_bot, missed, latency_ms):
+        self.messages = messages
+        self.by_bot = by_bot
+        self.missed = missed
+        self.latency_ms = latency_ms
+
+
+class AsyncBotScheduler:
+    """
+    Runs bots' send_messages on an event loop with deadlines.
+
+    deadline_ms: default time a bot gets per tick (None waits for it however long it takes)
+    deadlines: per-bot overrides, by bot name
+    A synchronous bot can't be interrupted: it runs to the end, and its messages are dropped if it went
+    over its deadline.
+
+    call() and gather() are synchronous. Called from inside a running event loop (a notebook, an async
+    driver), where run_until_complete isn't allowed, they run the scheduler's loop on a dedicated thread
+    and block the caller until the tick is decided.
+    """
+    def __init__(self, deadline_ms: float = None, deadlines: Dict[str, float] = None):
+        self.deadline_ms = deadline_ms
+        self.deadlines = dict(deadlines or {})
+        self.missed: Dict[str, int] = {}  # bot name -> deadlines missed so far
+        self.loop = asyncio.new_event_loop()
+        self._thread = None  # runs self.loop when the caller's thread already has a running loop
+
+    def _run(self, coroutine):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.loop.run_until_complete(coroutine)
+        if self._thread is None:
+            self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncBotScheduler")
+        return self._thread.submit(self.loop.run_until_complete, coroutine).result()
+
+    def deadline_for(self, bot):
+        return self.deadlines.get(_name(bot), self.deadline_ms)
+
+    async def _decide(self, bot, book, send=None):
+        """(messages or None if the deadline was missed, latency in ms)"""
+        send = send or type(bot).send_messages
+        deadline_ms = self.deadline_for(bot)
+        start = perf_counter_ns()
+        result = send(bot, book)
+        if inspect.isawaitable(result):
+            try:
+                result = await (asyncio.wait_for(result, deadline_ms / 1e3) if deadline_ms is not None else result)
+            except asyncio.TimeoutError:
+                result = None
+        latency_ms = (perf_counter_ns() - start) / 1e6
+        if result is not None and deadline_ms is not None and latency_ms > deadline_ms:
+            result = None  # a synchronous bot that overran
+        if result is None:
+            self.missed[_name(bot)] = self.missed.get(_name(bot), 0) + 1
+        return result, latency_ms
+
+    def call(self, bot, book, send=None) -> List:
+        """One bot's messages for this tick ([] if it missed its deadline)"""
+        messages, _ = self._run(self._decide(bot, book, send))
+        return messages if messages is not None else []
+
+    def gather(self, bots, book) -> TickDecisions:
+        """Every bot's decision for one tick, run concurrently and merged in the order of bots"""
+        async def run_all():
+            return await asyncio.gather(*(self._decide(bot, book) for bot in bots))
+
+        results = self._run(run_all())
+        messages, by_bot, missed, latency_ms = [], {}, [], {}
+        for bot, (bot_messages, latency) in zip(bots, results):
+            name = _name(bot)
+            latency_ms[name] = latency
+            if bot_messages is None:
+                missed.append(name)
+                bot_messages = []
+            by_bot[name] = list(bot_messages)
+            messages.extend(bot_messages)
+        return TickDecisions(messages, by_bot, missed, latency_ms)
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.shutdown()
+            self._thread = None
+        self.loop.close()
@@ -0,0 +1,162 @@
+"""
+Scaling benchmark: how whole-run cost grows with num_timestamps.
+
+Each size is run headless through runner.run_game in a fresh (spawned, not forked) process, so its peak
+RSS is its own: not left over from a bigger run before it, nor inherited from the caller's memory. Every run records wall time, ticks/sec, peak RSS and the
+average depth of each product's book (price levels and resting orders per side, sampled from what the
+player is shown). A power law y = a * n^b is then fitted to wall time and peak RSS: b > 1 means cost
+grows faster than linearly, and fit.predict(n) extrapolates to longer horizons.
+
+    from benchmark import scaling_benchmark, format_scaling
+    table, fits = scaling_benchmark(PlayerAlgorithm, products)          # 1k, 5k, 20k, 100k timestamps
+    print(format_scaling(table, fits))
+    fits["wall_time_s"].predict(500000)
+"""
+import multiprocessing
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+SCALING_SIZES = (1000, 5000, 20000, 100000)
+DEPTH_SAMPLES = 1000  # book depth is sampled on about this many ticks per run
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (NaN where the platform can't tell)"""
+    try:
+        # Linux: the high-water mark of this process's own address space. ru_maxrss is kept across fork and
+        # exec, so in a freshly spawned process it would still report the parent's peak
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3  # kB
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1e6
+        except (ImportError, AttributeError):
+            return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KB elsewhere
+
+
+def _side_depth(orders):
+    """(price levels, resting orders) on one side of a book"""
+    return len({order.price for order in orders}), len(orders)
+
+
+def _run_size(bot_class, num_timestamps, products, seed, engine_kwargs):
+    """One headless run in this (fresh) process: timings, peak RSS and average book depth per ticker"""
+    from runner import EngineHooks, run_game
+
+    every = max(1, num_timestamps // DEPTH_SAMPLES)
+    depth = {}  # ticker -> [levels, orders] summed over samples (both sides)
+    state = {"tick": 0, "samples": 0}
+
+    def send_messages(original, bot, book, *args, **kwargs):
+        if isinstance(bot, bot_class):
+            if state["tick"] % every == 0:
+                for ticker, sides in book.items():
+                    totals = depth.setdefault(ticker, [0, 0])
+                    for side in ("Bids", "Asks"):
+                        levels, orders = _side_depth(sides[side])
+                        totals[0] += levels
+                        totals[1] += orders
+                state["samples"] += 1
+            state["tick"] += 1
+        return original(bot, book, *args, **kwargs)
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    hooks = EngineHooks()
+    try:
+        hooks.patch_bot_methods([bot_class], "send_messages", send_messages)
+        start = perf_counter()
+        run_game(bot_class, num_timestamps, products, print_profile=False, **engine_kwargs)
+        wall = perf_counter() - start
+    finally:
+        hooks.restore()
+
+    samples = max(state["samples"], 1)
+    row = {"num_timestamps": num_timestamps, "wall_time_s": wall, "ticks_per_s": num_timestamps / wall,
+           "peak_rss_mb": peak_rss_mb()}
+    for ticker, (levels, orders) in depth.items():
+        row[f"levels[{ticker}]"] = levels / samples / 2  # per side
+        row[f"orders[{ticker}]"] = orders / samples / 2
+    return row
+
+
+class PowerLawFit:
+    """y = coefficient * n^exponent, fitted by least squares on log-log"""
+    def __init__(self, n, y):
+        n, y = np.asarray(n, dtype=float), np.asarray(y, dtype=float)
+        keep = (n > 0) & (y > 0) & np.isfinite(y)
+        if keep.sum() < 2:
+            self.exponent = self.coefficient = self.r_squared = float("nan")
+            return
+        log_n, log_y = np.log(n[keep]), np.log(y[keep])
+        self.exponent, intercept = np.polyfit(log_n, log_y, 1)
+        self.coefficient = float(np.exp(intercept))
+        residual = log_y - (intercept + self.exponent * log_n)
+        spread = ((log_y - log_y.mean()) ** 2).sum()
+        self.r_squared = float(1 - (residual ** 2).sum() / spread) if spread > 0 else 1.0
+        self.exponent = float(self.exponent)
+
+    def predict(self, n):
+        return self.coefficient * np.asarray(n, dtype=float) ** self.exponent
+
+    def __repr__(self):
+        return f"{self.coefficient:.3g} * n^{self.exponent:.3f} (r2 {self.r_squared:.3f})"
+
+
+def scaling_benchmark(bot_class, products, sizes=SCALING_SIZES, seed=0, isolate=True, verbose=True,
+                      initializer=None, **engine_kwargs):
+    """
+    Runs bot_class at every size in sizes and fits how wall time and peak RSS grow with num_timestamps.
+
+    seed: python's and numpy's global RNGs are seeded with it before every run (None leaves them alone)
+    isolate: run each size in a freshly spawned process (needed for a per-size peak RSS; a forked one
+             would start with this process's peak). bot_class must be importable. With isolate=False
+             everything runs in this process and peak_rss_mb is the high-water mark so far
+    initializer: called with no arguments in each fresh process before its run (e.g. to point runner at
+                 another engine); must be importable
+    engine_kwargs: passed to runner.run_game (visualiser, progress_bar and print_limits default to off)
+
+    Returns (table, fits): a DataFrame with one row per size, and a PowerLawFit for wall_time_s and
+    peak_rss_mb.
+    """
+    import pandas as pd
+
+    engine_kwargs = {"visualiser": False, "progress_bar": False, "print_limits": False, **engine_kwargs}
+    rows = []
+    for num_timestamps in sorted(sizes):
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=initializer) as pool:
+                row = pool.submit(_run_size, bot_class, num_timestamps, products, seed, engine_kwargs).result()
+        else:
+            row = _run_size(bot_class, num_timestamps, products, seed, engine_kwargs)
+        rows.append(row)
+        if verbose:
+            print(f"{num_timestamps} timestamps: {row['wall_time_s']:.1f}s, {row['ticks_per_s']:.0f} ticks/s, "
+                  f"peak RSS {row['peak_rss_mb']:.0f} MB")
+
+    table = pd.DataFrame(rows)
+    fits = {column: PowerLawFit(table["num_timestamps"], table[column]) for column in ("wall_time_s", "peak_rss_mb")}
+    return table, fits
+
+
+def format_scaling(table, fits) -> str:
+    """The benchmark table followed by the fitted growth curves"""
+    lines = [table.to_string(index=False, float_format=lambda x: f"{x:.2f}"), "Growth with num_timestamps:"]
+    for column, fit in fits.items():
+        lines.append(f"  {column:<14}{fit!r}")
+    return "\n".join(lines)
@@ -0,0 +1,142 @@
+"""
+Downsampled chart series for the visualiser.
+
+Long runs have one point per timestamp per product, which is far more than a chart can show and makes
+Plotly sluggish. At export time we build a few coarser versions of every series the charts plot
+(mid prices, positions and PnL) and write them to log_chart_series.json. The page draws the coarsest
+level first and switches to finer levels / the raw data as you zoom in.
+
+Mid prices and PnL use LTTB (largest triangle three buckets), which keeps the visual shape of a line.
+Positions use min/max buckets so position-limit breaches are never smoothed away.
+"""
+import json
+import os
+
+import numpy as np
+
+LEVELS = (1000, 5000)  # points per series at each resolution, coarsest first
+SERIES_FILE = 'log_chart_series.json'
+
+
+def lttb(x, y, n_out):
+    """Largest triangle three buckets: n_out points of (x, y) that keep its visual shape"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    # first and last points are always kept, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # the next bucket's average is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+    return x[keep], y[keep]
+
+
+def minmax_buckets(x, y, n_out):
+    """Keeps the min and max of every bucket (in time order), so n_out // 2 buckets give n_out points"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return x, y
+
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    starts = edges[:-1]
+    lengths = np.diff(edges)
+    # position of the min/max inside each bucket, found with reduceat on the bucket starts
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    bucket_of = np.repeat(np.arange(buckets), lengths)
+    is_min = y == mins[bucket_of]
+    is_max = y == maxs[bucket_of]
+    idx = np.arange(n)
+    first_min = np.full(buckets, n)
+    first_max = np.full(buckets, n)
+    np.minimum.at(first_min, bucket_of[is_min], idx[is_min])
+    np.minimum.at(first_max, bucket_of[is_max], idx[is_max])
+
+    keep = np.unique(np.concatenate([first_min, first_max]))
+    return x[keep], y[keep]
+
+
+def _numeric(frame, col):
+    """Column as floats, with blanks as 0 (parseFloat(value || 0) in the visualiser)"""
+    import pandas as pd
+    return pd.to_numeric(frame[col], errors='coerce').fillna(0.0).to_numpy()
+
+
+def _player_pnl(frame, player_name, product):
+    """Same per-product PnL as calculatePnL in the visualiser (zero if the product was never traded)"""
+    position = _numeric(frame, f'{player_name}_{product}')
+    if not (position != 0).any():
+        return np.zeros(len(frame))
+    cash = _numeric(frame, f'{player_name}_Cash') if f'{player_name}_Cash' in frame else 0.0
+    return cash + position * _numeric(frame, product)
+
+
+def chart_series(frame, player_name):
+    """Full-resolution series (name -> (x, y)) from the game record DataFrame"""
+    import pandas as pd
+    timestamps = _numeric(frame, 'Loop')
+    products = [col[len(player_name) + 1:] for col in frame.columns
+                if col.startswith(f'{player_name}_') and col[len(player_name) + 1:] in frame.columns]
+
+    series = {}
+    total_pnl = np.zeros(len(frame))
+    for product in products:
+        mids = pd.to_numeric(frame[product], errors='coerce').to_numpy()
+        present = ~np.isnan(mids)  # plotMidPrices skips blank mids
+        series[f'mid:{product}'] = (timestamps[present], mids[present])
+        series[f'position:{product}'] = (timestamps, _numeric(frame, f'{player_name}_{product}'))
+        pnl = _player_pnl(frame, player_name, product)
+        series[f'pnl:{product}'] = (timestamps, pnl)
+        total_pnl += pnl
+    series['pnl:ALL'] = (timestamps, total_pnl)
+    return series
+
+
+def downsample_series(series, levels=LEVELS):
+    """{'levels': [{'points': n, 'series': {name: {'x': [...], 'y': [...]}}}, ...]} for levels coarser than the data"""
+    length = max((len(x) for x, _ in series.values()), default=0)
+    out = {'full_length': length, 'levels': []}
+    for points in levels:
+        if points * 2 > length:
+            break  # not worth it, the page just uses the raw data
+        level = {}
+        for name, (x, y) in series.items():
+            method = minmax_buckets if name.startswith('position:') else lttb
+            dx, dy = method(x, y, points)
+            level[name] = {'x': dx.astype(int).tolist(), 'y': np.round(dy, 4).tolist()}
+        out['levels'].append({'points': points, 'series': level})
+    return out
+
+
+def export_chart_series(directory, player_name, levels=LEVELS, frame=None):
+    """
+    Writes log_chart_series.json to directory from the game record: frame (a DataFrame of the record's
+    columns, as the exporter has them in memory) or else the log_game_record.csv in directory
+    """
+    import pandas as pd
+    if not player_name:
+        return
+    if frame is None:
+        record_path = os.path.join(directory, 'log_game_record.csv')
+        if not os.path.exists(record_path):
+            return
+        # round_trip: the same floats the exporter had in memory, so both sources pick the same points
+        frame = pd.read_csv(record_path, keep_default_na=False, low_memory=False, float_precision='round_trip')
+    with open(os.path.join(directory, SERIES_FILE), 'w') as f:
+        json.dump(downsample_series(chart_series(frame, player_name), levels), f, separators=(',', ':'))
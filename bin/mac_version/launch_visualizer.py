@@ -44,18 +44,19 @@ def launch_visualizer():
         else:
             # Unix-like systems
             try:
-                subprocess.run(['pkill', '-f', 'python.*http.server.*8000'],
+                subprocess.run(['pkill', '-f', 'python.*(http.server|data_server.py).*8000'],
                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 time.sleep(0.5)
             except:
                 pass
 
-        # Start a simple HTTP server in the background
+        # Start the visualizer data server in the background (static files plus indexed orderbook slices)
         print("\nStarting local server for visualizer...")
+        server_script = os.path.join(current_dir, 'visualizer', 'data_server.py')
         if platform.system() == 'Windows':
             # Windows: use python directly
             server_process = subprocess.Popen(
-                ['python', '-m', 'http.server', '8000'],
+                ['python', server_script, '8000'],
                 cwd=current_dir,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
@@ -64,7 +65,7 @@ def launch_visualizer():
         else:
             # Unix-like systems
             server_process = subprocess.Popen(
-                ['python3', '-m', 'http.server', '8000'],
+                ['python3', server_script, '8000'],
                 cwd=current_dir,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
@@ -0,0 +1,145 @@
+"""
+Binary orderbook log with random access by (timestamp, ticker).
+
+log_orderbook.bin holds one fixed-width record per resting order (same rows as log_orderbook_data.csv).
+log_orderbook_index.npy holds one entry per (timestamp, ticker) with the record offset and count, sorted,
+so finding a book is a searchsorted on the index and reading it only touches those records. The data file
+is opened as a read-only np.memmap, so several processes reading the same log share it via the page cache.
+"""
+import json
+import os
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<i4'),
+    ('ticker', 'u1'),      # index into meta["tickers"]
+    ('side', 'i1'),        # 1 = bid, -1 = ask
+    ('is_player', '?'),
+    ('price', '<f8'),
+    ('size', '<i4'),
+])
+INDEX_DTYPE = np.dtype([
+    ('timestamp', '<i4'),
+    ('ticker', 'u1'),
+    ('start', '<i8'),
+    ('bid_count', '<i4'),
+    ('ask_count', '<i4'),
+])
+
+DATA_FILE = 'log_orderbook.bin'
+INDEX_FILE = 'log_orderbook_index.npy'
+META_FILE = 'log_orderbook_meta.json'
+
+
+class BookLogWriter:
+    """
+    Appends book snapshots to the binary log. Records are written as they come, the index and metadata
+    on close(). Bids and asks are stored best price first, in the exchange's book order.
+    """
+    def __init__(self, directory, player_name=None):
+        self.directory = directory
+        self.player_name = player_name
+        self.tickers = {}
+        self.index = []
+        self.offset = 0
+        self.file = open(os.path.join(directory, DATA_FILE), 'wb', buffering=1 << 20)
+
+    def _ticker_id(self, ticker):
+        if ticker not in self.tickers:
+            self.tickers[ticker] = len(self.tickers)
+        return self.tickers[ticker]
+
+    def append(self, timestamp, book_state):
+        for ticker, book in book_state.items():
+            bids, asks = book['Bids'], book['Asks']
+            records = np.empty(len(bids) + len(asks), dtype=RECORD_DTYPE)
+            records['timestamp'] = timestamp
+            records['ticker'] = self._ticker_id(ticker)
+            records['side'][:len(bids)] = 1
+            records['side'][len(bids):] = -1
+            orders = list(bids) + list(asks)
+            records['price'] = [order.price for order in orders]
+            records['size'] = [order.size for order in orders]
+            records['is_player'] = [order.bot_name == self.player_name for order in orders]
+
+            self.file.write(records.tobytes())
+            self.index.append((timestamp, self.tickers[ticker], self.offset, len(bids), len(asks)))
+            self.offset += len(records)
+
+    def close(self):
+        self.file.close()
+        index = np.array(self.index, dtype=INDEX_DTYPE)
+        index.sort(order=['timestamp', 'ticker'])
+        np.save(os.path.join(self.directory, INDEX_FILE), index)
+        with open(os.path.join(self.directory, META_FILE), 'w') as f:
+            json.dump({'tickers': sorted(self.tickers, key=self.tickers.get), 'player_name': self.player_name,
+                       'records': self.offset}, f)
+
+
+class BookLogReader:
+    """
+    Read-only access to a binary book log.
+
+        log = BookLogReader('visualizer')
+        bids, asks = log.book(1500, 'QFIN')   # structured arrays, best price first
+        bids['price'], bids['size'], bids['is_player']
+    """
+    def __init__(self, directory=None):
+        directory = directory or os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.tickers = meta['tickers']
+        self.player_name = meta['player_name']
+        self.ticker_ids = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        self.index = np.load(os.path.join(directory, INDEX_FILE))
+        # (timestamp, ticker) packed into one sorted int64 key for searchsorted
+        self._keys = self.index['timestamp'].astype(np.int64) * 256 + self.index['ticker']
+        if meta['records']:
+            self.records = np.memmap(os.path.join(directory, DATA_FILE), dtype=RECORD_DTYPE, mode='r')
+        else:
+            self.records = np.empty(0, dtype=RECORD_DTYPE)  # np.memmap can't map an empty file
+
+    @property
+    def timestamps(self):
+        return np.unique(self.index['timestamp'])
+
+    def _entry(self, timestamp, ticker):
+        key = int(timestamp) * 256 + self.ticker_ids[ticker]
+        pos = np.searchsorted(self._keys, key)
+        if pos == len(self._keys) or self._keys[pos] != key:
+            return None
+        return self.index[pos]
+
+    def book(self, timestamp, ticker):
+        """(bids, asks) for one ticker at one timestamp. Empty arrays if there was no snapshot"""
+        entry = self._entry(timestamp, ticker)
+        if entry is None:
+            empty = self.records[:0]
+            return empty, empty
+        start, bid_count, ask_count = int(entry['start']), int(entry['bid_count']), int(entry['ask_count'])
+        return (self.records[start:start + bid_count],
+                self.records[start + bid_count:start + bid_count + ask_count])
+
+    def top_of_book(self, timestamp, ticker):
+        """(best bid, best ask) prices, None for an empty side"""
+        bids, asks = self.book(timestamp, ticker)
+        return (float(bids['price'][0]) if len(bids) else None,
+                float(asks['price'][0]) if len(asks) else None)
+
+    def range(self, start_timestamp, end_timestamp, ticker=None):
+        """All records with start_timestamp <= timestamp < end_timestamp, optionally for one ticker"""
+        lo = np.searchsorted(self.index['timestamp'], start_timestamp, side='left')
+        hi = np.searchsorted(self.index['timestamp'], end_timestamp, side='left')
+        entries = self.index[lo:hi]
+        if ticker is None:
+            if not len(entries):
+                return self.records[:0]
+            first = int(entries['start'].min())
+            last = int((entries['start'] + entries['bid_count'] + entries['ask_count']).max())
+            # snapshots are written in timestamp order, so this is one contiguous block
+            return self.records[first:last]
+        entries = entries[entries['ticker'] == self.ticker_ids[ticker]]
+        parts = [self.records[int(e['start']):int(e['start'] + e['bid_count'] + e['ask_count'])] for e in entries]
+        return np.concatenate(parts) if parts else self.records[:0]
@@ -1,99 +1,676 @@
 import csv
+import io
+import json
+import numbers
+import queue
+import threading
 import webbrowser
 import subprocess
 import os
 import time
 
 
-def export_game_data(game):
-    """Export game data to CSV files for visualization with player anonymization"""
+def _find_player_name(game):
+    """The player is the only bot with player_view_data"""
+    for bot in game.bots.values():
+        if hasattr(bot, 'player_view_data'):
+            return bot.name
+    return None
+
+
+def _player_record_columns(record, player_name):
+    """Columns of game.record that go into log_game_record.csv: the player's own columns plus market prices"""
+    all_columns = list(record.keys())
+
+    # Start with timestamp and loop
+    player_columns = ['timestamp', 'Loop']
+
+    # Add player-specific columns and market prices
+    # Extract product names from player columns (e.g., PlayerAlgorithm_UEC -> UEC)
+    product_names = set()
+    for col in all_columns:
+        if col.startswith(f'{player_name}_') and not col.endswith('_Cash') and not col.endswith('_PnL'):
+            product_name = col.replace(f'{player_name}_', '')
+            if product_name not in ['Cash', 'PnL']:
+                product_names.add(product_name)
+
+    for col in all_columns:
+        if (col.startswith(f'{player_name}_') or col in product_names):
+            player_columns.append(col)
+    return player_columns
+
+
+def _record_columns(record, player_columns, start, stop):
+    """
+    Column-major slice [start, stop) of the player columns of game.record. Short columns are padded with 0
+    and unknown columns with '', so rows can be written with writerows(zip(*columns)) without per-cell work
+    """
+    columns = []
+    for col in player_columns:
+        if col == 'timestamp':
+            # timestamp is the same as Loop for now
+            values = record['Loop'][start:stop]
+            values = values + list(range(start + len(values), stop))
+        elif col in record:
+            values = record[col][start:stop]
+            values = values + [0] * (stop - start - len(values))
+        else:
+            values = [''] * (stop - start)
+        columns.append(values)
+    return columns
+
+
+def _book_rows(timestamp, book_state, player_name):
+    """Rows of log_orderbook_data.csv for one snapshot (anonymize non-player bot names)"""
+    rows = []
+    for ticker, book in book_state.items():
+        for order in book['Bids']:
+            bot_name = order.bot_name if order.bot_name == player_name else "ANONYMOUS"
+            rows.append([timestamp, ticker, 'bid', order.price, order.size, bot_name])
+        for order in book['Asks']:
+            bot_name = order.bot_name if order.bot_name == player_name else "ANONYMOUS"
+            rows.append([timestamp, ticker, 'ask', order.price, order.size, bot_name])
+    return rows
+
+
+class BookExportOptions:
+    """
+    How log_orderbook_data.csv is written. The defaults give the full per-order log.
+
+    depth: only the best `depth` price levels on each side
+    aggregate: one ANONYMOUS row per price level with the total size and a num_orders column. The player's
+               own orders are always kept as separate rows so they stay identifiable after anonymization
+    changed_only: only write a ticker's rows when its (depth-limited) book differs from the last written one.
+                  Readers carry the last snapshot forward; a book that became empty is written as a single
+                  row with side 'empty'
+    """
+    def __init__(self, depth=None, aggregate=False, changed_only=False):
+        if depth is not None and depth < 1:
+            raise ValueError(f"depth must be a positive integer, got {depth}")
+        self.depth = depth
+        self.aggregate = aggregate
+        self.changed_only = changed_only
+
+    @property
+    def is_full(self):
+        return self.depth is None and not self.aggregate and not self.changed_only
+
+    @property
+    def header(self):
+        return ORDERBOOK_HEADER + ['num_orders'] if self.aggregate else ORDERBOOK_HEADER
+
+
+class _BookRowBuilder:
+    """Turns book snapshots into orderbook rows according to BookExportOptions. Keeps state for changed_only"""
+    def __init__(self, player_name, options=None):
+        self.player_name = player_name
+        self.options = options or BookExportOptions()
+        self.previous = {}  # ticker -> rows (without timestamp) last written
+        self.previous_node = {}  # ticker -> last written book, if immutable (book_history.TickerSnapshot)
+
+    def _side_rows(self, ticker, side, orders):
+        options, player_name = self.options, self.player_name
+        rows = []
+        levels = 0
+        last_price = None
+        level_size = level_count = 0
+
+        for order in orders:
+            if order.price != last_price:
+                if options.aggregate and level_count:
+                    rows.append([ticker, side, last_price, level_size, "ANONYMOUS", level_count])
+                level_size = level_count = 0
+                levels += 1
+                if options.depth is not None and levels > options.depth:
+                    return rows
+                last_price = order.price
+
+            if order.bot_name == player_name:
+                rows.append([ticker, side, order.price, order.size, player_name] + ([1] if options.aggregate else []))
+            elif options.aggregate:
+                level_size += order.size
+                level_count += 1
+            else:
+                rows.append([ticker, side, order.price, order.size, "ANONYMOUS"])
+
+        if options.aggregate and level_count:
+            rows.append([ticker, side, last_price, level_size, "ANONYMOUS", level_count])
+        return rows
+
+    def rows(self, timestamp, book_state):
+        if self.options.is_full:
+            return _book_rows(timestamp, book_state, self.player_name)
+
+        rows = []
+        for ticker, book in book_state.items():
+            if self.options.changed_only and getattr(book, 'frozen', False):
+                if self.previous_node.get(ticker) is book:
+                    continue  # shared snapshot node, so nothing changed
+                self.previous_node[ticker] = book
+            ticker_rows = self._side_rows(ticker, 'bid', book['Bids']) + self._side_rows(ticker, 'ask', book['Asks'])
+            if self.options.changed_only:
+                if self.previous.get(ticker) == ticker_rows:
+                    continue
+                self.previous[ticker] = ticker_rows
+                if not ticker_rows:
+                    rows.append([timestamp, ticker, 'empty', '', 0, ''] + ([0] if self.options.aggregate else []))
+                    continue
+            rows.extend([timestamp] + row for row in ticker_rows)
+        return rows
+
+
+def _trade_row(trade, player_name):
+    """Row of log_trades_data.csv (anonymize non-player bot names)"""
+    agg_bot = trade.agg_bot if trade.agg_bot == player_name else "ANONYMOUS"
+    rest_bot = trade.rest_bot if trade.rest_bot == player_name else "ANONYMOUS"
+    return [trade.loop_num, trade.ticker, trade.price, trade.size, trade.agg_dir.lower(), agg_bot, rest_bot]
+
+
+ORDERBOOK_HEADER = ['timestamp', 'ticker', 'side', 'price', 'size', 'bot_name']
+TRADES_HEADER = ['timestamp', 'ticker', 'price', 'size', 'side', 'agg_bot', 'rest_bot']
+ORDERBOOK_INDEX_FILE = 'log_orderbook_data.index.json'
+
+
+class _OrderbookCSV:
+    """
+    Writes log_orderbook_data.csv one (timestamp, ticker) block at a time and records where each block is:
+    its first data row, row count, bid count and byte range. Within a block bids come first, best price
+    first, then asks best price first, so readers can slice a block instead of filtering and sorting.
+    """
+    def __init__(self, f, header):
+        self.f = f
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, quoting=csv.QUOTE_MINIMAL)
+        self.header = header
+        self.blocks = {}  # ticker -> [[timestamp, row_start, row_count, bid_count, byte_start, byte_end], ...]
+        self.rows = 0
+        self.bytes = 0
+        self._write_rows([header])
+
+    def _write_rows(self, rows):
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerows(rows)
+        text = self.buffer.getvalue()
+        self.f.write(text)
+        start = self.bytes
+        self.bytes += len(text.encode())
+        return start
+
+    def write(self, rows):
+        """rows of one or more snapshots, grouped by timestamp then ticker (as _BookRowBuilder produces them)"""
+        i = 0
+        while i < len(rows):
+            timestamp, ticker = rows[i][0], rows[i][1]
+            j = i
+            bids = 0
+            while j < len(rows) and rows[j][0] == timestamp and rows[j][1] == ticker:
+                bids += rows[j][2] == 'bid'
+                j += 1
+            byte_start = self._write_rows(rows[i:j])
+            self.blocks.setdefault(ticker, []).append([timestamp, self.rows, j - i, bids, byte_start, self.bytes])
+            self.rows += j - i
+            i = j
+
+    def index(self):
+        return {
+            'file': 'log_orderbook_data.csv',
+            'size': self.bytes,
+            'rows': self.rows,
+            'header': self.header,
+            'levels_sorted': True,
+            'columns': ['timestamp', 'row_start', 'row_count', 'bid_count', 'byte_start', 'byte_end'],
+            'blocks': self.blocks,
+        }
+
+
+def write_orderbook_index(directory, index):
+    with open(os.path.join(directory, ORDERBOOK_INDEX_FILE), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+
+def export_game_data(game, columnar=False, binary_book=False, book_options=None):
+    """
+    Export game data to CSV files for visualization with player anonymization.
+    book_options (BookExportOptions) can limit, aggregate or dedupe the rows of log_orderbook_data.csv
+    With columnar=True the same data is also written as typed, compressed parquet files (see export_columnar)
+    With binary_book=True the book history is also written as a binary log with an index (see book_log.py)
+    """
     import os
     
     # Ensure we're in the correct directory
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
     # Find player bot for anonymization
-    player_bot = None
-    player_name = None
-    for bot in game.bots.values():
-        if hasattr(bot, 'player_view_data'):
-            player_bot = bot
-            player_name = bot.name
-            break
+    player_name = _find_player_name(game)
     
     # Export player-only game record (keeping consistent with existing structure)
+    record_frame = None
     if hasattr(game, 'record') and game.record and player_name:
         with open(os.path.join(script_dir, 'log_game_record.csv'), 'w', newline='') as f:
             # Filter for player-specific columns only
-            player_columns = []
-            all_columns = list(game.record.keys())
-            
-            # Start with timestamp and loop
-            player_columns = ['timestamp', 'Loop']
-            
-            # Add player-specific columns and market prices
-            # Extract product names from player columns (e.g., PlayerAlgorithm_UEC -> UEC)
-            product_names = set()
-            for col in all_columns:
-                if col.startswith(f'{player_name}_') and not col.endswith('_Cash') and not col.endswith('_PnL'):
-                    product_name = col.replace(f'{player_name}_', '')
-                    if product_name not in ['Cash', 'PnL']:
-                        product_names.add(product_name)
-
-            for col in all_columns:
-                if (col.startswith(f'{player_name}_') or col in product_names):
-                    player_columns.append(col)
-            
-            writer = csv.DictWriter(f, fieldnames=player_columns, quoting=csv.QUOTE_MINIMAL)
-            writer.writeheader()
+            player_columns = _player_record_columns(game.record, player_name)
+
+            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(player_columns)
 
             # Transpose the record data for player columns only
             num_rows = len(game.record['Loop'])
-            for i in range(num_rows):
-                row = {}
-                for col in player_columns:
-                    if col == 'timestamp':
-                        # Add timestamp (same as Loop for now)
-                        row[col] = game.record['Loop'][i] if i < len(game.record['Loop']) else i
-                    elif col in game.record:
-                        row[col] = game.record[col][i] if i < len(game.record[col]) else 0
-                    else:
-                        row[col] = ''
-                writer.writerow(row)
+            columns = _record_columns(game.record, player_columns, 0, num_rows)
+            writer.writerows(zip(*columns))
+            record_frame = _record_frame(player_columns, columns)  # for the chart series, no re-read of the CSV
     
     # Export orderbook data (anonymize non-player bot names)
     if hasattr(game, 'orderbook_history'):
         with open(os.path.join(script_dir, 'log_orderbook_data.csv'), 'w', newline='') as f:
-            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
-            writer.writerow(['timestamp', 'ticker', 'side', 'price', 'size', 'bot_name'])
+            builder = _BookRowBuilder(player_name, book_options)
+            book_csv = _OrderbookCSV(f, builder.options.header)
             
             for timestamp, book_state in enumerate(game.orderbook_history):
-                for ticker, book in book_state.items():
-                    for order in book['Bids']:
-                        # Anonymize non-player bot names
-                        bot_name = order.bot_name if order.bot_name == player_name else "ANONYMOUS"
-                        writer.writerow([timestamp, ticker, 'bid', order.price, order.size, bot_name])
-                    for order in book['Asks']:
-                        bot_name = order.bot_name if order.bot_name == player_name else "ANONYMOUS"
-                        writer.writerow([timestamp, ticker, 'ask', order.price, order.size, bot_name])
+                book_csv.write(builder.rows(timestamp, book_state))
+        write_orderbook_index(script_dir, book_csv.index())
     
     # Export trades data (anonymize non-player bot names)
     if hasattr(game, 'all_trades'):
         with open(os.path.join(script_dir, 'log_trades_data.csv'), 'w', newline='') as f:
             writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
-            writer.writerow(['timestamp', 'ticker', 'price', 'size', 'side', 'agg_bot', 'rest_bot'])
+            writer.writerow(TRADES_HEADER)
             
             for trade in game.all_trades:
-                # Anonymize non-player bot names
-                agg_bot = trade.agg_bot if trade.agg_bot == player_name else "ANONYMOUS"
-                rest_bot = trade.rest_bot if trade.rest_bot == player_name else "ANONYMOUS"
-                writer.writerow([
-                    trade.loop_num, trade.ticker, trade.price, trade.size, 
-                    trade.agg_dir.lower(), agg_bot, rest_bot
-                ])
+                writer.writerow(_trade_row(trade, player_name))
     
     print("Exported visualization data: log_game_record.csv, log_orderbook_data.csv, log_trades_data.csv")
 
+    if record_frame is not None:
+        from visualizer.downsample import export_chart_series
+        export_chart_series(script_dir, player_name, frame=record_frame)
+
+    if columnar:
+        export_columnar(game, script_dir, book_options=book_options)
+
+    if binary_book and hasattr(game, 'orderbook_history'):
+        from visualizer.book_log import BookLogWriter
+        book_log = BookLogWriter(script_dir, player_name)
+        for timestamp, book_state in enumerate(game.orderbook_history):
+            book_log.append(timestamp, book_state)
+        book_log.close()
+        print("Exported binary book log: log_orderbook.bin, log_orderbook_index.npy")
+
+
+# ===== Columnar (parquet) export =====
+# Same content as the CSVs, but with small fixed-width dtypes and the repeated strings dictionary-encoded
+# (pandas categoricals are written as parquet dictionary columns), so files are far smaller and load
+# straight back into typed DataFrames. Needs pyarrow (or fastparquet), which is an optional dependency.
+
+COLUMNAR_FILES = {
+    'game_record': 'log_game_record.parquet',
+    'orderbook': 'log_orderbook_data.parquet',
+    'trades': 'log_trades_data.parquet',
+}
+ORDERBOOK_DTYPES = {'timestamp': 'int32', 'ticker': 'category', 'side': 'category',
+                    'price': 'float32', 'size': 'int32', 'bot_name': 'category', 'num_orders': 'int32'}
+TRADES_DTYPES = {'timestamp': 'int32', 'ticker': 'category', 'price': 'float32', 'size': 'int32',
+                 'side': 'category', 'agg_bot': 'category', 'rest_bot': 'category'}
+RECORD_INDEX_COLUMNS = ('timestamp', 'Loop')  # int64 in the parquet record
+RECORD_TEXT_SUFFIXES = ('_message',)  # always text (str) in the parquet record, even while every value is blank
+
+
+def _typed_frame(columns, dtypes):
+    """
+    DataFrame from {name: values}. Numeric columns are coerced, so blanks (e.g. an 'empty' book row) are NaN;
+    'str' columns keep their text as the CSV writes it
+    """
+    import pandas as pd
+    frame = {}
+    for name, values in columns.items():
+        series = pd.Series(values, dtype=object)
+        if dtypes[name] == 'str':
+            series = series.map(lambda value: '' if value is None else str(value))
+        elif dtypes[name] != 'category':
+            series = pd.to_numeric(series, errors='coerce')
+        frame[name] = series.astype(dtypes[name])
+    return pd.DataFrame(frame, columns=list(columns))
+
+
+def _rows_frame(rows, header, dtypes):
+    """Typed DataFrame of CSV-style rows"""
+    columns = zip(*rows) if rows else [[] for _ in header]
+    return _typed_frame(dict(zip(header, (list(values) for values in columns))), dtypes)
+
+
+def _is_number(value):
+    if isinstance(value, numbers.Number) or value is None or value == '':
+        return True
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _record_frame(player_columns, columns, text_columns=None):
+    """
+    Typed DataFrame of the game record columns (as _record_columns returns them): int64 timestamp/Loop,
+    str for the message columns and any column holding text, float64 for the rest. text_columns (a set)
+    carries the text columns over from earlier chunks and is updated with the ones found in this one
+    """
+    text_columns = set() if text_columns is None else text_columns
+    dtypes = {}
+    for name, values in zip(player_columns, columns):
+        if name in RECORD_INDEX_COLUMNS:
+            dtypes[name] = 'int64'
+        elif (name in text_columns or name.endswith(RECORD_TEXT_SUFFIXES)
+              or not all(_is_number(value) for value in values)):
+            dtypes[name] = 'str'
+            text_columns.add(name)
+        else:
+            dtypes[name] = 'float64'
+    return _typed_frame(dict(zip(player_columns, columns)), dtypes)
+
+
+def _game_frames(game, book_options=None):
+    """DataFrames with the same rows as the three CSVs (orderbook rows as book_options shapes them), built
+    straight from the in-memory game"""
+    player_name = _find_player_name(game)
+    frames = {}
+
+    if getattr(game, 'record', None) and player_name:
+        player_columns = _player_record_columns(game.record, player_name)
+        num_rows = len(game.record['Loop'])
+        frames['game_record'] = _record_frame(player_columns, _record_columns(game.record, player_columns, 0, num_rows))
+
+    if hasattr(game, 'orderbook_history'):
+        builder = _BookRowBuilder(player_name, book_options)
+        rows = []
+        for timestamp, book_state in enumerate(game.orderbook_history):
+            rows.extend(builder.rows(timestamp, book_state))
+        frames['orderbook'] = _rows_frame(rows, builder.options.header, ORDERBOOK_DTYPES)
+
+    if hasattr(game, 'all_trades'):
+        rows = [_trade_row(trade, player_name) for trade in game.all_trades]
+        frames['trades'] = _rows_frame(rows, TRADES_HEADER, TRADES_DTYPES)
+
+    return frames
+
+
+def _write_frames(frames, directory, compression):
+    try:
+        for key, frame in frames.items():
+            frame.to_parquet(os.path.join(directory, COLUMNAR_FILES[key]), compression=compression, index=False)
+    except ImportError as e:
+        raise ImportError("Columnar export needs a parquet engine: pip install pyarrow") from e
+    print("Exported columnar data: " + ", ".join(COLUMNAR_FILES[key] for key in frames))
+
+
+class _ParquetLog:
+    """
+    Appends typed DataFrames to one parquet file as they come, one row group each, with
+    pyarrow.parquet.ParquetWriter. Lets the streaming export write parquet without ever holding the whole log.
+    The schema is taken from the first non-empty frame (dictionary columns get int32 indices, so later row
+    groups can have more categories)
+    """
+    def __init__(self, path, compression):
+        self.path = path
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+        self.empty = None  # kept in case nothing is ever written, so the file still gets its columns
+
+    def write(self, frame):
+        if not len(frame):
+            self.empty = frame
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Columnar export needs pyarrow: pip install pyarrow") from e
+        if self.writer is None:
+            schema = pa.Schema.from_pandas(frame, preserve_index=False)
+            for i, field in enumerate(schema):
+                if pa.types.is_dictionary(field.type):
+                    schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+            self.schema = schema
+            self.writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        self.writer.write_table(pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        elif self.empty is not None:
+            self.empty.to_parquet(self.path, compression=self.compression, index=False)
+
+
+def export_columnar(game, directory=None, compression='zstd', book_options=None):
+    """Write log_*.parquet files with the same content as the CSV logs (pass the same book_options)"""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    _write_frames(_game_frames(game, book_options), directory, compression)
+
+
+def load_columnar(directory=None):
+    """
+    Load the parquet logs into DataFrames: {'game_record': ..., 'orderbook': ..., 'trades': ...}.
+    Missing files are left out.
+    """
+    import pandas as pd
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    frames = {}
+    for key, name in COLUMNAR_FILES.items():
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            frames[key] = pd.read_parquet(path)
+    return frames
+
+
+class BackgroundWriter:
+    """
+    Writes pre-serialized text batches to files on a separate thread, so disk I/O overlaps the simulation.
+
+    The queue is bounded: when the disk falls behind, write() blocks until there is room again, which
+    keeps memory bounded instead of letting batches pile up. close() flushes everything, joins the
+    thread and re-raises anything the thread hit.
+    """
+    _STOP = object()
+
+    def __init__(self, directory, max_pending=8, buffer_size=1 << 20):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="export-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        files = {}
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            name, text = item
+            if self.error is not None:
+                continue  # keep draining until _STOP, so a producer blocked in put() is never stuck
+            try:
+                if name not in files:
+                    files[name] = open(os.path.join(self.directory, name), 'w', newline='', buffering=self.buffer_size)
+                files[name].write(text)
+            except Exception as e:
+                self.error = e
+        for f in files.values():
+            try:
+                f.close()
+            except Exception as e:
+                self.error = self.error or e
+
+    def write(self, name, text):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((name, text))  # blocks while the queue is full (backpressure)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class StreamingExporter:
+    """
+    Writes the same three CSVs as export_game_data, but incrementally while the game is running.
+
+    Every call to flush() appends whatever was added to game.record, game.orderbook_history and
+    game.all_trades since the last call, then drops those rows from the game so memory stays bounded
+    by the flush interval instead of num_timestamps. The newest record row and book snapshot are
+    kept in memory in case the engine looks at them. close() writes the rest.
+
+    With background=True the rows are only serialized on the engine's thread; each flush hands one
+    text batch per file to a BackgroundWriter that does the disk I/O (max_pending batches in flight).
+
+    With columnar=True each flush also appends its rows to the parquet files as one row group, so the
+    parquet logs never need the whole run in memory either.
+    """
+    def __init__(self, directory=None, buffer_size=1 << 20, columnar=False, binary_book=False, book_options=None,
+                 background=False, max_pending=8):
+        self.directory = directory or os.path.dirname(os.path.abspath(__file__))
+        self.buffer_size = buffer_size
+        self.columnar = columnar
+        self.binary_book = binary_book
+        self.book_log = None
+        self.book_options = book_options
+        self.book_builder = None
+        self.book_csv = None
+        self.files = {}
+        self.writers = {}
+        self.background = BackgroundWriter(self.directory, max_pending, buffer_size) if background else None
+        self.player_name = None
+        self.player_columns = None
+        self.record_rows = 0  # rows already written (so also the offset of what is left in memory)
+        self.book_rows = 0
+        self.parquet = {}  # key of COLUMNAR_FILES -> _ParquetLog, with columnar=True
+        self.record_text_columns = set()  # record columns found to hold text, str in every later chunk too
+        self.record_frames = []  # typed record rows of every flush, for the chart series (floats, not the row lists)
+        self.closed = False
+
+    def _file(self, name):
+        if name not in self.files:
+            if self.background is not None:
+                f = io.StringIO()  # serialized here, handed to the writer thread at the end of each flush
+            else:
+                f = open(os.path.join(self.directory, name), 'w', newline='', buffering=self.buffer_size)
+            self.files[name] = f
+        return self.files[name]
+
+    def _parquet(self, key, frame):
+        """Appends this flush's rows of one log to its parquet file as a row group"""
+        if key not in self.parquet:
+            self.parquet[key] = _ParquetLog(os.path.join(self.directory, COLUMNAR_FILES[key]), 'zstd')
+        self.parquet[key].write(frame)
+
+    def _writer(self, name, header):
+        if name not in self.writers:
+            self.writers[name] = csv.writer(self._file(name), quoting=csv.QUOTE_MINIMAL)
+            self.writers[name].writerow(header)
+        return self.writers[name]
+
+    def flush(self, game, final=False):
+        if self.closed:
+            return
+        if self.player_name is None:
+            self.player_name = _find_player_name(game)
+        keep = 0 if final else 1
+
+        record = getattr(game, 'record', None)
+        if record and self.player_name and 'Loop' in record:
+            if self.player_columns is None:
+                self.player_columns = _player_record_columns(record, self.player_name)
+            writer = self._writer('log_game_record.csv', self.player_columns)
+            # only rows that every column has reached are complete
+            complete = min(len(record[col]) for col in self.player_columns if col in record)
+            n = max(complete - keep, 0)
+            columns = _record_columns(record, self.player_columns, 0, n)
+            writer.writerows(zip(*columns))
+            frame = _record_frame(self.player_columns, columns, self.record_text_columns)
+            self.record_frames.append(frame)
+            if self.columnar:
+                self._parquet('game_record', frame)
+            for values in record.values():
+                del values[:n]
+            self.record_rows += n
+
+        history = getattr(game, 'orderbook_history', None)
+        if history is not None:
+            if self.book_builder is None:
+                self.book_builder = _BookRowBuilder(self.player_name, self.book_options)
+                self.book_csv = _OrderbookCSV(self._file('log_orderbook_data.csv'), self.book_builder.options.header)
+            n = max(len(history) - keep, 0)
+            if self.binary_book and self.book_log is None:
+                from visualizer.book_log import BookLogWriter
+                self.book_log = BookLogWriter(self.directory, self.player_name)
+            columnar_rows = [] if self.columnar else None
+            for i in range(n):
+                rows = self.book_builder.rows(self.book_rows + i, history[i])
+                self.book_csv.write(rows)
+                if columnar_rows is not None:
+                    columnar_rows.extend(rows)
+                if self.book_log is not None:
+                    self.book_log.append(self.book_rows + i, history[i])
+            if columnar_rows is not None:
+                self._parquet('orderbook', _rows_frame(columnar_rows, self.book_builder.options.header,
+                                                       ORDERBOOK_DTYPES))
+            del history[:n]
+            self.book_rows += n
+
+        trades = getattr(game, 'all_trades', None)
+        if trades is not None:
+            writer = self._writer('log_trades_data.csv', TRADES_HEADER)
+            rows = [_trade_row(trade, self.player_name) for trade in trades]
+            writer.writerows(rows)
+            if self.columnar:
+                self._parquet('trades', _rows_frame(rows, TRADES_HEADER, TRADES_DTYPES))
+            del trades[:]
+
+        if self.background is not None:
+            for name, buffer in self.files.items():
+                text = buffer.getvalue()
+                if text:
+                    self.background.write(name, text)
+                    buffer.seek(0)
+                    buffer.truncate()
+
+    def close(self, game):
+        """Writes everything still in memory and closes the files. Safe to call more than once"""
+        if self.closed:
+            return
+        self.flush(game, final=True)
+        self.shutdown()
+        if self.book_csv is not None:
+            write_orderbook_index(self.directory, self.book_csv.index())
+        if self.record_frames:
+            import pandas as pd
+            from visualizer.downsample import export_chart_series
+            frame = pd.concat(self.record_frames, ignore_index=True)
+            self.record_frames = []
+            export_chart_series(self.directory, self.player_name, frame=frame)
+        print("Exported visualization data: log_game_record.csv, log_orderbook_data.csv, log_trades_data.csv")
+
+        if self.columnar:
+            # every flush already appended its rows to the parquet files as a row group, shutdown() closed them
+            print("Exported columnar data: " + ", ".join(COLUMNAR_FILES[key] for key in self.parquet))
+
+    def shutdown(self):
+        """Closes the files (and joins the writer thread) without writing anything else"""
+        if self.closed:
+            return
+        self.closed = True
+        for f in self.files.values():
+            f.close()
+        for log in self.parquet.values():
+            log.close()
+        if self.book_log is not None:
+            self.book_log.close()
+        if self.background is not None:
+            self.background.close()
+
 
 def run_visualiser():
     """Launch the visualizer in Firefox"""
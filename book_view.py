@@ -0,0 +1,136 @@
+"""
+Lazy, read-only views of the book for bots.
+
+Bots are normally handed the exchange's book dict itself: lists of live, mutable Rest objects, which
+defensive bots deep-copy every tick. A BookView wraps that dict instead. view[ticker][side] is a tuple
+of immutable RestView records (same attributes as base.Rest), built the first time that side is
+accessed and reused until the ticker's book changes. So one materialization is shared by every bot
+that reads it, and products nobody looks at are never copied. Per-ticker version counters (BookVersions,
+bumped from the Exchange by runner.run_game(lazy_book=True)) say when a ticker changed, and bots can use
+them to skip products whose book did not change:
+
+    def send_messages(self, book):
+        for ticker in book.changed(self.seen_versions):     # tickers changed since the last call
+            ...
+        self.seen_versions = book.versions_now()
+
+Copying a view (copy.copy / copy.deepcopy) returns a plain dict snapshot of tuples, which is cheap since
+the levels are already immutable.
+"""
+from collections.abc import Mapping
+from typing import Dict, List, NamedTuple, Optional
+
+SIDES = ("Bids", "Asks")
+
+
+class RestView(NamedTuple):
+    """Immutable copy of a base.Rest"""
+    size: int
+    price: float
+    rest_dir: str
+    order_id: int
+    ticker: str
+    aggness: float
+    bot_name: str
+
+    @classmethod
+    def of(cls, rest):
+        return cls(rest.size, rest.price, rest.rest_dir, rest.order_id, rest.ticker, rest.aggness, rest.bot_name)
+
+    def __str__(self):
+        return f"Price: {self.price}, Size: {self.size}"
+
+
+class BookVersions:
+    """Per-ticker change counters, bumped by whatever changes the book"""
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def bump(self, ticker: str):
+        self.counts[ticker] = self.counts.get(ticker, 0) + 1
+
+    def __getitem__(self, ticker: str) -> int:
+        return self.counts.get(ticker, 0)
+
+
+class TickerView(Mapping):
+    """One ticker of a BookView: view["Bids"] / view["Asks"] are tuples of RestView, best first"""
+    def __init__(self, book_view, ticker: str):
+        self._book_view = book_view
+        self.ticker = ticker
+
+    def __getitem__(self, side: str):
+        if side not in SIDES:
+            raise KeyError(side)
+        return self._book_view.side(self.ticker, side)
+
+    def __iter__(self):
+        return iter(SIDES)
+
+    def __len__(self):
+        return len(SIDES)
+
+    @property
+    def version(self) -> int:
+        return self._book_view.version(self.ticker)
+
+
+class BookView(Mapping):
+    """
+    Read-only view of a book dict (ticker -> {"Bids": [Rest], "Asks": [Rest]}).
+
+    versions: the BookVersions the book's changes are counted in. Materialized sides are reused while
+              their ticker's version is unchanged. Without it, they are reused until invalidate()
+    """
+    def __init__(self, book, versions: Optional[BookVersions] = None):
+        self.source = book
+        self.versions = versions
+        self._levels = {}   # (ticker, side) -> (version, tuple of RestView)
+        self._tickers = {ticker: TickerView(self, ticker) for ticker in book}
+        self.materializations = 0
+
+    def version(self, ticker: str) -> int:
+        return self.versions[ticker] if self.versions is not None else 0
+
+    def versions_now(self) -> Dict[str, int]:
+        return {ticker: self.version(ticker) for ticker in self.source}
+
+    def changed(self, since: Optional[Dict[str, int]]) -> List[str]:
+        """Tickers whose version differs from since (every ticker if since is None)"""
+        if since is None:
+            return list(self.source)
+        return [ticker for ticker in self.source if since.get(ticker) != self.version(ticker)]
+
+    def side(self, ticker: str, side: str):
+        version = self.version(ticker)
+        cached = self._levels.get((ticker, side))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        levels = tuple(RestView.of(rest) for rest in self.source[ticker][side])
+        self._levels[(ticker, side)] = (version, levels)
+        self.materializations += 1
+        return levels
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drops materialized levels (of one ticker, or all). Only needed without versions"""
+        for key in [key for key in self._levels if ticker is None or key[0] == ticker]:
+            del self._levels[key]
+
+    def __getitem__(self, ticker: str) -> TickerView:
+        return self._tickers[ticker]
+
+    def __iter__(self):
+        return iter(self._tickers)
+
+    def __len__(self):
+        return len(self._tickers)
+
+    def snapshot(self) -> Dict[str, Dict[str, tuple]]:
+        """Plain dict of the current levels (tuples of RestView)"""
+        return {ticker: {side: self.side(ticker, side) for side in SIDES} for ticker in self._tickers}
+
+    def __copy__(self):
+        return self.snapshot()
+
+    def __deepcopy__(self, memo):
+        return self.snapshot()
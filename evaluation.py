@@ -0,0 +1,243 @@
+"""
+Sequential evaluation of a bot against a reference score.
+
+Running all 20 seeds for every candidate wastes most of the compute on bots that are clearly better or
+worse after a handful of runs. evaluate() runs seeds in a process pool and, every time the next seed in
+order finishes, looks at the studentized score difference to the reference (a t statistic, with the
+score's standard error from the delta method) and stops once it crosses a group-sequential boundary.
+
+The boundaries come from an alpha-spending function (Lan-DeMets O'Brien-Fleming by default, or Pocock)
+over the fraction of seeds used, and are calibrated by simulating the statistic itself under the null on
+normal PnLs, so they account for small-sample t tails and the bias of the score's std. The chance of a
+"better" or "worse" decision for a bot whose true score equals the reference is 1 - confidence over the
+whole evaluation, however many looks it takes.
+
+    from evaluation import evaluate
+    result = evaluate(PlayerAlgorithm, 20000, products, reference=1500.0)   # or a list of reference PnLs
+    print(result)   # better after 7 runs (13 of 20 saved), score 2140.3 [1712.9, 2503.0] vs reference 1500.0
+"""
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from statistics import NormalDist
+
+import numpy as np
+
+from run_analysis import SCORE_STD_WEIGHT, score
+
+SPENDING = {
+    # cumulative type I error spent by information fraction t (two-sided alpha)
+    "obrien-fleming": lambda t, alpha: 2 - 2 * NormalDist().cdf(NormalDist().inv_cdf(1 - alpha / 2) / math.sqrt(t)),
+    "pocock": lambda t, alpha: alpha * math.log(1 + (math.e - 1) * t),
+}
+BOUNDARY_PATHS = 50000  # simulated null evaluations per boundary computation
+
+
+def _run_seed(bot_class, num_timestamps, products, seed, engine_kwargs):
+    """One engine run with python's and numpy's global RNGs seeded, whichever the engine draws from"""
+    from runner import run_game
+    random.seed(seed)
+    np.random.seed(seed)
+    return run_game(bot_class, num_timestamps, products, print_profile=False, **engine_kwargs).pnl
+
+
+class EvaluationResult:
+    """
+    Outcome of evaluate(). decision is "better", "worse" or "undecided" (all seeds used without crossing a
+    boundary). pnls are in seed order, for the seeds the decision was based on. low and high are the
+    repeated confidence interval of the score at the last look: the decision is "better" exactly when low is
+    above the reference score and "worse" when high is below it. runs_saved counts the seeds that never ran
+    (never submitted, or cancelled before they started); runs already going when the decision came are not
+    saved even though their results are ignored.
+    """
+    def __init__(self, decision, seeds, pnls, max_runs, interval, reference, runs_saved):
+        self.decision = decision
+        self.seeds = seeds
+        self.pnls = pnls
+        self.max_runs = max_runs
+        self.low, self.high = interval
+        self.reference = reference
+        self.runs_saved = runs_saved
+
+    @property
+    def runs_used(self):
+        return len(self.pnls)
+
+    @property
+    def score(self):
+        return float(score(self.pnls))
+
+    def __str__(self):
+        return (f"{self.decision} after {self.runs_used} runs ({self.runs_saved} of {self.max_runs} saved), "
+                f"score {self.score:.1f} [{self.low:.1f}, {self.high:.1f}] vs reference {self.reference:.1f}")
+
+
+def score_standard_error(pnls, axis=-1):
+    """Delta-method standard error of score(pnls) for normal PnLs: sd * sqrt(1/n + w^2 / (2(n-1)))"""
+    pnls = np.asarray(pnls, dtype=float)
+    n = pnls.shape[axis]
+    return pnls.std(axis=axis, ddof=1) * np.sqrt(1 / n + SCORE_STD_WEIGHT ** 2 / (2 * (n - 1)))
+
+
+def _statistic(pnls, reference, axis=-1):
+    """(t statistic of score(pnls) - reference score, its standard error). reference: a score or runs"""
+    difference = score(pnls, axis=axis)
+    se = score_standard_error(pnls, axis=axis)
+    if np.ndim(reference) == 0:
+        difference = difference - reference
+    else:
+        difference = difference - score(reference, axis=axis)
+        se = np.sqrt(se ** 2 + score_standard_error(reference, axis=axis) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(se > 0, difference / se, np.sign(difference) * np.inf)
+    return t, se
+
+
+@lru_cache(maxsize=32)
+def group_sequential_boundaries(max_runs, min_runs=5, alpha=0.05, spending="obrien-fleming", reference_runs=0,
+                                paths=BOUNDARY_PATHS, seed=0):
+    """
+    (lower, upper) t boundaries for the looks at min_runs, ..., max_runs runs. Each side spends alpha / 2 by
+    the spending function of the information fraction runs / max_runs; a side with nothing to spend at a
+    look gets an infinite boundary. Calibrated on `paths` simulated null evaluations with standard normal
+    PnLs: the reference score is the true one, or the reference runs come from the same distribution
+    """
+    if spending not in SPENDING:
+        raise ValueError(f"Invalid spending: {spending}. Must be one of {sorted(SPENDING)}.")
+    rng = np.random.default_rng(seed)
+    pnls = rng.standard_normal((paths, max_runs))
+    reference = rng.standard_normal((paths, reference_runs)) if reference_runs else -SCORE_STD_WEIGHT
+    spend = SPENDING[spending]
+
+    alive = np.ones(paths, dtype=bool)
+    crossed = {"lower": 0, "upper": 0}
+    lower, upper = [], []
+    for n in range(min_runs, max_runs + 1):
+        t, _ = _statistic(pnls[:, :n], reference)
+        target = spend(n / max_runs, alpha) / 2 * paths  # paths allowed to have crossed each side by now
+        bounds = {}
+        for side, sign in (("lower", -1), ("upper", 1)):
+            allowed = int(target - crossed[side])
+            candidates = np.sort(sign * t[alive])[::-1]
+            if allowed < 1 or not len(candidates):
+                bounds[side] = np.inf
+                continue
+            # strictly beyond the boundary, so at most `allowed` paths cross
+            bounds[side] = candidates[allowed] if allowed < len(candidates) else -np.inf
+        hit_lower = alive & (-t > bounds["lower"])
+        hit_upper = alive & (t > bounds["upper"])
+        crossed["lower"] += int(hit_lower.sum())
+        crossed["upper"] += int(hit_upper.sum())
+        alive &= ~(hit_lower | hit_upper)
+        lower.append(-bounds["lower"])
+        upper.append(bounds["upper"])
+    return tuple(lower), tuple(upper)
+
+
+class SequentialTest:
+    """
+    The stopping rule of evaluate(), usable on its own: check(pnls) after every run, in order, until it
+    returns a decision.
+
+    reference: a score to beat, or the per-run PnLs of the reference bot
+    """
+    def __init__(self, reference, max_runs, min_runs=5, confidence=0.95, spending="obrien-fleming"):
+        if min_runs < 2 or min_runs > max_runs:
+            raise ValueError(f"min_runs must be between 2 and the number of seeds ({max_runs})")
+        self.reference = reference if np.ndim(reference) == 0 else np.asarray(reference, dtype=float)
+        self.reference_score = float(reference if np.ndim(reference) == 0 else score(self.reference))
+        self.min_runs = min_runs
+        self.lower, self.upper = group_sequential_boundaries(
+            max_runs, min_runs, 1 - confidence, spending, 0 if np.ndim(reference) == 0 else len(reference))
+
+    def check(self, pnls):
+        """(decision or None, repeated confidence interval of the score) after len(pnls) runs"""
+        look = len(pnls) - self.min_runs
+        t, se = _statistic(pnls, self.reference)
+        centre = float(score(pnls))
+        low = centre - self.upper[look] * se if np.isfinite(self.upper[look]) else -np.inf
+        high = centre - self.lower[look] * se if np.isfinite(self.lower[look]) else np.inf
+        if t > self.upper[look]:
+            return "better", (float(low), float(high))
+        if t < self.lower[look]:
+            return "worse", (float(low), float(high))
+        return None, (float(low), float(high))
+
+
+def evaluate(bot_class, num_timestamps, products, reference, seeds=20, min_runs=5, confidence=0.95,
+             workers=None, spending="obrien-fleming", pnl_of=float, verbose=True, **engine_kwargs):
+    """
+    Runs bot_class over seeds until its score is confidently above or below reference.
+
+    reference: a score to beat, or the per-run PnLs of the reference bot
+    seeds: number of seeds (0, 1, ...) or an explicit list. Results are always checked in seed order,
+           so the outcome doesn't depend on which worker finishes first
+    min_runs: runs needed before the first check
+    confidence: 1 - the chance of a wrong decision over the whole evaluation when the scores are equal
+    workers: process pool size (defaults to the number of CPUs; 1 runs everything in this process).
+             Only up to `workers` seeds are in flight, so at most workers - 1 runs are wasted on a stop
+    spending: alpha-spending function of the boundaries, "obrien-fleming" (strict early, close to a fixed
+              test at the end) or "pocock" (even, stops sooner on clear cases)
+    pnl_of: turns what the engine's run_game returns into a number
+    engine_kwargs: passed to runner.run_game (visualiser, progress_bar and print_limits default to off)
+    """
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+    engine_kwargs = {"visualiser": False, "progress_bar": False, "print_limits": False, **engine_kwargs}
+    test = SequentialTest(reference, len(seeds), min_runs, confidence, spending)
+
+    results = {}  # seed index -> pnl
+    decision, interval = None, (float("nan"), float("nan"))
+    checked = 0
+
+    def advance():
+        """Checks every newly completed prefix of the seed order, returns True once decided"""
+        nonlocal decision, interval, checked
+        while checked in results:
+            checked += 1
+            pnls = [results[i] for i in range(checked)]
+            if checked >= min_runs:
+                decision, interval = test.check(pnls)
+            if verbose:
+                bounds = f" [{interval[0]:.1f}, {interval[1]:.1f}]" if checked >= min_runs else ""
+                print(f"run {checked}/{len(seeds)}: seed {seeds[checked - 1]} pnl {pnls[-1]:.1f}, "
+                      f"score {score(pnls):.1f}{bounds}")
+            if decision is not None:
+                return True
+        return False
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for i, seed in enumerate(seeds):
+            results[i] = pnl_of(_run_seed(bot_class, num_timestamps, products, seed, engine_kwargs))
+            if advance():
+                break
+        saved = len(seeds) - len(results)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        pending = {}
+        next_index = 0
+        try:
+            while next_index < len(seeds) or pending:
+                while next_index < len(seeds) and len(pending) < workers:
+                    future = pool.submit(_run_seed, bot_class, num_timestamps, products, seeds[next_index],
+                                         engine_kwargs)
+                    pending[future] = next_index
+                    next_index += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = pnl_of(future.result())
+                if advance():
+                    break
+        finally:
+            # only runs that hadn't started can be cancelled; the ones already going still cost their time
+            cancelled = sum(future.cancel() for future in pending)
+            pool.shutdown(wait=False, cancel_futures=True)
+        saved = len(seeds) - next_index + cancelled
+
+    result = EvaluationResult(decision or "undecided", seeds[:checked], [results[i] for i in range(checked)],
+                              len(seeds), interval, test.reference_score, saved)
+    if verbose:
+        print(result)
+    return result
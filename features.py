@@ -0,0 +1,335 @@
+"""
+Streaming features for trading bots, each updated in O(1) per tick.
+
+Rolling estimators keep their window in a fixed-size NumPy ring buffer together with running sums, so
+an update adds the new value and subtracts the one falling out of the window instead of recomputing
+over the whole history. A FeatureSet works out the per-tick inputs (mids, log returns, order-flow
+imbalance, trade signs) once and feeds every registered estimator from them:
+
+    from features import FeatureSet
+
+    class MyAlgo(PlayerAlgorithm):
+        def __init__(self, products, num_timestamps):
+            super().__init__(products, num_timestamps)
+            self.features = FeatureSet.standard([p.ticker for p in products], window=100, halflife=20)
+
+        def process_trades(self, trades):
+            super().process_trades(trades)
+            self.features.add_trades(trades)       # buffered until the next update
+
+        def send_messages(self, book):
+            self.features.update(book)             # or update(book, trades) with trades you collected
+            vol = self.features["vol[QFIN]"]
+            corr = self.features.estimator("cov").correlation()
+"""
+import math
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def _missing(x):
+    return x is None or (isinstance(x, float) and math.isnan(x))
+
+
+class RingBuffer:
+    """Fixed-size buffer of the last `size` values (rows, when shape is given)"""
+    def __init__(self, size: int, shape=()):
+        self.data = np.zeros((size,) + tuple(shape))
+        self.size = size
+        self.count = 0
+        self.pos = 0
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def push(self, value):
+        """Stores value and returns the one it replaced (None until the buffer is full)"""
+        evicted = self.data[self.pos].copy() if self.full else None
+        self.data[self.pos] = value
+        self.pos = (self.pos + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return evicted
+
+    def values(self):
+        """Contents, oldest first"""
+        if not self.full:
+            return self.data[:self.count].copy()
+        return np.concatenate([self.data[self.pos:], self.data[:self.pos]])
+
+
+# ===== Estimators =====
+class EWMA:
+    """Exponentially weighted moving average. Give either alpha or halflife (in updates)"""
+    def __init__(self, alpha: float = None, halflife: float = None):
+        if (alpha is None) == (halflife is None):
+            raise ValueError("Give exactly one of alpha and halflife")
+        self.alpha = alpha if alpha is not None else 1 - 0.5 ** (1 / halflife)
+        self.value = float("nan")
+
+    def update(self, x):
+        if _missing(x):
+            return
+        self.value = x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+
+
+class RollingSum:
+    def __init__(self, window: int):
+        self.buffer = RingBuffer(window)
+        self.total = 0.0
+
+    @property
+    def count(self):
+        return self.buffer.count
+
+    @property
+    def value(self):
+        return self.total
+
+    def update(self, x):
+        if _missing(x):
+            return
+        evicted = self.buffer.push(x)
+        self.total += x - (evicted if evicted is not None else 0.0)
+
+
+class RollingMean(RollingSum):
+    @property
+    def value(self):
+        return self.total / self.count if self.count else float("nan")
+
+
+class RollingVariance:
+    """Sample variance over the window, with Welford's add/remove updates for numerical stability"""
+    def __init__(self, window: int):
+        self.buffer = RingBuffer(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def count(self):
+        return self.buffer.count
+
+    @property
+    def value(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self):
+        return math.sqrt(max(self.value, 0.0)) if self.count > 1 else float("nan")
+
+    def update(self, x):
+        if _missing(x):
+            return
+        evicted = self.buffer.push(x)
+        if evicted is None:
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (x - evicted) / self.count
+            self.m2 += (x - evicted) * (x - self.mean + evicted - old_mean)
+
+
+class RealizedVol:
+    """sqrt of the sum of squared returns over the window (volatility per window, not annualized)"""
+    def __init__(self, window: int):
+        self.squares = RollingSum(window)
+
+    @property
+    def value(self):
+        return math.sqrt(max(self.squares.total, 0.0)) if self.squares.count else float("nan")
+
+    def update(self, r):
+        if not _missing(r):
+            self.squares.update(r * r)
+
+
+class SignAutocorrelation:
+    """Autocorrelation of a +1/-1 sign series at `lag` over the last `window` signs"""
+    def __init__(self, window: int, lag: int = 1):
+        self.lag = lag
+        self.recent = RingBuffer(lag)
+        self.mean = RollingMean(window)
+        self.lagged = RollingMean(window)  # mean of s_t * s_{t-lag}
+
+    @property
+    def value(self):
+        if self.lagged.count < 2:
+            return float("nan")
+        mean = self.mean.value
+        var = 1.0 - mean * mean  # s^2 is always 1
+        return (self.lagged.value - mean * mean) / var if var > 0 else float("nan")
+
+    def update(self, sign):
+        if _missing(sign):
+            return
+        if self.recent.full:
+            self.lagged.update(sign * self.recent.data[self.recent.pos])  # the value pushed `lag` signs ago
+        self.recent.push(sign)
+        self.mean.update(sign)
+
+
+class RollingCovariance:
+    """Covariance matrix of vectors over the window, from running sums of x and of x x^T"""
+    def __init__(self, window: int, dims: int):
+        self.buffer = RingBuffer(window, (dims,))
+        self.sums = np.zeros(dims)
+        self.cross = np.zeros((dims, dims))
+
+    @property
+    def count(self):
+        return self.buffer.count
+
+    @property
+    def value(self):
+        n = self.count
+        if n < 2:
+            return np.full(self.cross.shape, np.nan)
+        return (self.cross - np.outer(self.sums, self.sums) / n) / (n - 1)
+
+    def correlation(self):
+        cov = self.value
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov / np.outer(std, std)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        if np.isnan(x).any():
+            return
+        evicted = self.buffer.push(x)
+        self.sums += x
+        self.cross += np.outer(x, x)
+        if evicted is not None:
+            self.sums -= evicted
+            self.cross -= np.outer(evicted, evicted)
+
+
+# ===== Inputs =====
+def mid(ticker: str) -> Callable:
+    return lambda features: features.mids[ticker]
+
+
+def log_return(ticker: str) -> Callable:
+    return lambda features: features.returns[ticker]
+
+
+def order_flow(ticker: str) -> Callable:
+    return lambda features: features.ofi[ticker]
+
+
+def trade_signs(ticker: str) -> Callable:
+    """Every trade's aggressor sign this tick (+1 buy, -1 sell); the estimator is updated once per trade"""
+    return lambda features: features.trade_signs[ticker]
+
+
+def returns(tickers: List[str]) -> Callable:
+    return lambda features: np.array([features.returns[ticker] for ticker in tickers])
+
+
+class FeatureSet:
+    """
+    Registered estimators plus the per-tick inputs they are fed from. Values are read with
+    features[name]; the estimator itself with features.estimator(name).
+    """
+    def __init__(self, tickers: Iterable[str]):
+        self.tickers = list(tickers)
+        self.mids = {ticker: float("nan") for ticker in self.tickers}
+        self.returns = {ticker: float("nan") for ticker in self.tickers}
+        self.ofi = {ticker: 0.0 for ticker in self.tickers}
+        self.trade_signs: Dict[str, List[int]] = {ticker: [] for ticker in self.tickers}
+        self._top = {ticker: None for ticker in self.tickers}  # (bid, bid size, ask, ask size) last tick
+        self._pending_trades = []
+        self._features = {}  # name -> (estimator, input)
+
+    @classmethod
+    def standard(cls, tickers: Iterable[str], window: int = 100, halflife: float = 20):
+        """
+        Per ticker: ewma[T] of the mid, mean[T] / var[T] / vol[T] of log returns, ofi[T] summed over the
+        window and sign_acf[T] of trade signs; plus cov, the covariance of all tickers' returns.
+        """
+        features = cls(tickers)
+        for ticker in features.tickers:
+            features.add(f"ewma[{ticker}]", EWMA(halflife=halflife), mid(ticker))
+            features.add(f"mean[{ticker}]", RollingMean(window), log_return(ticker))
+            features.add(f"var[{ticker}]", RollingVariance(window), log_return(ticker))
+            features.add(f"vol[{ticker}]", RealizedVol(window), log_return(ticker))
+            features.add(f"ofi[{ticker}]", RollingSum(window), order_flow(ticker))
+            features.add(f"sign_acf[{ticker}]", SignAutocorrelation(window), trade_signs(ticker))
+        features.add("cov", RollingCovariance(window, len(features.tickers)), returns(features.tickers))
+        return features
+
+    def add(self, name: str, estimator, source: Callable):
+        """Registers estimator, fed every update with source(self) (a list means one update per item)"""
+        self._features[name] = (estimator, source)
+        return estimator
+
+    def estimator(self, name: str):
+        return self._features[name][0]
+
+    def __getitem__(self, name: str):
+        return self._features[name][0].value
+
+    def values(self) -> Dict[str, object]:
+        return {name: estimator.value for name, (estimator, _) in self._features.items()}
+
+    def add_trades(self, trades):
+        """Buffers trades (e.g. from process_trades) for the next update"""
+        self._pending_trades.extend(trades)
+
+    def update(self, book, trades: Optional[Iterable] = None):
+        """One tick: recompute the inputs from book and trades (plus buffered ones), then every estimator"""
+        for ticker in self.tickers:
+            self._update_book(ticker, book[ticker]["Bids"], book[ticker]["Asks"])
+            self.trade_signs[ticker] = []
+        for trade in self._pending_trades + list(trades or ()):
+            if trade.ticker in self.trade_signs:
+                self.trade_signs[trade.ticker].append(1 if trade.agg_dir == "Buy" else -1)
+        self._pending_trades = []
+
+        for estimator, source in self._features.values():
+            value = source(self)
+            if isinstance(value, list):
+                for item in value:
+                    estimator.update(item)
+            else:
+                estimator.update(value)
+
+    def _update_book(self, ticker, bids, asks):
+        top = None
+        if bids and asks:
+            bid, ask = bids[0].price, asks[0].price
+            # size at the best price only, the levels below don't matter here
+            bid_size = sum(order.size for order in _level(bids))
+            ask_size = sum(order.size for order in _level(asks))
+            top = (bid, bid_size, ask, ask_size)
+
+            mid_price = (bid + ask) / 2
+            previous = self.mids[ticker]
+            self.returns[ticker] = math.log(mid_price / previous) if previous > 0 else float("nan")
+            self.mids[ticker] = mid_price
+        else:
+            self.returns[ticker] = float("nan")
+
+        # order-flow imbalance (Cont, Kukanov & Stoikov) from the change in the top of book
+        last = self._top[ticker]
+        if top is not None and last is not None:
+            bid, bid_size, ask, ask_size = top
+            last_bid, last_bid_size, last_ask, last_ask_size = last
+            self.ofi[ticker] = ((bid_size if bid >= last_bid else 0) - (last_bid_size if bid <= last_bid else 0)
+                                - (ask_size if ask <= last_ask else 0) + (last_ask_size if ask >= last_ask else 0))
+        else:
+            self.ofi[ticker] = 0.0
+        self._top[ticker] = top
+
+
+def _level(orders):
+    """The orders at the best price (the front of a side, which is sorted best first)"""
+    best = orders[0].price
+    for order in orders:
+        if order.price != best:
+            break
+        yield order
@@ -0,0 +1,355 @@
+"""
+Per-ticker parallel matching with a barrier per batch of messages.
+
+Matching in one product never touches another product's book, so the books can be split into shards
+(one or more tickers each), and each shard's Exchange can live in its own worker process. A
+ShardedExchange takes a tick's messages, routes ORDER and REMOVE messages to the shard of their ticker,
+lets every shard match its share in parallel and waits for all of them (the barrier) before handing
+back the results. CONVERSION messages don't touch the books and are handed back untouched, to be
+applied by the caller together with the fills once the barrier has passed.
+
+Within a ticker the messages are matched in the order given, and the trades come back in message
+order, so the outcome is exactly what one Exchange processing the same messages one by one produces.
+More products means more shards, up to one per core. The books live in the shards; ShardedExchange.book
+is a mirror kept up to date from per-order deltas, so each match costs a round trip per busy shard plus
+pickling the orders in and the trades and changed orders out. Processes still only pay off once
+matching a tick is the expensive part; workers=0 keeps the same sharding in this process.
+
+Order ids are handled like Exchange.order_ids: only the id of an order that came to rest is taken, so the
+id of an order that filled completely on arrival can be sent again. A batch is all or nothing: ids already
+taken and unknown tickers are refused before any shard sees it, and if a shard still fails (or an id is
+repeated within the batch after its first order came to rest), every shard undoes its share before the
+error is raised.
+
+    with ShardedExchange(products) as exchange:
+        for loop_num in range(num_timestamps):
+            messages = [msg for bot in bots for msg in bot.send_messages(exchange.book)]
+            result = exchange.match(messages, loop_num)
+            ...  # apply result.trades and result.conversions to positions, then process_trades
+
+The compiled engine loop calls Exchange.process_order once per message and needs each order's trades
+before moving on, so it can't be given a barrier from outside. This is for game loops we own
+(simulations, research drivers).
+"""
+import multiprocessing
+import os
+from typing import Dict, List
+
+from base import Exchange, Msg, Rest
+
+
+class MatchResult:
+    """
+    What one ShardedExchange.match call produced. trades are in message order (the trades of each
+    ORDER message in the order they happened), removed maps every REMOVE's order_id to whether it was
+    on the book, conversions are the CONVERSION messages' payloads in message order.
+    """
+    def __init__(self, trades, removed, conversions, changed):
+        self.trades = trades
+        self.removed = removed
+        self.conversions = conversions
+        self.changed = changed  # tickers whose book changed
+
+
+def _rest_fields(rest: Rest):
+    return rest.size, rest.price, rest.rest_dir, rest.order_id, rest.ticker, rest.aggness, rest.bot_name
+
+
+class _ShardBook:
+    """
+    One shard's authoritative Exchange, wherever it runs. match() returns the results plus, per changed
+    ticker and side, a delta against what was sent before: the order_ids that left the book, the new sizes
+    of the resting orders that traded, and the orders that came to rest with their index. Only orders the
+    batch touched are looked at, which relies on resting orders never moving relative to each other (as
+    in Exchange: they only shrink or leave, and new ones are inserted between them). Until the next
+    match, the batch can be rolled back, which restores the books and order ids as they were before it.
+    """
+    def __init__(self, products, exchange_class, exchange_kwargs):
+        self.exchange = exchange_class(products, **exchange_kwargs)
+        self._sent = {}  # order_id -> (side, size) of every resting order, as last sent to the ShardedExchange
+        self._undo = None
+
+    def match(self, batch, loop_num: int):
+        """
+        [(index, msg_type, payload)] -> ([(index, result)], {ticker: {side: delta}}, {order_id: index}), the
+        last being the orders that came to rest (so their ids are taken, as in Exchange.order_ids) and the
+        index of the message that rested them
+        """
+        exchange = self.exchange
+        touched = {}  # ticker -> order ids the batch may have changed
+        for _, msg_type, payload in batch:
+            ticker = payload.ticker if msg_type == "ORDER" else payload[0]
+            touched.setdefault(ticker, set())
+        self._undo = (
+            {ticker: {side: list(rests) for side, rests in exchange.book[ticker].items()} for ticker in touched},
+            {payload.order_id for _, msg_type, payload in batch
+             if msg_type == "ORDER" and payload.order_id not in exchange.order_ids},
+            {},  # order_id -> its _sent entry before the batch, filled in by _delta
+        )
+        results = []
+        rested = {}
+        try:
+            for index, msg_type, payload in batch:
+                if msg_type == "ORDER":
+                    new = payload.order_id not in exchange.order_ids
+                    trades = exchange.process_order(payload, loop_num)
+                    if new and payload.order_id in exchange.order_ids:
+                        rested[payload.order_id] = index
+                    touched[payload.ticker].add(payload.order_id)
+                    touched[payload.ticker].update(trade.rest_order_id for trade in trades)
+                    results.append((index, trades))
+                else:
+                    ticker, order_id = payload
+                    touched[ticker].add(order_id)
+                    results.append((index, exchange.remove_order(order_id)))
+        except Exception:
+            self.rollback()
+            raise
+        return results, {ticker: self._delta(ticker, order_ids) for ticker, order_ids in touched.items()}, rested
+
+    def _delta(self, ticker, order_ids):
+        book = self.exchange.book[ticker]
+        index_of = {side: {rest.order_id: index for index, rest in enumerate(rests)} for side, rests in book.items()}
+        delta = {side: ([], [], []) for side in book}  # removed, resized, inserted
+        previous = self._undo[2]
+        for order_id in order_ids:
+            previous.setdefault(order_id, self._sent.get(order_id))
+            side = next((side for side, indices in index_of.items() if order_id in indices), None)
+            if side is None:
+                sent = self._sent.pop(order_id, None)
+                if sent is not None:
+                    delta[sent[0]][0].append(order_id)
+                continue
+            rest = book[side][index_of[side][order_id]]
+            sent = self._sent.get(order_id)
+            if sent is None:
+                delta[side][2].append((index_of[side][order_id], _rest_fields(rest)))
+            elif sent[1] != rest.size:
+                delta[side][1].append((order_id, rest.size))
+            self._sent[order_id] = side, rest.size
+        for _, _, inserted in delta.values():
+            inserted.sort(key=lambda item: item[0])
+        return delta
+
+    def rollback(self):
+        """Undoes the last matched batch"""
+        if self._undo is None:
+            return
+        books, new_ids, previous = self._undo
+        for order_id, sent in previous.items():
+            if sent is None:
+                self._sent.pop(order_id, None)
+            else:
+                self._sent[order_id] = sent
+        for ticker, sides in books.items():
+            for side, rests in sides.items():
+                for rest in rests:  # every order resting before the batch was sent, with its size then
+                    rest.size = self._sent[rest.order_id][1]
+                self.exchange.book[ticker][side] = rests
+        for order_id in new_ids:
+            self.exchange.order_ids.pop(order_id, None)
+        self._undo = None
+
+    def handle(self, request):
+        """("match", batch, loop_num) or ("rollback",) -> ("ok", payload) or ("error", exception)"""
+        try:
+            if request[0] == "rollback":
+                return "ok", self.rollback()
+            return "ok", self.match(*request[1:])
+        except Exception as exc:  # handed to the caller, the shard stays usable
+            return "error", exc
+
+
+def _shard_worker(conn, products, exchange_class, exchange_kwargs):
+    """Worker process loop: owns one shard's books and handles every request it is sent"""
+    shard = _ShardBook(products, exchange_class, exchange_kwargs)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        conn.send(shard.handle(request))
+    conn.close()
+
+
+class _LocalShard:
+    """A shard matched in this process (workers=0), with the same send/recv interface as a worker"""
+    def __init__(self, products, exchange_class, exchange_kwargs):
+        self.shard = _ShardBook(products, exchange_class, exchange_kwargs)
+        self._reply = None
+
+    def send(self, request):
+        self._reply = self.shard.handle(request)
+
+    def recv(self):
+        reply, self._reply = self._reply, None
+        return reply
+
+    def close(self):
+        pass
+
+
+def _apply_delta(rests, delta):
+    """Brings a mirrored side of the book up to date with a _ShardBook delta"""
+    removed, resized, inserted = delta
+    if removed:
+        removed = set(removed)
+        rests[:] = [rest for rest in rests if rest.order_id not in removed]
+    if resized:
+        sizes = dict(resized)
+        for rest in rests:
+            if rest.order_id in sizes:
+                rest.size = sizes[rest.order_id]
+    # the other orders kept their order, so inserting by final index in increasing order rebuilds the side
+    for index, fields in inserted:
+        rests.insert(index, Rest(*fields))
+
+
+class ShardedExchange:
+    """
+    Exchange whose books are split by ticker across worker processes. book mirrors the shards' books
+    (updated for the tickers that changed after every match), so bots can be shown book[ticker]["Bids"]
+    as usual.
+
+    workers: number of worker processes (defaults to one per product, capped at the number of CPUs).
+             Tickers are dealt round-robin to the shards. 0 matches every shard in this process,
+             which gives the same results and is useful to check a driver against
+    exchange_class / exchange_kwargs: what each shard runs (must be importable by the workers)
+    """
+    def __init__(self, products, workers=None, exchange_class=Exchange, **exchange_kwargs):
+        self.products = list(products)
+        self.book = {p.ticker: {"Bids": [], "Asks": []} for p in self.products}
+        if workers is None:
+            workers = min(len(self.products), os.cpu_count() or 1)
+        shard_count = max(1, min(workers, len(self.products))) if workers else max(1, len(self.products))
+
+        shard_products: List[list] = [[] for _ in range(shard_count)]
+        for i, product in enumerate(self.products):
+            shard_products[i % shard_count].append(product)
+        self.shard_of: Dict[str, int] = {p.ticker: i % shard_count for i, p in enumerate(self.products)}
+        self.order_ids: Dict[int, str] = {}  # order_id -> ticker, to route REMOVE messages
+
+        self._shards = []
+        self._processes = []
+        for products_in_shard in shard_products:
+            if workers:
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_shard_worker, daemon=True,
+                                                  args=(child, products_in_shard, exchange_class, exchange_kwargs))
+                process.start()
+                child.close()
+                self._shards.append(parent)
+                self._processes.append(process)
+            else:
+                self._shards.append(_LocalShard(products_in_shard, exchange_class, exchange_kwargs))
+
+    def _route(self, index, msg: Msg, batches, new_ids):
+        if msg.msg_type == "ORDER":
+            order = msg.message
+            # like Exchange, only ids of orders that came to rest are taken: a fully filled order's id can be
+            # sent again. Repeats within the batch are checked by the shards and after the barrier
+            if order.order_id in self.order_ids:
+                raise ValueError(f"Already Seen OrderId {order.order_id}. Please ensure that a new OrderId has been generated")
+            if order.ticker not in self.shard_of:
+                raise ValueError(f"Unknown ticker {order.ticker} in order {order.order_id}")
+            new_ids.setdefault(order.order_id, []).append((index, order.ticker))
+            batches[self.shard_of[order.ticker]].append((index, "ORDER", order))
+            return True
+        if msg.msg_type == "REMOVE":
+            ticker = self.order_ids.get(msg.message)
+            if ticker is None and msg.message in new_ids:
+                ticker = new_ids[msg.message][-1][1]  # the latest order with this id, the only one that can rest
+            if ticker is None:
+                return False  # never sent, so not on any book
+            batches[self.shard_of[ticker]].append((index, "REMOVE", (ticker, msg.message)))
+            return True
+        return False
+
+    def match(self, messages: List[Msg], loop_num: int) -> MatchResult:
+        """
+        Matches a batch of messages (typically everything every bot sent this tick, in the order the
+        engine would process them) across the shards in parallel, and returns once all shards are done.
+        """
+        # the whole batch is checked before any shard sees it, and its order ids are only registered once
+        # every shard has matched, so a rejected batch leaves nothing behind
+        batches = [[] for _ in self._shards]
+        new_ids = {}  # order_id -> [(message index, ticker)] of this batch's orders
+        removed = {}
+        conversions = []
+        for index, msg in enumerate(messages):
+            if msg.msg_type == "CONVERSION":
+                conversions.append(msg.message)
+            elif not self._route(index, msg, batches, new_ids) and msg.msg_type == "REMOVE":
+                removed[msg.message] = False
+
+        # fan out, then the barrier: wait for every shard that was given work
+        busy = [shard for shard, batch in zip(self._shards, batches) if batch]
+        for shard, batch in zip(self._shards, batches):
+            if batch:
+                shard.send(("match", batch, loop_num))
+        replies = [shard.recv() for shard in busy]
+
+        errors = [payload for status, payload in replies if status == "error"]
+        if not errors:
+            errors = [self._repeated_id(new_ids, [payload[2] for _, payload in replies])]
+        if errors[0] is not None:
+            # a failing shard has undone its share already; undo the others so the tick is all or nothing
+            matched = [shard for shard, (status, _) in zip(busy, replies) if status == "ok"]
+            for shard in matched:
+                shard.send(("rollback",))
+            for shard in matched:
+                shard.recv()
+            raise errors[0]
+
+        for _, (_, _, rested) in replies:
+            for order_id, index in rested.items():
+                self.order_ids[order_id] = messages[index].message.ticker
+        results = {}
+        changed = set()
+        for _, (shard_results, deltas, _) in replies:
+            results.update(shard_results)
+            for ticker, sides in deltas.items():
+                for side, delta in sides.items():
+                    _apply_delta(self.book[ticker][side], delta)
+            changed.update(deltas)
+
+        trades = []
+        for index, msg in enumerate(messages):
+            if index not in results:
+                continue
+            if msg.msg_type == "ORDER":
+                trades.extend(results[index])
+            else:
+                removed[msg.message] = results[index]
+        return MatchResult(trades, removed, conversions, sorted(changed))
+
+    def _repeated_id(self, new_ids, rested_by_shard):
+        """
+        The error Exchange would have raised for an id that came to rest and was sent again later in the batch
+        on another shard's ticker (repeats on the same shard were already refused by that shard), else None
+        """
+        for rested in rested_by_shard:
+            for order_id, index in rested.items():
+                orders = new_ids[order_id]
+                if len(orders) > 1 and any(later > index for later, _ in orders):
+                    return ValueError(f"Already Seen OrderId {order_id}. "
+                                      "Please ensure that a new OrderId has been generated")
+        return None
+
+    def close(self):
+        """Stops the worker processes"""
+        for shard in self._shards:
+            try:
+                if self._processes:
+                    shard.send(None)
+                shard.close()
+            except (OSError, EOFError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+        self._shards, self._processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
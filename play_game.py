@@ -46,6 +46,7 @@ num_timestamps = 10000
 
 # Main game execution
 player_pnl = run_game(PlayerAlgorithm, num_timestamps, products, print_limits=False, visualiser=True, give_positions=False, progress_bar=True)
+# For diagnostics (profile=True, time_bots=True, ...) call runner.run_game instead; its .pnl is this value
 
 print(player_pnl)
 
@@ -0,0 +1,341 @@
+"""
+Lightweight timing instrumentation for game runs.
+
+PhaseProfiler keeps one counter per phase (a list of call durations in nanoseconds) so the
+overhead per call is two perf_counter_ns() calls and a list append. Everything else
+(percentiles, totals) is only computed when the report is asked for at the end of the run.
+
+MemoryProfiler is the (much heavier, opt-in) memory counterpart: periodic snapshots of how big each
+of the engine's growing structures is, next to tracemalloc's total.
+"""
+import gc
+import sys
+import tracemalloc
+from bisect import bisect_right
+from time import perf_counter_ns
+from typing import Dict, List
+
+import numpy as np
+
+
+class PhaseProfiler:
+    """
+    Collects per-phase call durations and tick boundaries for one run
+    """
+    def __init__(self):
+        self.durations: Dict[str, List[int]] = {}  # phase name -> durations in ns
+        self.tick_starts: List[int] = []
+        self.run_start = None
+        self.run_end = None
+
+    def start_run(self):
+        self.run_start = perf_counter_ns()
+
+    def end_run(self):
+        self.run_end = perf_counter_ns()
+
+    def mark_tick(self):
+        """Called once at the start of every timestamp"""
+        self.tick_starts.append(perf_counter_ns())
+
+    def add(self, phase: str, duration_ns: int):
+        counter = self.durations.get(phase)
+        if counter is None:
+            counter = self.durations[phase] = []
+        counter.append(duration_ns)
+
+    def wrap(self, phase: str, func):
+        """Returns func wrapped so that every call is timed under phase"""
+        add = self.add
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(phase, perf_counter_ns() - start)
+
+        return timed
+
+    def report(self) -> Dict:
+        """
+        Aggregates the counters. Times are in milliseconds.
+
+        Anything the engine does that is not hooked (conversions, fines, recording the game state)
+        shows up as the "engine_other" phase: total run time minus the measured phases.
+        """
+        end = self.run_end if self.run_end is not None else perf_counter_ns()
+        start = self.run_start if self.run_start is not None else end
+        total_ms = (end - start) / 1e6
+
+        phases = {}
+        measured_ms = 0.0
+        for phase, durations in self.durations.items():
+            arr = np.asarray(durations, dtype=np.int64) / 1e6
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            phases[phase] = {
+                "calls": len(arr),
+                "total_ms": float(arr.sum()),
+                "mean_ms": float(arr.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(arr.max()),
+                "share": float(arr.sum() / total_ms) if total_ms > 0 else 0.0,
+            }
+            measured_ms += float(arr.sum())
+
+        other_ms = max(total_ms - measured_ms, 0.0)
+        phases["engine_other"] = {
+            "calls": len(self.tick_starts),
+            "total_ms": other_ms,
+            "share": other_ms / total_ms if total_ms > 0 else 0.0,
+        }
+
+        ticks = len(self.tick_starts)
+        tick_ms = np.diff(np.asarray(self.tick_starts + [end], dtype=np.int64)) / 1e6 if ticks else np.zeros(0)
+        return {
+            "total_ms": total_ms,
+            "ticks": ticks,
+            "ticks_per_sec": ticks / (total_ms / 1e3) if total_ms > 0 else 0.0,
+            "tick_p50_ms": float(np.percentile(tick_ms, 50)) if ticks else 0.0,
+            "tick_p99_ms": float(np.percentile(tick_ms, 99)) if ticks else 0.0,
+            "phases": phases,
+        }
+
+
+def format_report(report: Dict) -> str:
+    """Pretty prints the output of PhaseProfiler.report()"""
+    lines = [
+        f"Run time: {report['total_ms'] / 1e3:.2f}s over {report['ticks']} ticks "
+        f"({report['ticks_per_sec']:.1f} ticks/sec, tick p50 {report['tick_p50_ms']:.3f}ms, p99 {report['tick_p99_ms']:.3f}ms)",
+        f"{'phase':<40}{'calls':>9}{'total ms':>12}{'share':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+    ]
+    ordered = sorted(report["phases"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    for phase, stats in ordered:
+        percentiles = "".join(f"{stats[key]:>10.3f}" if key in stats else f"{'':>10}"
+                              for key in ("p50_ms", "p95_ms", "p99_ms"))
+        lines.append(f"{phase:<40}{stats['calls']:>9}{stats['total_ms']:>12.1f}{stats['share']:>8.1%}{percentiles}")
+    return "\n".join(lines)
+
+
+class LatencyHistogram:
+    """
+    Fixed log2 buckets from 1us to ~16s. Recording a call is a bisect plus an increment, so it
+    is cheap enough to leave on for every call of every bot.
+    """
+    EDGES_US = [2 ** k for k in range(25)]  # upper bucket edges in microseconds, last bucket is open
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES_US) + 1)
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int):
+        self.counts[bisect_right(self.EDGES_US, duration_ns / 1e3)] += 1
+        self.calls += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate (in ms) of the q-th percentile call, interpolated within the bucket that holds it (on a
+        log scale, like the buckets). The open last bucket is interpolated up to the slowest call
+        """
+        if not self.calls:
+            return 0.0
+        target = q / 100 * self.calls
+        running = 0
+        for idx, count in enumerate(self.counts):
+            if count and running + count >= target:
+                lower = self.EDGES_US[idx - 1] * 1e3 if idx > 0 else 0.0
+                upper = self.EDGES_US[idx] * 1e3 if idx < len(self.EDGES_US) else self.max_ns
+                upper = min(upper, self.max_ns)
+                lower = min(lower, upper)
+                fraction = (target - running) / count
+                if lower > 0:  # buckets are log2-spaced, so interpolate geometrically
+                    return lower * (upper / lower) ** fraction / 1e6
+                return fraction * upper / 1e6
+            running += count
+        return self.max_ns / 1e6
+
+    def summary(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / 1e6 / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ns / 1e6,
+            "buckets_us": {f"<{edge}": count for edge, count in zip(self.EDGES_US, self.counts) if count},
+            "overflow": self.counts[-1],
+        }
+
+
+class BotTimer:
+    """
+    Per-bot latency histograms for send_messages and process_trades, plus an optional per-tick
+    compute budget. Time spent in both methods during one tick counts towards the budget.
+    """
+    def __init__(self, budget_ms: float = None):
+        self.budget_ns = int(budget_ms * 1e6) if budget_ms is not None else None
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}  # bot name -> method -> histogram
+        self.tick_spent: Dict[str, int] = {}  # bot name -> ns spent in the current tick
+        self.over_budget: Dict[str, List[int]] = {}  # bot name -> ticks where the budget was exceeded
+        self.skipped: Dict[str, int] = {}
+        self.tick = -1
+
+    def new_tick(self, tick: int = None):
+        """Starts a tick's budget. tick is the game's loop index, counted up from the last one if not given"""
+        self.tick = self.tick + 1 if tick is None else tick
+        self.tick_spent.clear()
+
+    def record(self, bot: str, method: str, duration_ns: int) -> bool:
+        """Records one call and returns True if it pushed the bot over its budget for this tick"""
+        methods = self.histograms.get(bot)
+        if methods is None:
+            methods = self.histograms[bot] = {"send_messages": LatencyHistogram(), "process_trades": LatencyHistogram()}
+        methods[method].record(duration_ns)
+
+        if self.budget_ns is None:
+            return False
+        before = self.tick_spent.get(bot, 0)
+        spent = self.tick_spent[bot] = before + duration_ns
+        if spent > self.budget_ns >= before:  # only flag the first overrun in a tick
+            self.over_budget.setdefault(bot, []).append(self.tick)
+            return True
+        return spent > self.budget_ns
+
+    def report(self) -> Dict:
+        report = {}
+        for bot, methods in self.histograms.items():
+            ticks = self.over_budget.get(bot, [])
+            report[bot] = {
+                "send_messages": methods["send_messages"].summary(),
+                "process_trades": methods["process_trades"].summary(),
+                "over_budget_ticks": len(ticks),
+                "first_over_budget": ticks[:10],
+                "skipped": self.skipped.get(bot, 0),
+            }
+        return report
+
+
+def format_bot_timings(report: Dict, budget_ms: float = None) -> str:
+    """Pretty prints the output of BotTimer.report(), slowest bot first"""
+    lines = [f"{'bot':<28}{'method':<16}{'calls':>9}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+             + (f"{'over budget':>13}{'skipped':>9}" if budget_ms is not None else "")]
+    ordered = sorted(report.items(), key=lambda kv: kv[1]["send_messages"]["total_ms"], reverse=True)
+    for bot, stats in ordered:
+        for method in ("send_messages", "process_trades"):
+            hist = stats[method]
+            line = (f"{bot:<28}{method:<16}{hist['calls']:>9}{hist['mean_ms']:>10.3f}"
+                    f"{hist['p50_ms']:>10.3f}{hist['p99_ms']:>10.3f}{hist['max_ms']:>10.3f}")
+            if budget_ms is not None and method == "send_messages":
+                line += f"{stats['over_budget_ticks']:>13}{stats['skipped']:>9}"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def deep_sizeof(root, seen: set) -> int:
+    """
+    Bytes of root and everything reachable from it that isn't in seen (which is updated), so sizing
+    several structures with one seen set counts shared objects once. Classes, modules and functions
+    are not followed.
+    """
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_FOLLOWED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if not isinstance(obj, _LEAVES):
+            stack.extend(gc.get_referents(obj))
+    return total
+
+
+_NOT_FOLLOWED = (type, type(sys), type(deep_sizeof), type(len))
+_LEAVES = (str, bytes, int, float, bool, complex, type(None))
+
+
+class MemoryProfiler:
+    """
+    Every snapshot() sizes the given structures (name -> object) with deep_sizeof and records tracemalloc's
+    traced total, so the report can attribute growth to each structure per 1000 ticks. Sizing walks the
+    structures, so snapshots are expensive: take them every few thousand ticks, not every tick.
+    """
+    def __init__(self, top_sites: int = 10):
+        self.top_sites = top_sites
+        self.ticks: List[int] = []
+        self.sizes: Dict[str, List[int]] = {}
+        self.traced: List[int] = []
+        self._first = None
+        self._last = None
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def snapshot(self, tick: int, structures: Dict[str, object]):
+        # tracemalloc first, so the sizing walk's own bookkeeping isn't in what it measures
+        if tracemalloc.is_tracing():
+            self.traced.append(tracemalloc.get_traced_memory()[0])
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                                   tracemalloc.Filter(False, __file__)])
+            if self._first is None:
+                self._first = snapshot
+            else:
+                self._last = snapshot
+        seen = {id(self.ticks), id(self.sizes), id(self.traced)}
+        self.ticks.append(tick)
+        for name, obj in structures.items():
+            self.sizes.setdefault(name, []).append(deep_sizeof(obj, seen) if obj is not None else 0)
+
+    def report(self) -> Dict:
+        """Sizes in MB at the last snapshot and growth per 1000 ticks (slope of a linear fit)"""
+        ticks = np.asarray(self.ticks, dtype=float)
+
+        def growth(values):
+            if len(values) < 2 or np.ptp(ticks) == 0:
+                return 0.0
+            return float(np.polyfit(ticks, np.asarray(values, dtype=float) / 1e6, 1)[0] * 1000)
+
+        structures = {name: {"mb": values[-1] / 1e6, "mb_per_1000_ticks": growth(values)}
+                      for name, values in self.sizes.items() if values}
+        report = {"snapshots": len(self.ticks), "ticks": self.ticks, "structures": structures}
+        if self.traced:
+            attributed = np.sum([values for values in self.sizes.values()], axis=0)
+            report["traced"] = {"mb": self.traced[-1] / 1e6, "mb_per_1000_ticks": growth(self.traced)}
+            report["unattributed"] = {"mb": (self.traced[-1] - attributed[-1]) / 1e6,
+                                      "mb_per_1000_ticks": growth(np.asarray(self.traced) - attributed)}
+        if self._first is not None and self._last is not None:
+            diffs = self._last.compare_to(self._first, "lineno")[:self.top_sites]
+            report["top_growth_sites"] = [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                                           stat.size_diff / 1e6) for stat in diffs]
+        return report
+
+
+def format_memory_report(report: Dict) -> str:
+    """Pretty prints the output of MemoryProfiler.report(), fastest growing structure first"""
+    lines = [f"Memory over {report['snapshots']} snapshots (ticks {report['ticks'][:1]}..{report['ticks'][-1:]})",
+             f"{'structure':<32}{'MB':>10}{'MB / 1000 ticks':>18}"]
+    ordered = sorted(report["structures"].items(), key=lambda kv: kv[1]["mb_per_1000_ticks"], reverse=True)
+    for key in ("traced", "unattributed"):
+        if key in report:
+            ordered.append((f"({key})", report[key]))
+    for name, stats in ordered:
+        lines.append(f"{name:<32}{stats['mb']:>10.2f}{stats['mb_per_1000_ticks']:>18.3f}")
+    if report.get("top_growth_sites"):
+        lines.append("Largest growth by allocation site:")
+        lines.extend(f"  {site:<60}{mb:>10.2f} MB" for site, mb in report["top_growth_sites"])
+    return "\n".join(lines)
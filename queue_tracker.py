@@ -0,0 +1,154 @@
+"""
+Queue position of resting orders, maintained from the exchange's add / fill / cancel events.
+
+The Exchange keeps each price level in FIFO order and only ever fills from the front of the book. So
+how much size is ahead of an order is what was resting at its price when it arrived, minus everything
+filled at that level since, minus cancellations of orders that were ahead of it. All of these are
+updated per event, so a query is O(1) and the book never has to be walked.
+
+Orders of every bot are counted (they make up the queue), but the ahead/behind bookkeeping is only
+kept for watched bots, so a cancel costs O(watched orders at that level).
+
+    run_game(MyAlgo, num_timestamps, products, track_queues=True)   # sets self.queue_tracker on the player
+
+    ahead, behind = self.queue_tracker.position(order_id)
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class _Level:
+    __slots__ = ("total", "filled", "next_seq", "watched")
+
+    def __init__(self):
+        self.total = 0       # resting size at this price
+        self.filled = 0      # size filled here since the level was created
+        self.next_seq = 0    # arrival order within the level
+        self.watched = []    # entries of watched orders resting here
+
+
+class _Entry:
+    __slots__ = ("order_id", "bot_name", "key", "level", "seq", "remaining",
+                 "ahead_at_entry", "filled_at_entry", "cancelled_ahead")
+
+    def __init__(self, order_id, bot_name, key, level, seq, remaining):
+        self.order_id = order_id
+        self.bot_name = bot_name
+        self.key = key
+        self.level = level
+        self.seq = seq
+        self.remaining = remaining
+        self.ahead_at_entry = None  # only set for watched orders
+        self.filled_at_entry = 0
+        self.cancelled_ahead = 0
+
+
+class QueueTracker:
+    """
+    Incremental queue positions. Feed it on_add / on_fill / on_cancel (runner.run_game(track_queues=True)
+    does this by hooking the Exchange) and query position(order_id) for watched bots' orders.
+    """
+    def __init__(self, watch: Iterable[str] = ()):
+        self.watched_bots = set(watch)
+        self.levels: Dict[tuple, _Level] = {}   # (ticker, side, price) -> level
+        self.orders: Dict[int, _Entry] = {}     # resting order_id -> entry
+        self.watched_orders: Dict[str, Dict[int, _Entry]] = {}  # watched bot -> its resting order_id -> entry
+
+    def watch(self, bot_name: str):
+        """Track positions for bot_name's orders added from now on"""
+        self.watched_bots.add(bot_name)
+
+    # ===== Events =====
+    def on_add(self, order_id: int, ticker: str, side: str, price: float, size: int, bot_name: str):
+        """An order started resting at the back of its price level (side is "Bids" or "Asks")"""
+        key = (ticker, side, price)
+        level = self.levels.get(key)
+        if level is None:
+            level = self.levels[key] = _Level()
+        entry = _Entry(order_id, bot_name, key, level, level.next_seq, size)
+        level.next_seq += 1
+        if bot_name in self.watched_bots:
+            entry.ahead_at_entry = level.total
+            entry.filled_at_entry = level.filled
+            level.watched.append(entry)
+            self.watched_orders.setdefault(bot_name, {})[order_id] = entry
+        level.total += size
+        self.orders[order_id] = entry
+
+    def on_fill(self, order_id: int, size: int):
+        """size of resting order order_id traded (always the front of its level)"""
+        entry = self.orders.get(order_id)
+        if entry is None:
+            return
+        level = entry.level
+        level.filled += size
+        level.total -= size
+        entry.remaining -= size
+        if entry.remaining <= 0:
+            self._forget(entry)
+
+    def on_cancel(self, order_id: int):
+        """Resting order order_id was removed from the book"""
+        entry = self.orders.get(order_id)
+        if entry is None:
+            return
+        level = entry.level
+        level.total -= entry.remaining
+        for other in level.watched:
+            if other.seq > entry.seq:
+                other.cancelled_ahead += entry.remaining
+        self._forget(entry)
+
+    def _forget(self, entry: _Entry):
+        del self.orders[entry.order_id]
+        level = entry.level
+        if entry.ahead_at_entry is not None:
+            level.watched.remove(entry)
+            del self.watched_orders[entry.bot_name][entry.order_id]
+        if level.total <= 0 and not level.watched:
+            del self.levels[entry.key]
+
+    # ===== Queries =====
+    def size_ahead(self, order_id: int) -> Optional[int]:
+        """Size that has to trade before order_id starts filling (None if it isn't a watched live order)"""
+        entry = self.orders.get(order_id)
+        if entry is None or entry.ahead_at_entry is None:
+            return None
+        ahead = entry.ahead_at_entry - (entry.level.filled - entry.filled_at_entry) - entry.cancelled_ahead
+        return max(ahead, 0)
+
+    def size_behind(self, order_id: int) -> Optional[int]:
+        """Size resting at the same price that arrived after order_id"""
+        ahead = self.size_ahead(order_id)
+        if ahead is None:
+            return None
+        entry = self.orders[order_id]
+        return entry.level.total - ahead - entry.remaining
+
+    def position(self, order_id: int) -> Optional[Tuple[int, int]]:
+        """(size ahead, size behind) of a watched live order, None otherwise"""
+        ahead = self.size_ahead(order_id)
+        if ahead is None:
+            return None
+        entry = self.orders[order_id]
+        return ahead, entry.level.total - ahead - entry.remaining
+
+    def remaining(self, order_id: int) -> Optional[int]:
+        entry = self.orders.get(order_id)
+        return entry.remaining if entry is not None else None
+
+    def level_size(self, ticker: str, side: str, price: float) -> int:
+        level = self.levels.get((ticker, side, price))
+        return level.total if level is not None else 0
+
+    def live_orders(self, bot_name: str) -> Dict[int, dict]:
+        """
+        order_id -> {ticker, side, price, remaining, ahead, behind} for a watched bot's resting orders, in the
+        order they were added. Only reads that bot's own orders, never the other levels
+        """
+        out = {}
+        for order_id, entry in self.watched_orders.get(bot_name, {}).items():
+            ahead, behind = self.position(order_id)
+            ticker, side, price = entry.key
+            out[order_id] = {"ticker": ticker, "side": side, "price": price,
+                             "remaining": entry.remaining, "ahead": ahead, "behind": behind}
+        return out
@@ -0,0 +1,390 @@
+"""
+Post-run statistics computed from the exported logs, without the visualiser.
+
+Everything is vectorized over the log columns, so one run takes milliseconds and a whole directory of
+runs (one sub-directory per run, e.g. from a seed sweep) can be summarised in parallel:
+
+    from run_analysis import analyze_run, analyze_runs
+    stats = analyze_run('visualizer', products=products)
+    table = analyze_runs('runs/', products=products)   # one row per run, as a DataFrame
+
+Parquet logs (run_game(..., columnar_export=True)) are used when present, otherwise the CSVs.
+
+The official score (mean PnL - 0.1 * std over the test runs) comes with bootstrap confidence intervals,
+so two bots are only called different when the interval of their score difference excludes zero:
+
+    from run_analysis import bootstrap_score, compare_scores
+    bootstrap_score(pnls)                          # {'score', 'low', 'high', 'std_error', 'resamples'}
+    compare_scores(pnls_a, pnls_b)['differs']
+
+Fill quality is measured with markouts: every player fill against the mid some timestamps later.
+
+    markout_summary(fill_markouts(load_run('visualizer'), horizons=(1, 10, 100)))
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+RECORD_FILES = ('log_game_record.parquet', 'log_game_record.csv')
+
+
+def load_run(directory):
+    """{'game_record': DataFrame, 'trades': DataFrame} for one exported run (trades left out if missing)"""
+    import pandas as pd
+    from visualizer.data_export import TRADES_DTYPES, load_columnar
+
+    frames = load_columnar(directory)
+    frames.pop('orderbook', None)  # not needed for any of the statistics
+    csv_files = {'game_record': ('log_game_record.csv', None), 'trades': ('log_trades_data.csv', TRADES_DTYPES)}
+    for key, (name, dtypes) in csv_files.items():
+        path = os.path.join(directory, name)
+        if key not in frames and os.path.exists(path):
+            frames[key] = pd.read_csv(path, dtype=dtypes)
+    if 'game_record' not in frames:
+        raise FileNotFoundError(f"No log_game_record.csv or .parquet in {directory}")
+    return frames
+
+
+def _player_name(record):
+    names = [col[:-len('_Cash')] for col in record.columns if col.endswith('_Cash')]
+    if not names:
+        raise ValueError("Game record has no <player>_Cash column")
+    return names[0]
+
+
+def _column(record, name):
+    import pandas as pd
+    return pd.to_numeric(record[name], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+
+
+def _limits(products):
+    """ticker -> (pos_limit, fine) from a list of base.Product (or an already built dict)"""
+    if products is None:
+        return {}
+    if isinstance(products, dict):
+        return products
+    return {product.ticker: (product.pos_limit, product.fine) for product in products}
+
+
+def _products(record, player_name):
+    prefix = f'{player_name}_'
+    return [col[len(prefix):] for col in record.columns
+            if col.startswith(prefix) and col[len(prefix):] in record.columns]
+
+
+def max_drawdown(pnl):
+    """Largest fall from a running peak, in dollars (same as the visualiser's Max Drawdown)"""
+    pnl = np.asarray(pnl, dtype=float)
+    if not len(pnl):
+        return 0.0
+    return float((np.maximum.accumulate(pnl) - pnl).max())
+
+
+def _mids(record, product):
+    """Mid price per row, blanks carried forward from the last known mid"""
+    import pandas as pd
+    return pd.to_numeric(record[product], errors='coerce').ffill().fillna(0.0).to_numpy(dtype=float)
+
+
+def pnl_path(record, player_name=None):
+    """Mark-to-market PnL per timestamp: cash plus every position valued at that timestamp's mid"""
+    player_name = player_name or _player_name(record)
+    pnl = _column(record, f'{player_name}_Cash')
+    for product in _products(record, player_name):
+        pnl = pnl + _column(record, f'{player_name}_{product}') * _mids(record, product)
+    return pnl
+
+
+def run_stats(frames, products=None, orders_submitted=None):
+    """
+    Statistics of one run from its frames (see load_run). Per-product values are keyed "stat[TICKER]".
+
+    products: list of base.Product (or {ticker: (pos_limit, fine)}), needed for time_at_limit and fines
+    orders_submitted: total volume the player sent, needed for fill_ratio (the logs only have the fills)
+
+    sharpe is the mean over the std of the per-timestamp PnL changes, scaled by sqrt(timestamps) so runs
+    of different lengths are comparable. Fines are recomputed the way PlayerAlgorithm.update_fines
+    charges them: fine * (|position| - limit) for every timestamp spent over the limit.
+    """
+    record = frames['game_record']
+    player_name = _player_name(record)
+    tickers = _products(record, player_name)
+    ticks = len(record)
+
+    pnl = pnl_path(record, player_name)
+    changes = np.diff(pnl)
+    std = changes.std() if len(changes) > 1 else 0.0
+    total = float(pnl[-1]) if ticks else 0.0
+    stats = {
+        'player': player_name,
+        'timestamps': ticks,
+        'total_pnl': total,
+        'max_drawdown': max_drawdown(pnl),
+        'pnl_per_1000': total / ticks * 1000 if ticks else 0.0,
+        'sharpe': float(changes.mean() / std * np.sqrt(len(changes))) if std > 0 else 0.0,
+    }
+
+    trades = frames.get('trades')
+    filled = 0
+    if trades is not None and len(trades):
+        aggressor = (trades['agg_bot'] == player_name).to_numpy()
+        resting = (trades['rest_bot'] == player_name).to_numpy()
+        mine = aggressor | resting
+        size = trades['size'].to_numpy(dtype=float)
+        notional = size * trades['price'].to_numpy(dtype=float)
+        ticker = trades['ticker'].astype(str).to_numpy()
+        filled = float(size[mine].sum())
+        stats['fills'] = int(mine.sum())
+        stats['volume'] = filled
+        stats['notional'] = float(notional[mine].sum())
+        stats['passive_share'] = float(size[resting].sum() / filled) if filled else 0.0
+        for product in tickers:
+            stats[f'volume[{product}]'] = float(size[mine & (ticker == product)].sum())
+    stats['fill_ratio'] = filled / orders_submitted if orders_submitted else float('nan')
+
+    limits = _limits(products)
+    total_fines = 0.0
+    for product in tickers:
+        if product not in limits or limits[product][0] is None:
+            continue
+        limit, fine = limits[product]
+        excess = np.abs(_column(record, f'{player_name}_{product}')) - limit
+        stats[f'time_at_limit[{product}]'] = float((excess >= 0).mean()) if ticks else 0.0
+        fines = float(np.clip(excess, 0, None).sum() * (fine or 0))
+        stats[f'fines[{product}]'] = fines
+        total_fines += fines
+    if limits:
+        stats['fines'] = total_fines
+    return stats
+
+
+def analyze_run(directory, products=None, orders_submitted=None):
+    """run_stats for the logs in directory, with the directory under 'run'"""
+    stats = run_stats(load_run(directory), products, orders_submitted)
+    return {'run': directory, **stats}
+
+
+def find_runs(root):
+    """directory itself if it holds a run's logs, plus every sub-directory that does, sorted"""
+    candidates = [root] + sorted(os.path.join(root, name) for name in os.listdir(root)
+                                 if os.path.isdir(os.path.join(root, name)))
+    return [path for path in candidates
+            if any(os.path.exists(os.path.join(path, name)) for name in RECORD_FILES)]
+
+
+def _analyze(args):
+    directory, limits = args
+    return analyze_run(directory, limits)
+
+
+def analyze_runs(root, products=None, workers=None):
+    """
+    One row of run_stats per run under root, as a DataFrame. Runs are processed in a process pool
+    (workers=1 does them in this process).
+    """
+    import pandas as pd
+    runs = find_runs(root)
+    jobs = [(run, _limits(products)) for run in runs]
+    if workers == 1 or len(jobs) <= 1:
+        rows = [_analyze(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_analyze, jobs))
+    return pd.DataFrame(rows)
+
+
+SCORE_STD_WEIGHT = 0.1
+RESAMPLE_CHUNK = 1000  # resamples drawn per job, so memory stays flat and chunks can run in a pool
+
+
+def score(pnls, axis=-1):
+    """Score = mean PnL - 0.1 * std of the runs (population std, like np.std)"""
+    pnls = np.asarray(pnls, dtype=float)
+    return pnls.mean(axis=axis) - SCORE_STD_WEIGHT * pnls.std(axis=axis)
+
+
+def _draw_runs(pnls, rng, n):
+    """n resampled sets of runs: the runs drawn with replacement"""
+    return pnls[rng.integers(0, len(pnls), size=(n, len(pnls)))]
+
+
+def _draw_blocks(blocks, runs, blocks_per_run, rng, n):
+    """n resampled sets of runs, each run the sum of blocks drawn with replacement from all runs' blocks"""
+    return blocks[rng.integers(0, len(blocks), size=(n, runs, blocks_per_run))].sum(axis=-1)
+
+
+def _path_blocks(paths, block_size):
+    """PnL made in each block of block_size timestamps, pooled over all runs, and blocks per run"""
+    blocks, counts = [], []
+    for path in paths:
+        path = np.asarray(path, dtype=float)
+        changes = np.diff(path, prepend=0.0)  # first row is the PnL made by the first timestamp
+        starts = np.arange(0, len(changes), block_size)
+        blocks.append(np.add.reduceat(changes, starts))
+        counts.append(len(starts))
+    return np.concatenate(blocks), int(round(np.mean(counts)))
+
+
+def _chunk_scores(draw, n, seed):
+    return score(draw(np.random.default_rng(seed), n))
+
+
+def _resampled_scores(draw, resamples, seed, workers, pool):
+    """Scores of `resamples` draws. Chunks get their own seeds, so results don't depend on workers"""
+    sizes = [RESAMPLE_CHUNK] * (resamples // RESAMPLE_CHUNK)
+    if resamples % RESAMPLE_CHUNK:
+        sizes.append(resamples % RESAMPLE_CHUNK)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(sizes))
+    if not workers or workers == 1 or len(sizes) == 1:
+        return np.concatenate([_chunk_scores(draw, n, s) for n, s in zip(sizes, seeds)])
+    if pool not in ("thread", "process"):
+        raise ValueError(f"Invalid pool: {pool}. Must be 'thread' or 'process'.")
+    executor = ThreadPoolExecutor if pool == "thread" else ProcessPoolExecutor
+    with executor(max_workers=workers) as ex:
+        return np.concatenate(list(ex.map(_chunk_scores, [draw] * len(sizes), sizes, seeds)))
+
+
+def _sampler(values, block_size):
+    """(final PnL per run, draw function) for per-run PnLs, or for PnL paths when block_size is given"""
+    if block_size is None:
+        pnls = np.asarray(values, dtype=float)
+        return pnls, partial(_draw_runs, pnls)
+    pnls = np.array([np.asarray(path, dtype=float)[-1] for path in values])
+    blocks, blocks_per_run = _path_blocks(values, block_size)
+    return pnls, partial(_draw_blocks, blocks, len(pnls), blocks_per_run)
+
+
+def _interval(samples, confidence):
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(samples, [tail, 1 - tail])
+    return float(low), float(high)
+
+
+def bootstrap_score(pnls, resamples=10000, confidence=0.95, block_size=None, seed=None, workers=None, pool="thread"):
+    """
+    Percentile bootstrap confidence interval of the score.
+
+    pnls: final PnL of every run, or with block_size, every run's PnL path (e.g. pnl_path). Paths
+          are cut into blocks of block_size timestamps and runs are rebuilt from blocks drawn across all
+          runs, which keeps the short-term autocorrelation of the PnL while giving far more distinct
+          resamples than 20 runs do
+    workers: run the resample chunks in a pool ("thread" or "process") of this many workers
+    """
+    values, draw = _sampler(pnls, block_size)
+    samples = _resampled_scores(draw, resamples, seed, workers, pool)
+    low, high = _interval(samples, confidence)
+    return {'score': float(score(values)), 'low': low, 'high': high,
+            'std_error': float(samples.std()), 'resamples': resamples}
+
+
+def compare_scores(pnls_a, pnls_b, resamples=10000, confidence=0.95, block_size=None, seed=None, workers=None,
+                   pool="thread"):
+    """
+    Bootstrap of score(a) - score(b) with each candidate's runs resampled independently. 'differs' is True
+    when the confidence interval of the difference excludes zero.
+    """
+    values_a, draw_a = _sampler(pnls_a, block_size)
+    values_b, draw_b = _sampler(pnls_b, block_size)
+    seed_a, seed_b = np.random.SeedSequence(seed).spawn(2)
+    difference = (_resampled_scores(draw_a, resamples, seed_a, workers, pool)
+                  - _resampled_scores(draw_b, resamples, seed_b, workers, pool))
+    low, high = _interval(difference, confidence)
+    return {'difference': float(score(values_a) - score(values_b)), 'low': low, 'high': high,
+            'p_a_better': float((difference > 0).mean()), 'differs': low > 0 or high < 0}
+
+
+MARKOUT_HORIZONS = (1, 5, 10, 50, 100)
+
+
+def fill_markouts(frames, horizons=MARKOUT_HORIZONS):
+    """
+    One row per player fill with its markouts, from the trades log and the game record's mid prices.
+
+    Signs are from the player's side (+1 bought, -1 sold), all values per unit:
+        edge            sign * (mid before the fill - price): what the fill earned against the prevailing mid
+        markout[k]      sign * (mid k timestamps later - price): what it is worth once the price has moved
+        adverse[k]      edge - markout[k]: how much of the edge the following price move took away
+
+    The mid before the fill is the last recorded mid strictly before the fill's timestamp, the mid k later
+    the last one at or before timestamp + k, both found with searchsorted on the record's Loop column.
+    Fills without a mid k timestamps later (end of the run) get NaN for that horizon, and fills without an
+    earlier mid (the first recorded timestamp) get NaN edge and adverse selection.
+    """
+    import pandas as pd
+    record, trades = frames['game_record'], frames.get('trades')
+    player_name = _player_name(record)
+    columns = ['ticker', 'timestamp', 'side', 'liquidity', 'price', 'size', 'edge']
+    columns += [f'{name}[{k}]' for k in horizons for name in ('markout', 'adverse')]
+    if trades is None or not len(trades):
+        return pd.DataFrame(columns=columns)
+
+    aggressor = (trades['agg_bot'] == player_name).to_numpy()
+    mine = aggressor | (trades['rest_bot'] == player_name).to_numpy()
+    fills = trades[mine]
+    aggressor = aggressor[mine]
+    # trade side is the aggressor's, so a resting player order was on the other side
+    aggressor_buys = (fills['side'].astype(str).str.lower() == 'buy').to_numpy()
+    sign = np.where(aggressor_buys == aggressor, 1.0, -1.0)
+
+    timestamps = fills['timestamp'].to_numpy(dtype=np.int64)
+    prices = fills['price'].to_numpy(dtype=float)
+    tickers = fills['ticker'].astype(str).to_numpy()
+    loops = _column(record, 'Loop').astype(np.int64)
+    last = len(loops) - 1
+
+    out = {
+        'ticker': tickers, 'timestamp': timestamps, 'side': np.where(sign > 0, 'buy', 'sell'),
+        'liquidity': np.where(aggressor, 'aggressive', 'passive'), 'price': prices,
+        'size': fills['size'].to_numpy(dtype=float), 'edge': np.full(len(fills), np.nan),
+    }
+    for k in horizons:
+        out[f'markout[{k}]'] = np.full(len(fills), np.nan)
+        out[f'adverse[{k}]'] = np.full(len(fills), np.nan)
+
+    for product in np.unique(tickers):
+        if product not in record.columns:
+            continue
+        rows = tickers == product
+        mids = _mids(record, product)
+        before = np.searchsorted(loops, timestamps[rows], side='left') - 1
+        edge = np.where(before >= 0, sign[rows] * (mids[np.clip(before, 0, last)] - prices[rows]), np.nan)
+        out['edge'][rows] = edge
+        for k in horizons:
+            later = np.searchsorted(loops, timestamps[rows] + k, side='right') - 1
+            in_run = timestamps[rows] + k <= loops[-1]
+            markout = np.where(in_run, sign[rows] * (mids[np.clip(later, 0, last)] - prices[rows]), np.nan)
+            out[f'markout[{k}]'][rows] = markout
+            out[f'adverse[{k}]'][rows] = edge - markout
+    return pd.DataFrame(out, columns=columns)
+
+
+def markout_summary(fills, by=('ticker', 'side')):
+    """
+    Size-weighted averages of fill_markouts per group, plus fills, volume and total dollar markout per
+    horizon. realized_spread[k] is the markout in the usual full-spread convention, 2 * markout[k], next
+    to effective_spread = 2 * edge.
+    """
+    import pandas as pd
+    by = list(by)
+    horizons = [col[len('markout['):-1] for col in fills.columns if col.startswith('markout[')]
+    weighted = fills[by].copy()
+    weighted['size'] = fills['size']
+    value_columns = ['edge'] + [f'{name}[{k}]' for k in horizons for name in ('markout', 'adverse')]
+    for col in value_columns:
+        weighted[col] = fills[col] * fills['size']
+        weighted[f'{col}_size'] = np.where(fills[col].notna(), fills['size'], 0.0)
+
+    groups = weighted.groupby(by, observed=True)
+    sums = groups.sum(min_count=1)
+    summary = pd.DataFrame({'fills': groups.size(), 'volume': sums['size']})
+    summary['effective_spread'] = 2 * sums['edge'] / sums['edge_size']
+    for k in horizons:
+        summary[f'markout[{k}]'] = sums[f'markout[{k}]'] / sums[f'markout[{k}]_size']
+        summary[f'markout_dollars[{k}]'] = sums[f'markout[{k}]']
+        summary[f'adverse[{k}]'] = sums[f'adverse[{k}]'] / sums[f'adverse[{k}]_size']
+        summary[f'realized_spread[{k}]'] = 2 * summary[f'markout[{k}]']
+    return summary
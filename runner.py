@@ -0,0 +1,538 @@
+"""
+Wrapper around the engine's run_game with optional diagnostics.
+
+The game loop itself ships compiled in bin/ so it can't be edited. Instead, everything here hooks
+the parts of a run that we do have the source for (bot classes, the Exchange in base.py and the
+exporter in visualizer/data_export.py) for the duration of one run_game call, then restores them.
+
+    from runner import run_game
+    result = run_game(PlayerAlgorithm, num_timestamps, products, profile=True, visualiser=False)
+    print(result.pnl)
+"""
+import gc
+import importlib
+import inspect
+import os
+import platform
+import sys
+from time import perf_counter_ns
+
+from async_bots import AsyncBotScheduler
+from book_history import SnapshotBuilder
+from book_view import BookVersions, BookView
+from profiler import (BotTimer, MemoryProfiler, PhaseProfiler, format_bot_timings, format_memory_report,
+                      format_report)
+from queue_tracker import QueueTracker
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_engine_run_game():
+    """Import run_game from the compiled engine for this OS (same lookup as play_game.py)"""
+    folders = {"Linux": "linux_version", "Windows": "windows_version", "Darwin": "mac_version"}
+    if platform.system() not in folders:
+        raise ValueError("Unsupported OS")
+    folder = folders[platform.system()]
+
+    engine_dir = os.path.join(PROJECT_ROOT, "bin", folder)
+    if engine_dir not in sys.path:
+        sys.path.insert(0, engine_dir)
+    module = __import__(f"bin.{folder}.game_setup", fromlist=["run_game"])
+    return module.run_game
+
+
+def project_modules():
+    """Loaded modules that live inside this project (including the compiled engine)"""
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.abspath(path).startswith(PROJECT_ROOT + os.sep):
+            yield module
+
+
+def bot_classes(player_class):
+    """Every loaded bot class (anything with send_messages and process_trades), player first"""
+    seen = [player_class]
+    for module in project_modules():
+        for obj in list(vars(module).values()):
+            if (isinstance(obj, type) and obj not in seen
+                    and callable(getattr(obj, "send_messages", None))
+                    and callable(getattr(obj, "process_trades", None))):
+                seen.append(obj)
+    return seen
+
+
+def exchange_classes():
+    return list({id(module.Exchange): module.Exchange for module in project_modules()
+                 if isinstance(getattr(module, "Exchange", None), type)}.values())
+
+
+def bot_name(bot):
+    return getattr(bot, "name", type(bot).__name__)
+
+
+def find_game(player):
+    """The engine's game object, found as whatever holds the player in its .bots"""
+    for obj in gc.get_objects():
+        attrs = getattr(obj, "__dict__", None)
+        if not isinstance(attrs, dict) or "bots" not in attrs:
+            continue
+        bots = attrs["bots"]
+        members = bots.values() if isinstance(bots, dict) else bots
+        try:
+            if any(bot is player for bot in members):
+                return obj
+        except TypeError:
+            continue
+    return None
+
+
+def game_loop(game):
+    """
+    Index of the loop the engine is in, from the Loop column of its record (rows are appended at the end of
+    each loop, and the streaming export always leaves the last one). None if the game has no such column
+    """
+    record = getattr(game, "record", None)
+    if not isinstance(record, dict) or "Loop" not in record:
+        return None
+    loops = record["Loop"]
+    return int(loops[-1]) + 1 if len(loops) else 0
+
+
+def find_exchange(game):
+    """The Exchange the game matches on (an attribute of the game object)"""
+    classes = tuple(exchange_classes())
+    for value in vars(game).values():
+        if classes and isinstance(value, classes):
+            return value
+    return None
+
+
+def engine_structures(game, player):
+    """The structures that grow with the run, by name (None where the engine doesn't have one)"""
+    exchange = find_exchange(game)
+    return {
+        "orderbook_history": getattr(game, "orderbook_history", None),
+        "all_trades": getattr(game, "all_trades", None),
+        "game.record": getattr(game, "record", None),
+        "player_view_data": getattr(player, "player_view_data", None),
+        "exchange.order_ids": getattr(exchange, "order_ids", None),
+        "exchange.book": getattr(exchange, "book", None),
+    }
+
+
+class EngineHooks:
+    """
+    Monkeypatches methods for one run. Every patch is recorded so restore() can undo them in reverse
+    order, even if the run raised.
+    """
+    def __init__(self):
+        self._patches = []
+
+    def patch(self, owner, attr: str, make_wrapper):
+        """Replaces owner.attr with make_wrapper(current owner.attr)"""
+        had_own = attr in vars(owner)
+        original = getattr(owner, attr)
+        self._patches.append((owner, attr, had_own, vars(owner).get(attr)))
+        setattr(owner, attr, make_wrapper(original))
+
+    def patch_bot_methods(self, classes, method: str, make_wrapper):
+        """
+        Wraps method on every class in classes with make_wrapper(original, bot, *args, **kwargs) -> result.
+
+        Bot classes inherit from each other, so the same call can pass through several patched
+        classes via super(). Only the outermost one runs the wrapper.
+        """
+        active = set()
+
+        def outer(original):
+            def wrapped(bot, *args, **kwargs):
+                key = id(bot)
+                if key in active:
+                    return original(bot, *args, **kwargs)
+                active.add(key)
+                try:
+                    return make_wrapper(original, bot, *args, **kwargs)
+                finally:
+                    active.discard(key)
+            return wrapped
+
+        for cls in classes:
+            self.patch(cls, method, outer)
+
+    def restore(self):
+        while self._patches:
+            owner, attr, had_own, value = self._patches.pop()
+            if had_own:
+                setattr(owner, attr, value)
+            else:
+                delattr(owner, attr)
+
+
+def _install_profiler(hooks: EngineHooks, profiler: PhaseProfiler, player_class, classes):
+    add = profiler.add
+
+    def timed(phase_prefix, is_tick_start=False):
+        def wrapper(original, bot, *args, **kwargs):
+            if is_tick_start and isinstance(bot, player_class):
+                profiler.mark_tick()  # the player is called exactly once per timestamp
+            start = perf_counter_ns()
+            try:
+                return original(bot, *args, **kwargs)
+            finally:
+                add(f"{phase_prefix}[{bot_name(bot)}]", perf_counter_ns() - start)
+        return wrapper
+
+    hooks.patch_bot_methods(classes, "send_messages", timed("send_messages", is_tick_start=True))
+    hooks.patch_bot_methods(classes, "process_trades", timed("process_trades"))
+
+    for exchange in exchange_classes():
+        hooks.patch(exchange, "process_order", lambda f: profiler.wrap("matching", f))
+        hooks.patch(exchange, "remove_order", lambda f: profiler.wrap("matching", f))
+
+    importlib.import_module("visualizer.data_export")  # resolves to the engine's copy once bin/ is on sys.path
+    for module in project_modules():
+        if callable(getattr(module, "export_game_data", None)):
+            hooks.patch(module, "export_game_data", lambda f: profiler.wrap("export", f))
+
+
+def _install_export_options(hooks: EngineHooks, **options):
+    """Makes the engine's export_game_data(game) call run with extra keyword options"""
+    def with_options(original):
+        def export_game_data(game, **kwargs):
+            return original(game, **{**options, **kwargs})
+        return export_game_data
+
+    importlib.import_module("visualizer.data_export")
+    for module in project_modules():
+        if callable(getattr(module, "export_game_data", None)):
+            hooks.patch(module, "export_game_data", with_options)
+
+
+def _install_streaming_export(hooks: EngineHooks, exporter, player_class, every: int, profiler=None):
+    """Flushes the exporter every `every` ticks and turns the engine's end-of-run export into a final flush"""
+    state = {"game": None, "tick": 0}
+    flush = exporter.flush if profiler is None else profiler.wrap("export", exporter.flush)
+    close = exporter.close if profiler is None else profiler.wrap("export", exporter.close)
+
+    def send_messages(original, bot, *args, **kwargs):
+        if isinstance(bot, player_class):
+            if state["game"] is None:
+                state["game"] = find_game(bot)
+            state["tick"] += 1
+            if state["game"] is not None and state["tick"] % every == 0:
+                flush(state["game"])
+        return original(bot, *args, **kwargs)
+
+    hooks.patch_bot_methods([player_class], "send_messages", send_messages)
+
+    def final_export(original):
+        def export_game_data(game):
+            close(game)
+        return export_game_data
+
+    importlib.import_module("visualizer.data_export")
+    for module in project_modules():
+        if callable(getattr(module, "export_game_data", None)):
+            hooks.patch(module, "export_game_data", final_export)
+    return state
+
+
+def _install_bot_timer(hooks: EngineHooks, timer: BotTimer, player_class, classes, on_budget: str):
+    state = {"game": None}
+
+    def send_messages(original, bot, *args, **kwargs):
+        if state["game"] is None and isinstance(bot, player_class):
+            state["game"] = find_game(bot)
+        loop = game_loop(state["game"]) if state["game"] is not None else None
+        if loop is not None:
+            if loop != timer.tick:
+                timer.new_tick(loop)
+        elif isinstance(bot, player_class):
+            timer.new_tick()  # no loop index to read: the player is called exactly once per timestamp
+        start = perf_counter_ns()
+        messages = original(bot, *args, **kwargs)
+        name = bot_name(bot)
+        over = timer.record(name, "send_messages", perf_counter_ns() - start)
+        if over and on_budget == "skip":
+            # a running call can't be interrupted, so the penalty is that its messages never reach the exchange
+            timer.skipped[name] = timer.skipped.get(name, 0) + 1
+            return []
+        return messages
+
+    def process_trades(original, bot, *args, **kwargs):
+        # never skipped: positions have to stay in sync with the exchange
+        start = perf_counter_ns()
+        try:
+            return original(bot, *args, **kwargs)
+        finally:
+            timer.record(bot_name(bot), "process_trades", perf_counter_ns() - start)
+
+    hooks.patch_bot_methods(classes, "send_messages", send_messages)
+    hooks.patch_bot_methods(classes, "process_trades", process_trades)
+
+
+def _install_async_bots(hooks: EngineHooks, classes, deadline_ms):
+    """
+    Lets the engine call bots with an async send_messages: each call runs on a scheduler's event loop.
+    Returns the scheduler, or None (and creates no event loop) if no bot is async
+    """
+    async_classes = [cls for cls in classes if inspect.iscoroutinefunction(vars(cls).get("send_messages"))]
+    if not async_classes:
+        return None
+    scheduler = AsyncBotScheduler(deadline_ms)
+
+    def send_messages(original, bot, book, *args, **kwargs):
+        return scheduler.call(bot, book, send=lambda bot, book: original(bot, book, *args, **kwargs))
+
+    hooks.patch_bot_methods(async_classes, "send_messages", send_messages)
+    return scheduler
+
+
+def _install_book_view(hooks: EngineHooks, classes):
+    """Hands every bot a shared BookView of the book instead of the dict, versioned from the Exchange"""
+    versions = BookVersions()
+    state = {"view": None}
+
+    def send_messages(original, bot, book, *args, **kwargs):
+        if state["view"] is None or state["view"].source is not book:
+            state["view"] = BookView(book, versions)
+        return original(bot, state["view"], *args, **kwargs)
+
+    hooks.patch_bot_methods(classes, "send_messages", send_messages)
+
+    def process_order(original):
+        def wrapped(exchange, order, loop_num):
+            try:
+                return original(exchange, order, loop_num)
+            finally:
+                versions.bump(order.ticker)
+        return wrapped
+
+    def remove_order(original):
+        def wrapped(exchange, order_id):
+            info = exchange.order_ids.get(order_id)
+            removed = original(exchange, order_id)
+            if removed and info:
+                versions.bump(info[0])
+            return removed
+        return wrapped
+
+    for exchange in exchange_classes():
+        hooks.patch(exchange, "process_order", process_order)
+        hooks.patch(exchange, "remove_order", remove_order)
+    return state
+
+
+def _install_shared_history(hooks: EngineHooks, builder: SnapshotBuilder, player_class):
+    """Every player tick, replaces the books the engine appended to orderbook_history with shared snapshots"""
+    state = {"game": None, "builder": builder}
+
+    def send_messages(original, bot, *args, **kwargs):
+        if isinstance(bot, player_class):
+            if state["game"] is None:
+                state["game"] = find_game(bot)
+            history = getattr(state["game"], "orderbook_history", None)
+            if history is not None:
+                builder.compact(history)
+        return original(bot, *args, **kwargs)
+
+    hooks.patch_bot_methods([player_class], "send_messages", send_messages)
+    return state
+
+
+def _install_queue_tracker(hooks: EngineHooks, tracker: QueueTracker, player_class):
+    """Feeds tracker from the Exchange's add/fill/cancel paths and hands it to the player as .queue_tracker"""
+    def send_messages(original, bot, *args, **kwargs):
+        if getattr(bot, "queue_tracker", None) is not tracker:
+            tracker.watch(bot_name(bot))
+            bot.queue_tracker = tracker
+        return original(bot, *args, **kwargs)
+
+    hooks.patch_bot_methods([player_class], "send_messages", send_messages)
+
+    def add_order(original):
+        def wrapped(exchange, order):
+            result = original(exchange, order)
+            tracker.on_add(order.order_id, order.ticker, exchange.name_mapping[order.agg_dir], order.price,
+                           order.size, order.bot_name)
+            return result
+        return wrapped
+
+    def record_trade(original):
+        def wrapped(exchange, size, order, rest, loop_num):
+            trade = original(exchange, size, order, rest, loop_num)
+            tracker.on_fill(rest.order_id, size)  # matching only ever fills the front of a level
+            return trade
+        return wrapped
+
+    def remove_order(original):
+        def wrapped(exchange, order_id):
+            removed = original(exchange, order_id)
+            if removed:
+                tracker.on_cancel(order_id)
+            return removed
+        return wrapped
+
+    for exchange in exchange_classes():
+        hooks.patch(exchange, "add_order", add_order)
+        hooks.patch(exchange, "record_trade", record_trade)
+        hooks.patch(exchange, "remove_order", remove_order)
+
+
+def _install_memory_profiler(hooks: EngineHooks, memory: MemoryProfiler, player_class, every: int):
+    """Snapshots the engine's structures every `every` player ticks"""
+    state = {"game": None, "player": None, "tick": 0}
+
+    def send_messages(original, bot, *args, **kwargs):
+        if isinstance(bot, player_class):
+            if state["game"] is None:
+                state["game"], state["player"] = find_game(bot), bot
+            if state["game"] is not None and state["tick"] % every == 0:
+                memory.snapshot(state["tick"], engine_structures(state["game"], bot))
+            state["tick"] += 1
+        return original(bot, *args, **kwargs)
+
+    hooks.patch_bot_methods([player_class], "send_messages", send_messages)
+    return state
+
+
+class RunResult:
+    """
+    What runner.run_game hands back. pnl is exactly what the engine's run_game returned, the rest
+    is only filled in for the diagnostics that were switched on.
+    """
+    def __init__(self, pnl, profile=None, bot_timings=None, memory=None, missed_deadlines=None):
+        self.pnl = pnl
+        self.profile = profile
+        self.bot_timings = bot_timings
+        self.memory = memory
+        self.missed_deadlines = missed_deadlines  # bot name -> ticks an async bot missed its deadline
+
+    def over_budget_bots(self):
+        """Names of bots that went over the per-tick budget at least once"""
+        if not self.bot_timings:
+            return []
+        return [bot for bot, stats in self.bot_timings.items() if stats["over_budget_ticks"]]
+
+    def __str__(self):
+        return str(self.pnl)
+
+
+def run_game(bot_class, num_timestamps, products, profile=False, print_profile=True,
+             time_bots=False, bot_budget_ms=None, on_budget="flag", stream_export_every=None,
+             background_export=False, columnar_export=False, binary_book_log=False, book_options=None,
+             track_queues=False, memory_profile=False, memory_every=1000, async_deadline_ms=None,
+             lazy_book=False, shared_history=False, **engine_kwargs):
+    """
+    Runs the engine's run_game with optional diagnostics. engine_kwargs are passed straight through
+    (print_limits, visualiser, give_positions, progress_bar, ...).
+
+    profile: time every phase of the loop (per-bot send_messages/process_trades, matching, export,
+             and whatever is left over in the engine) and attach the aggregated report to the result
+    time_bots: record latency histograms of every bot's send_messages and process_trades calls
+    bot_budget_ms: per-tick compute budget for each bot (implies time_bots). Bots that exceed it are
+                   flagged in result.bot_timings, or also have that tick's messages dropped if
+                   on_budget="skip"
+    stream_export_every: write the CSV logs incrementally every this many ticks and drop the written
+                         history from memory, instead of exporting everything after the run
+    background_export: do the streaming export's disk writes on a background thread fed by a bounded
+                       queue, so I/O overlaps the simulation (streams every 1000 ticks unless
+                       stream_export_every is given)
+    columnar_export: also write the logs as typed, compressed parquet files (load them back with
+                     visualizer.data_export.load_columnar)
+    binary_book_log: also write the book history as a fixed-width binary log with a (timestamp, ticker)
+                     index, for random access with visualizer.book_log.BookLogReader
+    book_options: visualizer.data_export.BookExportOptions to write log_orderbook_data.csv with fewer
+                  levels, aggregated per price level and/or only for tickers whose book changed
+    track_queues: maintain the queue position of the player's resting orders from the exchange's events
+                  and give the player a queue_tracker.QueueTracker as self.queue_tracker
+    memory_profile: run under tracemalloc and every memory_every ticks measure how much memory each of the
+                    engine's growing structures holds (orderbook_history, all_trades, game.record, the
+                    player's player_view_data, the exchange's order_ids and book), then report their
+                    growth per 1000 ticks. Slows the run down considerably
+    async_deadline_ms: time a bot with an `async def send_messages` gets per tick before its coroutine
+                       is cancelled and it sends nothing that tick (async bots are run either way,
+                       without a deadline they are waited for)
+    lazy_book: hand every bot a book_view.BookView instead of the book dict: read-only, levels built on
+               first access and shared by all bots until that ticker's book changes, with per-ticker
+               version counters
+    shared_history: keep orderbook_history as book_history.BookSnapshots that share every ticker's book
+                    (and every unchanged order) with the previous tick, instead of a full copy per tick
+    """
+    if on_budget not in ("flag", "skip"):
+        raise ValueError(f"Invalid on_budget: {on_budget}. Must be 'flag' or 'skip'.")
+    engine_run_game = load_engine_run_game()
+
+    hooks = EngineHooks()
+    profiler = PhaseProfiler() if profile else None
+    timer = BotTimer(bot_budget_ms) if time_bots or bot_budget_ms is not None else None
+    memory = MemoryProfiler() if memory_profile else None
+    scheduler = None
+    exporter = stream_state = memory_state = history_state = None
+    if background_export and not stream_export_every:
+        stream_export_every = 1000
+    try:
+        classes = bot_classes(bot_class)
+        # innermost, so the other wrappers see (and time) a plain call that returns the messages
+        scheduler = _install_async_bots(hooks, classes, async_deadline_ms)
+        if lazy_book:
+            _install_book_view(hooks, classes)
+        if shared_history:
+            history_state = _install_shared_history(hooks, SnapshotBuilder(), bot_class)
+        if track_queues:
+            # installed first so its bookkeeping is timed as part of matching
+            _install_queue_tracker(hooks, QueueTracker(), bot_class)
+        if timer is not None:
+            _install_bot_timer(hooks, timer, bot_class, classes, on_budget)
+        if profiler is not None:
+            _install_profiler(hooks, profiler, bot_class, classes)
+        if stream_export_every:
+            # installed last so flushes are timed as export rather than inside the player's send_messages
+            from visualizer.data_export import StreamingExporter
+            exporter = StreamingExporter(columnar=columnar_export, binary_book=binary_book_log,
+                                         book_options=book_options, background=background_export)
+            stream_state = _install_streaming_export(hooks, exporter, bot_class, stream_export_every, profiler)
+        elif columnar_export or binary_book_log or book_options is not None:
+            _install_export_options(hooks, columnar=columnar_export, binary_book=binary_book_log,
+                                    book_options=book_options)
+        if memory is not None:
+            memory_state = _install_memory_profiler(hooks, memory, bot_class, memory_every)
+            memory.start()
+        if profiler is not None:
+            profiler.start_run()
+
+        pnl = engine_run_game(bot_class, num_timestamps, products, **engine_kwargs)
+        if history_state is not None and history_state["game"] is not None:
+            history_state["builder"].compact(history_state["game"].orderbook_history)  # the last tick
+        if exporter is not None and stream_state["game"] is not None:
+            exporter.close(stream_state["game"])  # engine skips export when visualiser=False
+
+        if profiler is not None:
+            profiler.end_run()
+        if memory is not None and memory_state["game"] is not None:
+            memory.snapshot(memory_state["tick"], engine_structures(memory_state["game"], memory_state["player"]))
+    finally:
+        hooks.restore()
+        if scheduler is not None:
+            scheduler.close()
+        if memory is not None:
+            memory.stop()
+        if exporter is not None:
+            exporter.shutdown()  # no-op after a normal close; otherwise joins the writer thread
+
+    result = RunResult(pnl)
+    if scheduler is not None:
+        result.missed_deadlines = dict(scheduler.missed)
+    if profiler is not None:
+        result.profile = profiler.report()
+        if print_profile:
+            print(format_report(result.profile))
+    if timer is not None:
+        result.bot_timings = timer.report()
+        if print_profile:
+            print(format_bot_timings(result.bot_timings, bot_budget_ms))
+    if memory is not None:
+        result.memory = memory.report()
+        if print_profile:
+            print(format_memory_report(result.memory))
+    return result
@@ -0,0 +1,339 @@
+"""
+Out-of-process bots reading the book from shared memory.
+
+Every bot runs in its own process, so candidates run in parallel without sharing a GIL and a bot that
+crashes only takes itself down. Each tick the book is published once into a
+multiprocessing.shared_memory block with a fixed layout: per ticker and side, the price and total size
+of the best `depth` price levels as float64 arrays, plus level counts and the tick number in a small
+int64 header. Only the bots' messages (and the trades they have to process) go over a pipe.
+
+The header starts with a generation counter, bumped before and after every publish (a seqlock): odd
+while a publish is in progress. Before each decision a bot copies the block (a few KB) and keeps the
+copy only if the generation was even and unchanged across it, so a bot that is late and still reading
+while the next tick is published never sees a half-written book.
+
+    pool = BotPool([(MyAlgo, (products, num_timestamps)), (OtherAlgo, (products, num_timestamps))], tickers)
+    for loop_num in range(num_timestamps):
+        decisions = pool.tick(exchange.book, trades)   # async_bots.TickDecisions, merged in bot order
+        ...
+    pool.close()
+
+Inside a bot process, send_messages receives a SharedBookView. Bots that only want numbers read
+book.levels("QFIN", "Bids") -> (prices, sizes). Bots written against the engine's book can keep using
+book["QFIN"]["Bids"]: the Rest lists are only rebuilt for the tickers that are accessed, and each
+holds one Rest per price level (aggregated size, no order_id or bot_name).
+
+The compiled engine builds and calls the player in its own process and reads its positions directly,
+so this is for game loops we own (candidate sweeps, research drivers), not for run_game.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+from time import perf_counter_ns, sleep
+from typing import List, Sequence
+
+import numpy as np
+
+from async_bots import TickDecisions
+from base import Rest
+
+SIDES = ("Bids", "Asks")
+DIRECTIONS = {"Bids": ("Buy", 1), "Asks": ("Sell", -1)}
+
+
+class _Layout:
+    """
+    Offsets into the block: int64 header [generation, tick, levels per (ticker, side)], then float64
+    [ticker, side, price/size, level]
+    """
+    def __init__(self, tickers: Sequence[str], depth: int):
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.depth = depth
+        self.header_shape = (2 + 2 * len(self.tickers),)
+        self.data_shape = (len(self.tickers), 2, 2, depth)
+        self.header_bytes = 8 * self.header_shape[0]
+        self.size = self.header_bytes + 8 * int(np.prod(self.data_shape))
+
+    def arrays(self, buffer):
+        header = np.ndarray(self.header_shape, dtype=np.int64, buffer=buffer)
+        data = np.ndarray(self.data_shape, dtype=np.float64, buffer=buffer, offset=self.header_bytes)
+        return header, data
+
+
+def _levels(orders):
+    """(prices, sizes) per price level of one side of the book (a list of Rest, best first)"""
+    if not orders:
+        return np.empty(0), np.empty(0)
+    prices = np.fromiter((order.price for order in orders), dtype=float, count=len(orders))
+    sizes = np.fromiter((order.size for order in orders), dtype=float, count=len(orders))
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(prices)) + 1))
+    return prices[starts], np.add.reduceat(sizes, starts)
+
+
+class SharedBook:
+    """Publisher side: owns the shared-memory block and writes the book into it once per tick"""
+    def __init__(self, tickers: Sequence[str], depth: int = 20):
+        self.layout = _Layout(tickers, depth)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.layout.size)
+        self.header, self.data = self.layout.arrays(self.shm.buf)
+        self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, book, tick: int):
+        """Writes the best `depth` levels of every ticker's book. Levels beyond depth are left out"""
+        depth = self.layout.depth
+        self.header[0] += 1  # odd: readers retry until the publish is done
+        for ticker, t in self.layout.index.items():
+            for s, side in enumerate(SIDES):
+                prices, sizes = _levels(book[ticker][side])
+                n = min(len(prices), depth)
+                self.data[t, s, 0, :n] = prices[:n]
+                self.data[t, s, 1, :n] = sizes[:n]
+                self.header[2 + 2 * t + s] = n
+        self.header[1] = tick
+        self.header[0] += 1
+
+    def close(self):
+        del self.header, self.data  # release the views so the buffer can be closed
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedBookView:
+    """
+    Reader side: a consistent copy of the published book, taken by refresh() (the bot worker refreshes
+    before every decision). levels() gives read-only arrays into that copy; view[ticker][side] rebuilds
+    Rest lists (one per price level) for the tickers that are accessed.
+    """
+    def __init__(self, name: str, tickers: Sequence[str], depth: int):
+        self.layout = _Layout(tickers, depth)
+        self.shm = _attach(name)
+        self._shared = self.layout.arrays(self.shm.buf)
+        self.refresh()
+
+    def refresh(self):
+        """Copies the published book, retrying while a publish is in progress or lands during the copy"""
+        shared_header, shared_data = self._shared
+        while True:
+            generation = int(shared_header[0])
+            if generation % 2 == 0:
+                header, data = shared_header.copy(), shared_data.copy()
+                if int(shared_header[0]) == generation:
+                    break
+            sleep(0)
+        header.flags.writeable = False
+        data.flags.writeable = False
+        self.header, self.data = header, data
+        self._rebuilt = {}
+
+    @property
+    def tick(self) -> int:
+        return int(self.header[1])
+
+    def levels(self, ticker: str, side: str):
+        """(prices, sizes) of ticker's side ("Bids" or "Asks"), best first"""
+        t, s = self.layout.index[ticker], SIDES.index(side)
+        n = self.header[2 + 2 * t + s]
+        return self.data[t, s, 0, :n], self.data[t, s, 1, :n]
+
+    def __getitem__(self, ticker: str):
+        book = self._rebuilt.get(ticker)
+        if book is None:
+            book = self._rebuilt[ticker] = {side: self._rests(ticker, side) for side in SIDES}
+        return book
+
+    def _rests(self, ticker, side):
+        agg_dir, sign = DIRECTIONS[side]
+        prices, sizes = self.levels(ticker, side)
+        return [Rest(int(size), float(price), agg_dir, None, ticker, float(price) * sign, None)
+                for price, size in zip(prices, sizes)]
+
+    def __contains__(self, ticker):
+        return ticker in self.layout.index
+
+    def __iter__(self):
+        return iter(self.layout.tickers)
+
+    def keys(self):
+        return list(self.layout.tickers)
+
+    def items(self):
+        return [(ticker, self[ticker]) for ticker in self.layout.tickers]
+
+    def close(self):
+        del self._shared  # release the views so the buffer can be closed
+        self.shm.close()
+
+
+def _attach(name):
+    """Attaches to an existing block, leaving its cleanup to the SharedBook that created it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: registered with the resource tracker, which workers share with the parent
+        return shared_memory.SharedMemory(name=name)
+
+
+def _bot_worker(conn, bot_class, args, kwargs, shm_name, tickers, depth):
+    """Bot process loop: for every tick, process the trades it is sent, then send_messages on the shared book"""
+    view = None
+    try:
+        view = SharedBookView(shm_name, tickers, depth)
+        bot = bot_class(*args, **kwargs)
+        conn.send(("ready", getattr(bot, "name", bot_class.__name__)))
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            tick, trades, idx = request
+            if trades:
+                bot.process_trades(trades)
+            bot.set_idx(idx)
+            view.refresh()
+            conn.send(("ok", tick, list(bot.send_messages(view))))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception as exc:
+        try:
+            conn.send(("error", f"{type(exc).__name__}: {exc}"))
+        except OSError:
+            pass
+    finally:
+        if view is not None:
+            view.close()
+        conn.close()
+
+
+class BotPool:
+    """
+    Runs bots in their own processes against a SharedBook.
+
+    bots: (bot_class, args) or (bot_class, args, kwargs) per bot; the class must be importable by the
+          workers
+    deadline_ms: time a bot gets per tick (None waits). A bot that misses it sends nothing that tick, its
+                 late reply is discarded, and it isn't asked again until that reply is in. It keeps
+                 deciding on its copy of the book from the tick it was asked on
+    id_stride: order ids given to each bot per tick (bot i gets a block of this many, like the engine)
+    A bot that raises or dies is marked crashed, reported in crashed and sends nothing from then on;
+    the others carry on.
+    """
+    def __init__(self, bots, tickers: Sequence[str], depth: int = 20, deadline_ms: float = None,
+                 id_stride: int = 10000):
+        bots = list(bots)
+        self.book = SharedBook(tickers, depth)
+        self.deadline_ms = deadline_ms
+        self.id_stride = id_stride
+        self.crashed = {}  # bot name -> reason
+        self.names: List[str] = []
+        self._conns = []
+        self._processes = []
+        self._busy = [None] * len(bots)       # tick of the request a bot hasn't answered yet
+        self._backlog = [[] for _ in bots]    # trades a bot hasn't been sent yet
+        self._tick = 0
+        self._next_idx = 0
+        for spec in bots:
+            bot_class, args, kwargs = (tuple(spec) + ({},))[:3]
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_bot_worker, daemon=True,
+                                              args=(child, bot_class, tuple(args), kwargs, self.book.name,
+                                                    list(tickers), depth))
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+        for i, conn in enumerate(self._conns):
+            reply = self._recv(conn)
+            self.names.append(reply[1] if reply and reply[0] == "ready" else f"bot{i}")
+            if not reply or reply[0] != "ready":
+                self.crashed[self.names[i]] = reply[1] if reply else "died on start"
+
+    @staticmethod
+    def _recv(conn, timeout=None):
+        try:
+            if timeout is not None and not conn.poll(timeout):
+                return None
+            return conn.recv()
+        except (EOFError, OSError):
+            return ("error", "process died")
+
+    def tick(self, book, trades=()) -> TickDecisions:
+        """
+        Publishes book, has every live bot process trades (those since the last tick) and decide, and
+        returns their messages merged in bot order
+        """
+        self.book.publish(book, self._tick)
+        start = perf_counter_ns()
+        sent = []
+        for i, conn in enumerate(self._conns):
+            if self.names[i] in self.crashed:
+                continue
+            self._backlog[i].extend(trades)
+            if self._busy[i] is not None and self._collect(i, timeout=0) is None:
+                continue  # still on an earlier tick: misses this one, gets the trades next time
+            try:
+                conn.send((self._tick, self._backlog[i], self._next_idx + i * self.id_stride))
+            except OSError:
+                self.crashed[self.names[i]] = "process died"
+                continue
+            self._backlog[i] = []
+            self._busy[i] = self._tick
+            sent.append(i)
+        self._next_idx += len(self._conns) * self.id_stride
+
+        messages, by_bot, missed, latency_ms = [], {}, [], {}
+        for i, name in enumerate(self.names):
+            if name in self.crashed and i not in sent:
+                continue
+            reply = None
+            if i in sent:
+                timeout = None
+                if self.deadline_ms is not None:
+                    timeout = max(self.deadline_ms / 1e3 - (perf_counter_ns() - start) / 1e9, 0)
+                reply = self._collect(i, timeout)
+                latency_ms[name] = (perf_counter_ns() - start) / 1e6
+            if reply is None:
+                missed.append(name)
+                by_bot[name] = []
+                continue
+            by_bot[name] = reply
+            messages.extend(reply)
+        self._tick += 1
+        return TickDecisions(messages, by_bot, missed, latency_ms)
+
+    def _collect(self, i, timeout):
+        """
+        Waits up to timeout for bot i's outstanding reply. Returns its messages if it was for this tick,
+        [] for a stale one (the bot is free again, but missed that tick), None if nothing arrived in
+        time or the bot crashed.
+        """
+        reply = self._recv(self._conns[i], timeout)
+        if reply is None:
+            return None
+        self._busy[i] = None
+        if reply[0] == "error":
+            self.crashed[self.names[i]] = reply[1]
+            return None
+        return reply[2] if reply[1] == self._tick else []
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._processes = [], []
+        self.book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
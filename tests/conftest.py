@@ -0,0 +1,76 @@
+"""
+The compiled engine in bin/ only loads on the Python it was built for, so the tests run runner.run_game
+against the pure-Python stand-in in tests/stand_in_engine instead.
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(TESTS_DIR)
+for path in (PROJECT_ROOT, os.path.join(TESTS_DIR, "stand_in_engine")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import game_setup  # noqa: E402
+import runner  # noqa: E402
+from base import Product  # noqa: E402
+from base_algo import PlayerAlgorithm  # noqa: E402
+
+VISUALIZER_DIR = os.path.join(PROJECT_ROOT, "visualizer")
+
+
+def use_stand_in_engine():
+    """For processes started from the tests (spawned ones don't inherit the fixture's monkeypatch)"""
+    runner.load_engine_run_game = lambda: game_setup.run_game
+
+
+@pytest.fixture(autouse=True)
+def stand_in_engine(monkeypatch):
+    monkeypatch.setattr(runner, "load_engine_run_game", lambda: game_setup.run_game)
+    random.seed(0)
+    np.random.seed(0)
+
+
+@pytest.fixture
+def products():
+    return [
+        Product("UEC", mpv=0.1, pos_limit=200, fine=200, fee_type="SetFee", trade_fee=0),
+        Product("QFIN", mpv=0.1, pos_limit=1000, fine=200, fee_type="SetFee", trade_fee=0),
+        Product("SOBER", mpv=0.01, pos_limit=1000, fine=20, fee_type="SetFee", trade_fee=0),
+        Product("GUILD", mpv=1, pos_limit=10, fine=1000, conversions={"UEC": 5, "QFIN": 5}, fee_type="SetFee",
+                trade_fee=0),
+    ]
+
+
+@pytest.fixture
+def player():
+    return PlayerAlgorithm
+
+
+class Trader(PlayerAlgorithm):
+    """Crosses the spread on QFIN every third tick, alternating sides"""
+
+    def send_messages(self, book):
+        super().send_messages(book)
+        if self.timestamp % 3 == 0:
+            buy = self.timestamp % 2 == 1
+            return [self.create_order("QFIN", 1100.0 if buy else 900.0, 2, "Buy" if buy else "Sell")]
+        return []
+
+
+@pytest.fixture
+def trader():
+    return Trader
+
+
+def log_path(name):
+    return os.path.join(VISUALIZER_DIR, name)
+
+
+def read_log(name):
+    with open(log_path(name), "rb") as f:
+        return f.read()
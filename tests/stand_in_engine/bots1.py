@@ -0,0 +1,40 @@
+"""Stand-in for the compiled engine's bots1: the Msg type base_algo imports, and a noise trader"""
+import random
+from collections import deque
+
+from base import Msg, Order
+
+
+class NoiseBot:
+    """
+    Sends two random limit orders per ticker per tick, within 20 ticks of 1000, and cancels whatever is
+    left of them ten ticks later so the book stays a realistic size
+    """
+
+    def __init__(self, products, name):
+        self.name = name
+        self.products = products
+        self.idx = 0
+        self.sent = deque()  # order ids sent per tick, oldest first
+
+    def set_idx(self, idx):
+        self.idx = idx
+
+    def send_messages(self, book):
+        messages = []
+        if len(self.sent) == 10:
+            messages += [Msg("REMOVE", order_id) for order_id in self.sent.popleft()]
+        sent = []
+        for product in self.products:
+            for _ in range(2):
+                direction = random.choice(["Buy", "Sell"])
+                price = round(1000 + random.randint(-20, 20) * product.mpv, 2)
+                messages.append(Msg("ORDER", Order(product.ticker, price, random.randint(1, 10), self.idx, direction,
+                                                   self.name)))
+                sent.append(self.idx)
+                self.idx += 1
+        self.sent.append(sent)
+        return messages
+
+    def process_trades(self, trades):
+        pass
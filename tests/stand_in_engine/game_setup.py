@@ -0,0 +1,69 @@
+"""
+Stand-in for the compiled engine's game_setup, for the tests.
+
+Plays the player against two noise bots with the same loop shape as the engine: every bot's
+send_messages in turn (with its order id block set first), matching on base.Exchange, every bot's
+process_trades, then the tick's deep-copied book, record row (with the player's `message`) and (at the end) the visualiser export.
+"""
+import copy
+
+from base import Exchange
+from bots1 import NoiseBot
+
+
+class Game:
+    def __init__(self, bots, exchange):
+        self.bots = {bot.name: bot for bot in bots}
+        self.exchange = exchange
+        self.record = {"Loop": []}
+        self.orderbook_history = []
+        self.all_trades = []
+
+
+def run_game(bot_class, num_timestamps, products, print_limits=False, visualiser=True, give_positions=False,
+             progress_bar=False):
+    exchange = Exchange(products)
+    player = bot_class(products, num_timestamps)
+    bots = [player, NoiseBot(products, "Noise1"), NoiseBot(products, "Noise2")]
+    game = Game(bots, exchange)
+    for product in products:
+        game.record[product.ticker] = []
+        game.record[f"{player.name}_{product.ticker}"] = []
+    game.record[f"{player.name}_Cash"] = []
+    game.record[f"{player.name}_PnL"] = []
+    game.record[f"{player.name}_message"] = []
+
+    order_id = 0
+    for loop in range(num_timestamps):
+        for bot in bots:
+            bot.set_idx(order_id)
+            messages = bot.send_messages(exchange.book)
+            order_id += 10000
+            trades = []
+            for message in messages:
+                if message.msg_type == "ORDER":
+                    trades += exchange.process_order(message.message, loop)
+                elif message.msg_type == "REMOVE":
+                    exchange.remove_order(message.message)
+            game.all_trades += trades
+            for other in bots:
+                other.process_trades(trades)
+
+        game.orderbook_history.append(copy.deepcopy(exchange.book))
+        game.record["Loop"].append(loop)
+        for product in products:
+            book = exchange.book[product.ticker]
+            if book["Bids"] and book["Asks"]:
+                mid = (book["Bids"][0].price + book["Asks"][0].price) / 2
+            else:
+                mid = 1000
+            game.record[product.ticker].append(mid)
+            game.record[f"{player.name}_{product.ticker}"].append(player.positions[product.ticker])
+        game.record[f"{player.name}_Cash"].append(player.positions["Cash"])
+        game.record[f"{player.name}_PnL"].append(player.positions["Cash"])
+        game.record[f"{player.name}_message"].append(getattr(player, "message", ""))
+
+    if visualiser:
+        from visualizer.data_export import export_game_data
+        export_game_data(game)
+    return player.positions["Cash"]
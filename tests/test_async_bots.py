@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import runner
+from async_bots import AsyncBotScheduler, is_async_bot
+from base_algo import PlayerAlgorithm
+
+
+class Delayed:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    async def send_messages(self, book):
+        await asyncio.sleep(self.delay)
+        return [self.name + "1", self.name + "2"]
+
+
+class Sync:
+    name = "sync"
+
+    def send_messages(self, book):
+        return ["s"]
+
+
+def test_async_player_misses_its_deadline(products):
+    class AsyncPlayer(PlayerAlgorithm):
+        async def send_messages(self, book):
+            messages = super().send_messages(book)
+            await asyncio.sleep(0.05 if self.timestamp % 10 == 0 else 0)
+            return messages + [self.create_order("UEC", 1000, 1, "Buy")]
+
+    assert is_async_bot(AsyncPlayer)
+    result = runner.run_game(AsyncPlayer, 30, products, visualiser=False, async_deadline_ms=20)
+    assert result.missed_deadlines == {"PlayerAlgorithm": 3}
+    assert PlayerAlgorithm.send_messages is not AsyncPlayer.send_messages
+
+
+def test_gather_keeps_bot_order_and_drops_late_bots():
+    scheduler = AsyncBotScheduler(deadline_ms=100, deadlines={"slow": 30})
+    try:
+        start = time.perf_counter()
+        decisions = scheduler.gather([Delayed("a", 0.04), Delayed("slow", 0.2), Sync(), Delayed("b", 0.01)], {})
+        elapsed = time.perf_counter() - start
+    finally:
+        scheduler.close()
+    assert decisions.messages == ["a1", "a2", "s", "b1", "b2"]
+    assert decisions.missed == ["slow"]
+    assert elapsed < 0.15  # bots ran concurrently
+
+
+def test_gather_inside_a_running_loop():
+    scheduler = AsyncBotScheduler(deadline_ms=100)
+
+    async def driver():
+        return scheduler.gather([Delayed("a", 0.01), Sync()], {})
+
+    try:
+        decisions = asyncio.run(driver())
+    finally:
+        scheduler.close()
+    assert decisions.messages == ["a1", "a2", "s"]
+    assert decisions.missed == []
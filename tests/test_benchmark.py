@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from benchmark import PowerLawFit, format_scaling, peak_rss_mb, scaling_benchmark
+from conftest import use_stand_in_engine
+
+
+def test_power_law_fit():
+    n = np.array([100, 1000, 10000])
+    fit = PowerLawFit(n, 3 * n ** 1.5)
+    assert fit.exponent == pytest.approx(1.5)
+    assert fit.coefficient == pytest.approx(3)
+    assert fit.r_squared == pytest.approx(1)
+    assert fit.predict(100000) == pytest.approx(3 * 100000 ** 1.5)
+
+
+def test_scaling_benchmark(products, player):
+    table, fits = scaling_benchmark(player, products, sizes=(50, 100, 200), isolate=False, verbose=False)
+    assert list(table["num_timestamps"]) == [50, 100, 200]
+    assert "wall_time_s" in fits
+    assert format_scaling(table, fits)
+
+
+def test_isolated_runs_do_not_inherit_the_callers_memory(products, player):
+    ballast = np.ones(400_000_000 // 8)  # touched, so it counts towards this process's RSS
+    assert peak_rss_mb() > 400
+    table, _ = scaling_benchmark(player, products, sizes=(20, 40), verbose=False, initializer=use_stand_in_engine)
+    assert (table["peak_rss_mb"] < 300).all()
+    del ballast
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+import runner
+from book_history import BookSnapshot, SnapshotBuilder
+from conftest import read_log
+from visualizer.data_export import BookExportOptions
+
+
+def test_unchanged_tickers_are_shared(products):
+    from base import Exchange, Order
+    exchange = Exchange(products)
+    builder = SnapshotBuilder()
+    exchange.process_order(Order("QFIN", 999.0, 5, 1, "Buy", "a"), 0)
+    exchange.process_order(Order("UEC", 999.0, 5, 2, "Buy", "a"), 0)
+    exchange.process_order(Order("QFIN", 1001.0, 5, 4, "Sell", "a"), 0)
+    first = builder.snapshot(exchange.book)
+    exchange.process_order(Order("QFIN", 998.0, 5, 3, "Buy", "a"), 1)
+    second = builder.snapshot(exchange.book)
+    assert isinstance(second, BookSnapshot)
+    assert second["UEC"] is first["UEC"]
+    assert second["QFIN"]["Bids"][0] is first["QFIN"]["Bids"][0]
+    assert second["QFIN"]["Asks"] is first["QFIN"]["Asks"]
+    assert [rest.order_id for rest in second["QFIN"]["Bids"]] == [1, 3]
+    assert [rest.order_id for rest in first["QFIN"]["Bids"]] == [1]
+
+
+@pytest.mark.parametrize("book_options", [None, BookExportOptions(depth=5, changed_only=True)])
+def test_shared_history_exports_the_same_logs(products, player, book_options):
+    logs = []
+    for shared in (False, True):
+        random.seed(11)
+        runner.run_game(player, 200, products, visualiser=True, shared_history=shared, book_options=book_options)
+        logs.append(read_log("log_orderbook_data.csv"))
+    assert logs[0] == logs[1]
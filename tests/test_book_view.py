@@ -0,0 +1,47 @@
+import copy
+
+import pytest
+
+import runner
+from base import Exchange, Order
+from base_algo import PlayerAlgorithm
+from book_view import BookVersions, BookView
+
+
+def _levels(rests):
+    return [(rest.price, rest.size, rest.order_id) for rest in rests]
+
+
+def test_view_follows_the_book_and_is_read_only(products):
+    exchange = Exchange(products)
+    versions = BookVersions()
+    view = BookView(exchange.book, versions)
+    exchange.process_order(Order("QFIN", 999.0, 5, 1, "Buy", "a"), 0)
+    assert _levels(view["QFIN"]["Bids"]) == [(999.0, 5, 1)]
+    with pytest.raises(AttributeError):
+        view["QFIN"]["Bids"].append(1)
+
+    exchange.process_order(Order("QFIN", 1000.0, 3, 2, "Buy", "a"), 0)
+    assert len(view["QFIN"]["Bids"]) == 1  # cached until the version moves
+    versions.bump("QFIN")
+    assert _levels(view["QFIN"]["Bids"]) == [(1000.0, 3, 2), (999.0, 5, 1)]
+    assert view.changed({ticker: 0 for ticker in view}) == ["QFIN"]
+    assert copy.deepcopy(view)["QFIN"]["Bids"] == view["QFIN"]["Bids"]
+
+
+def test_lazy_book_in_a_run(products):
+    seen = {"calls": 0}
+
+    class Reader(PlayerAlgorithm):
+        def send_messages(self, book):
+            assert isinstance(book, BookView)
+            for ticker in book:
+                for side in ("Bids", "Asks"):
+                    assert _levels(book[ticker][side]) == _levels(book.source[ticker][side])
+            seen["calls"] += 1
+            seen["view"] = book
+            return super().send_messages(book) + [self.create_order("QFIN", 1000, 1, "Buy")]
+
+    runner.run_game(Reader, 100, products, visualiser=False, lazy_book=True)
+    assert seen["calls"] == 100
+    assert seen["view"].materializations > 0
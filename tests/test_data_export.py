@@ -0,0 +1,174 @@
+import json
+import random
+
+import pandas as pd
+import pytest
+
+import runner
+from conftest import log_path, read_log
+from visualizer.data_export import BookExportOptions, load_columnar
+
+LOGS = ("log_game_record.csv", "log_orderbook_data.csv", "log_trades_data.csv")
+
+
+def export(bot, products, **kwargs):
+    random.seed(0)
+    runner.run_game(bot, 150, products, visualiser=True, print_profile=False, **kwargs)
+    return {name: read_log(name) for name in LOGS}
+
+
+def test_streaming_export_matches_full_export(products, trader):
+    full = export(trader, products)
+    assert export(trader, products, stream_export_every=40) == full
+    assert export(trader, products, stream_export_every=40, background_export=True) == full
+
+
+def test_columnar_export(products, trader):
+    pytest.importorskip("pyarrow")
+    export(trader, products, columnar_export=True)
+    frames = load_columnar()
+    csv = pd.read_csv(log_path("log_orderbook_data.csv"))
+    assert len(frames["orderbook"]) == len(csv)
+    assert (frames["orderbook"]["price"].astype(float).round(3) == csv["price"].round(3)).all()
+    assert len(frames["trades"]) == len(pd.read_csv(log_path("log_trades_data.csv")))
+    assert list(frames["game_record"]["Loop"]) == list(range(150))
+
+
+def test_streaming_columnar_export_writes_row_groups(products, trader):
+    pq = pytest.importorskip("pyarrow.parquet")
+    export(trader, products, columnar_export=True)
+    full = load_columnar()
+    for kwargs in ({"stream_export_every": 40}, {"stream_export_every": 40, "background_export": True}):
+        export(trader, products, columnar_export=True, **kwargs)
+        # appended flush by flush rather than read back from the CSVs at the end
+        assert pq.ParquetFile(log_path("log_orderbook_data.parquet")).num_row_groups == 4
+        streamed = load_columnar()
+        for key, frame in full.items():
+            pd.testing.assert_frame_equal(streamed[key], frame)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_columnar_record_keeps_the_message_column(products, trader, stream):
+    pytest.importorskip("pyarrow")
+
+    class Messenger(trader):
+        def send_messages(self, book):
+            self.message = f"tick {self.timestamp}, all good" if self.timestamp % 7 == 0 else ""
+            return super().send_messages(book)
+
+    export(Messenger, products, columnar_export=True, **({"stream_export_every": 40} if stream else {}))
+    record = load_columnar()["game_record"]
+    csv = pd.read_csv(log_path("log_game_record.csv"), keep_default_na=False, dtype={"PlayerAlgorithm_message": str})
+    assert list(record["PlayerAlgorithm_message"]) == list(csv["PlayerAlgorithm_message"])
+    assert record["PlayerAlgorithm_message"].iloc[7] == "tick 7, all good"
+    assert record["PlayerAlgorithm_Cash"].dtype == "float64"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_columnar_export_uses_book_options(products, trader, stream):
+    pytest.importorskip("pyarrow")
+    options = BookExportOptions(depth=3, aggregate=True, changed_only=True)
+    streaming = {"stream_export_every": 40} if stream else {}
+    export(trader, products, columnar_export=True, book_options=options, **streaming)
+    orderbook = load_columnar()["orderbook"]
+    csv = pd.read_csv(log_path("log_orderbook_data.csv"), dtype={"side": str}, keep_default_na=False)
+    assert list(orderbook.columns) == options.header
+    assert list(orderbook["num_orders"]) == list(csv["num_orders"])
+    assert list(orderbook["side"].astype(str)) == list(csv["side"])
+    assert list(orderbook["timestamp"]) == list(csv["timestamp"])
+
+
+def _levels(frame, timestamp, ticker, depth):
+    levels = frame[(frame.ticker == ticker) & (frame.timestamp == timestamp)].groupby(["side", "price"])["size"].sum()
+    return (list(levels["bid"].sort_index(ascending=False).head(depth)),
+            list(levels["ask"].sort_index().head(depth)))
+
+
+def test_book_options_keep_top_levels(products, trader):
+    export(trader, products)
+    full = pd.read_csv(log_path("log_orderbook_data.csv"))
+    export(trader, products, book_options=BookExportOptions(depth=5, aggregate=True, changed_only=True))
+    reduced = pd.read_csv(log_path("log_orderbook_data.csv"))
+    assert len(reduced) < len(full)
+    for timestamp in (10, 75, 149):
+        # changed_only: a ticker's book is the last one written at or before the timestamp
+        last = reduced[(reduced.ticker == "QFIN") & (reduced.timestamp <= timestamp)].timestamp.max()
+        assert _levels(reduced, last, "QFIN", 5) == _levels(full, timestamp, "QFIN", 5)
+
+
+def _check_index():
+    index = json.loads(read_log("log_orderbook_data.index.json"))
+    data = read_log("log_orderbook_data.csv")
+    rows = data.split(b"\r\n")[1:]
+    assert index["size"] == len(data)
+    for ticker, blocks in index["blocks"].items():
+        for timestamp, row_start, row_count, bid_count, byte_start, byte_end in blocks:
+            block = rows[row_start:row_start + row_count]
+            assert all(row.startswith(f"{timestamp},{ticker},".encode()) for row in block)
+            assert data[byte_start:byte_end] == b"".join(row + b"\r\n" for row in block)
+            assert sum(row.split(b",")[2] == b"bid" for row in block) == bid_count
+
+
+def test_orderbook_index(products, player):
+    export(player, products)
+    _check_index()
+    full_index = read_log("log_orderbook_data.index.json")
+    export(player, products, stream_export_every=13)
+    _check_index()
+    assert read_log("log_orderbook_data.index.json") == full_index
+    export(player, products, book_options=BookExportOptions(2, True, True))
+    _check_index()
+
+
+def test_binary_book_log(products, player):
+    from visualizer.book_log import BookLogReader
+    for kwargs in ({}, {"stream_export_every": 37}):
+        export(player, products, binary_book_log=True, **kwargs)
+        log = BookLogReader(log_path(""))
+        csv = pd.read_csv(log_path("log_orderbook_data.csv"))
+        block = csv[(csv.timestamp == 77) & (csv.ticker == "QFIN")]
+        bids, asks = log.book(77, "QFIN")
+        assert list(bids["price"]) == list(block[block.side == "bid"].price)
+        assert list(asks["size"]) == list(block[block.side == "ask"]["size"])
+        in_range = (csv.timestamp >= 10) & (csv.timestamp < 20)
+        assert len(log.range(10, 20)) == in_range.sum()
+        assert len(log.range(10, 20, "UEC")) == (in_range & (csv.ticker == "UEC")).sum()
+
+
+def test_background_writer_keeps_draining_after_an_error(tmp_path, monkeypatch):
+    import errno
+    import threading
+    import time
+
+    from visualizer import data_export
+
+    class FullDisk:
+        writes = 0
+
+        def write(self, text):
+            time.sleep(0.05)  # slow enough that the producer fills the queue and blocks
+            FullDisk.writes += 1
+            if FullDisk.writes == 2:
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(data_export, "open", lambda *args, **kwargs: FullDisk(), raising=False)
+    writer = data_export.BackgroundWriter(str(tmp_path), max_pending=2)
+    errors = []
+
+    def produce():
+        try:
+            for i in range(10):
+                writer.write("log.csv", f"row {i}\n")
+        except OSError as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    producer.join(timeout=5)
+    assert not producer.is_alive()  # not left blocked on a full queue
+    with pytest.raises(OSError) as raised:
+        writer.close()
+    assert raised.value.errno == errno.ENOSPC
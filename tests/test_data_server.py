@@ -0,0 +1,101 @@
+import gzip
+import io
+import random
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import runner
+from conftest import log_path
+from visualizer import data_server
+from visualizer.data_export import BookExportOptions
+
+
+@pytest.fixture(scope="module")
+def server():
+    http = data_server.ThreadingHTTPServer(("127.0.0.1", 0), data_server.DataRequestHandler)
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{http.server_address[1]}"
+    http.shutdown()
+    http.server_close()
+
+
+@pytest.fixture
+def exported(products, player):
+    random.seed(0)
+    runner.run_game(player, 200, products, visualiser=True,
+                    book_options=BookExportOptions(depth=3, aggregate=True, changed_only=True))
+    return pd.read_csv(log_path("log_orderbook_data.csv"))
+
+
+def get(url, **headers):
+    """The response, with its body already read (as .body)"""
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+        response.body = response.read()
+    return response
+
+
+def test_meta(server, exported):
+    import json
+    meta = json.loads(get(server + "/api/orderbook/meta").body)
+    assert meta["tickers"] == sorted(exported.ticker.unique())
+    assert (meta["first_timestamp"], meta["last_timestamp"]) == (exported.timestamp.min(), exported.timestamp.max())
+
+
+def test_slice_carries_the_previous_block_forward(server, exported):
+    response = get(server + "/api/orderbook?ticker=QFIN&start=100&end=150", **{"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    rows = pd.read_csv(io.BytesIO(gzip.decompress(response.body)))
+    qfin = exported[exported.ticker == "QFIN"]
+    first = qfin[qfin.timestamp <= 100].timestamp.max()
+    expected = qfin[(qfin.timestamp >= first) & (qfin.timestamp < 150)].reset_index(drop=True)
+    assert rows.equals(expected)
+
+
+def test_etag_revalidation(server, exported):
+    url = server + "/api/orderbook?ticker=QFIN&start=100&end=150"
+    etag = get(url).headers["ETag"]
+    with pytest.raises(urllib.error.HTTPError) as e:
+        get(url + "&_=123", **{"If-None-Match": etag})
+    assert e.value.code == 304
+    assert e.value.headers["Vary"] == "Accept-Encoding"
+
+
+def test_each_encoding_has_its_own_etag(server, exported):
+    url = server + "/api/orderbook?ticker=QFIN&start=100&end=150"
+    identity = get(url)
+    gzipped = get(url, **{"Accept-Encoding": "gzip"})
+    assert identity.headers["Vary"] == gzipped.headers["Vary"] == "Accept-Encoding"
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == identity.headers["ETag"][:-1] + '-gz"'
+    # a client that can't decode gzip never gets a 304 for the gzipped representation
+    assert get(url, **{"If-None-Match": gzipped.headers["ETag"]}).status == 200
+    with pytest.raises(urllib.error.HTTPError) as e:
+        get(url, **{"If-None-Match": gzipped.headers["ETag"], "Accept-Encoding": "gzip"})
+    assert e.value.code == 304
+
+
+def test_first_timestamp_matches_file_mode(server, exported):
+    import json
+    for ticker in exported.ticker.unique():
+        found = json.loads(get(server + f"/api/orderbook/first?ticker={ticker}&start=1").body)
+        # what the page looks up in the loaded file: the first block at or after timestamp 1
+        times = exported[(exported.ticker == ticker) & (exported.timestamp >= 1)].timestamp
+        assert found == {"timestamp": int(times.min()) if len(times) else None}
+    assert json.loads(get(server + "/api/orderbook/first?ticker=NONE&start=1").body) == {"timestamp": None}
+
+
+def test_scanned_index_matches_exported_index(exported):
+    exported_index = data_server.OrderbookIndex(log_path("log_orderbook_data.csv"))
+    scanned = data_server.OrderbookIndex.__new__(data_server.OrderbookIndex)
+    scanned.path, scanned.header, scanned.by_ticker = exported_index.path, exported_index.header, {}
+    scanned._scan()
+    assert scanned.by_ticker == exported_index.by_ticker
+
+
+def test_static_files(server):
+    assert get(server + "/visualizer/visualiser.html").status == 200
@@ -0,0 +1,58 @@
+import json
+import random
+
+import numpy as np
+
+import pytest
+
+import runner
+from conftest import VISUALIZER_DIR, read_log
+from visualizer.downsample import export_chart_series, lttb, minmax_buckets
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(100000.)
+    y = np.sin(x / 1000) + np.random.default_rng(0).normal(0, 0.01, len(x))
+    y[5000] = 50
+    dx, dy = lttb(x, y, 1000)
+    assert len(dx) == 1000
+    assert (dx[0], dx[-1]) == (x[0], x[-1])
+    assert dy.max() == 50
+    assert np.all(np.diff(dx) > 0)
+
+
+def test_minmax_buckets_keep_extremes():
+    x = np.arange(100000.)
+    y = np.random.default_rng(1).normal(0, 1, len(x))
+    dx, dy = minmax_buckets(x, y, 1000)
+    assert len(dx) <= 1000
+    assert (dy.max(), dy.min()) == (y.max(), y.min())
+    assert np.all(np.diff(dx) > 0)
+
+
+def test_chart_series_export(products, trader):
+    random.seed(0)
+    runner.run_game(trader, 2500, products, visualiser=True, stream_export_every=500)
+    series = json.loads(read_log("log_chart_series.json"))
+    assert series["full_length"] == 2500
+    assert [level["points"] for level in series["levels"]] == [1000]
+    assert all(len(s["x"]) <= 1000 for s in series["levels"][0]["series"].values())
+    assert "pnl:ALL" in series["levels"][0]["series"]
+
+
+@pytest.mark.parametrize("streaming", [{}, {"stream_export_every": 700}])
+def test_chart_series_are_built_without_reading_the_csv(products, trader, monkeypatch, streaming):
+    import pandas as pd
+    random.seed(0)
+    read_csv = pd.read_csv
+
+    def no_record_reads(path, *args, **kwargs):
+        assert not str(path).endswith("log_game_record.csv"), "chart series re-read the game record"
+        return read_csv(path, *args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", no_record_reads)
+    runner.run_game(trader, 2100, products, visualiser=True, **streaming)
+    monkeypatch.undo()
+    from_memory = json.loads(read_log("log_chart_series.json"))
+    export_chart_series(VISUALIZER_DIR, "PlayerAlgorithm")  # from the CSV on disk
+    assert from_memory == json.loads(read_log("log_chart_series.json"))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from conftest import Trader
+from evaluation import SequentialTest, evaluate
+
+
+def test_evaluate_stops_once_decided(products):
+    result = evaluate(Trader, 100, products, reference=1e6, seeds=8, min_runs=3, workers=1, verbose=False)
+    assert result.decision == "worse"
+    assert result.runs_used == 3
+    assert result.runs_saved == 5
+    assert result.seeds == [0, 1, 2]
+    assert result.high < result.reference
+
+
+def test_evaluate_against_reference_runs(products):
+    result = evaluate(Trader, 100, products, reference=[5e5, 6e5, 5.5e5, 4.5e5], seeds=6, min_runs=3, workers=1,
+                      verbose=False)
+    assert result.decision == "worse"
+
+
+def _false_decision_rate(test, pnls):
+    decisions = 0
+    for runs in pnls:
+        for n in range(test.min_runs, len(runs) + 1):
+            decision, _ = test.check(runs[:n])
+            if decision is not None:
+                decisions += 1
+                break
+    return decisions / len(pnls)
+
+
+@pytest.mark.parametrize("spending", ["obrien-fleming", "pocock"])
+def test_false_decision_rate_matches_confidence(spending):
+    # a bot whose true score equals the reference: any decision is a false one
+    rng = np.random.default_rng(1)
+    mean, std = 3000.0, 800.0
+    test = SequentialTest(mean - 0.1 * std, 20, min_runs=5, confidence=0.95, spending=spending)
+    rate = _false_decision_rate(test, rng.normal(mean, std, size=(2000, 20)))
+    assert 0.03 < rate < 0.07
+
+
+def test_false_decision_rate_against_reference_runs():
+    rng = np.random.default_rng(2)
+    # fresh reference runs for every evaluation, so the rate is over both sides' noise
+    decisions = 0
+    for _ in range(1000):
+        test = SequentialTest(rng.normal(1000.0, 300.0, size=10), 20, min_runs=5, confidence=0.95)
+        decisions += _false_decision_rate(test, rng.normal(1000.0, 300.0, size=(1, 20)))
+    assert 0.025 < decisions / 1000 < 0.08
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from base import Rest
+from features import (EWMA, FeatureSet, RealizedVol, RingBuffer, RollingCovariance, RollingMean, RollingSum,
+                      RollingVariance, SignAutocorrelation)
+
+
+def test_rolling_estimators_match_pandas():
+    rng = np.random.default_rng(0)
+    x = rng.normal(5, 2, 1000)
+    y = x * 0.5 + rng.normal(0, 1, 1000)
+    mean, variance, covariance, ewma = RollingMean(50), RollingVariance(50), RollingCovariance(50, 2), EWMA(halflife=10)
+    for a, b in zip(x, y):
+        mean.update(a)
+        variance.update(a)
+        covariance.update([a, b])
+        ewma.update(a)
+    series = pd.Series(x)
+    assert mean.value == pytest.approx(series.rolling(50).mean().iloc[-1])
+    assert variance.value == pytest.approx(series.rolling(50).var().iloc[-1])
+    assert covariance.value[0, 1] == pytest.approx(pd.Series(x[-50:]).cov(pd.Series(y[-50:])))
+    assert ewma.value == pytest.approx(series.ewm(halflife=10, adjust=False).mean().iloc[-1])
+
+
+def test_sign_autocorrelation_of_alternating_signs():
+    acf = SignAutocorrelation(100)
+    for i in range(500):
+        acf.update(1 if i % 2 == 0 else -1)
+    assert acf.value == pytest.approx(-1)
+
+
+def test_standard_feature_set_on_empty_books():
+    features = FeatureSet.standard(["QFIN", "UEC"], 50, 10)
+    for _ in range(10):
+        features.update({ticker: {"Bids": [], "Asks": []} for ticker in ("QFIN", "UEC")})
+    values = features.values()
+    for ticker in ("QFIN", "UEC"):
+        assert values[f"ofi[{ticker}]"] == 0
+        for name in ("ewma", "mean", "var", "vol", "sign_acf"):
+            assert math.isnan(values[f"{name}[{ticker}]"])
+    assert np.isnan(values["cov"]).all()
+
+
+def _book(bid, bid_sizes, ask, ask_sizes):
+    """One-ticker book: orders of bid_sizes at bid (and one a tick below), ask_sizes at ask (and one above)"""
+    bids = [Rest(size, bid, "Buy", i, "T", bid, "b") for i, size in enumerate(bid_sizes)]
+    asks = [Rest(size, ask, "Sell", 100 + i, "T", -ask, "b") for i, size in enumerate(ask_sizes)]
+    bids.append(Rest(50, bid - 1, "Buy", 99, "T", bid - 1, "b"))
+    asks.append(Rest(50, ask + 1, "Sell", 199, "T", -(ask + 1), "b"))
+    return {"T": {"Bids": bids, "Asks": asks}}
+
+
+def test_order_flow_imbalance_of_known_book_changes():
+    features = FeatureSet.standard(["T"], window=10)
+    features.update(_book(99.0, [2, 3], 101.0, [4]))
+    assert features.ofi["T"] == 0  # nothing to compare against yet
+    # 3 more bid size at an unchanged best bid, asks unchanged: +3
+    features.update(_book(99.0, [2, 3, 3], 101.0, [4]))
+    assert features.ofi["T"] == 3
+    # bid falls to 98 (the 8 at 99 is gone) and a new best ask of 6 at 100: -8 - 6
+    features.update(_book(98.0, [2], 100.0, [6]))
+    assert features.ofi["T"] == -14
+    # the ask goes back up to 101 (size 5): +6 at the old ask, bid unchanged at 98 (size 2 -> 2)
+    features.update(_book(98.0, [2], 101.0, [5]))
+    assert features.ofi["T"] == 2 - 2 + 6
+    assert features["ofi[T]"] == 0 + 3 - 14 + 6
+
+
+def test_realized_vol_over_a_known_window():
+    features = FeatureSet(["T"])
+    vol = features.add("vol", RealizedVol(3), lambda f: f.returns["T"])
+    mids = [100.0, 101.0, 99.0, 102.0, 100.0]
+    for mid in mids:
+        features.update(_book(mid - 1, [1], mid + 1, [1]))
+    returns = [math.log(b / a) for a, b in zip(mids, mids[1:])]
+    assert features.returns["T"] == pytest.approx(returns[-1])
+    assert vol.squares.count == 3
+    assert features["vol"] == pytest.approx(math.sqrt(sum(r * r for r in returns[-3:])))
+
+
+def test_ring_buffer_wraps_around():
+    buffer = RingBuffer(3)
+    assert [buffer.push(x) for x in (1, 2, 3)] == [None, None, None]
+    assert buffer.push(4) == 1
+    assert buffer.push(5) == 2
+    assert list(buffer.values()) == [3, 4, 5]
+    assert buffer.pos == 2
+
+    total, mean = RollingSum(3), RollingMean(3)
+    for x in range(1, 8):
+        total.update(x)
+        mean.update(x)
+    assert total.value == 5 + 6 + 7
+    assert mean.value == 6
@@ -0,0 +1,116 @@
+import copy
+import random
+
+import pytest
+
+from base import Exchange, Msg, Order
+from bots1 import NoiseBot
+from parallel_matching import ShardedExchange
+
+
+def _trade_key(trade):
+    return trade.ticker, trade.price, trade.size, trade.agg_order_id, trade.rest_order_id, trade.agg_dir, trade.loop_num
+
+
+def _book_key(book):
+    return {ticker: {side: [(rest.order_id, rest.size, rest.price) for rest in rests] for side, rests in sides.items()}
+            for ticker, sides in book.items()}
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_matches_like_a_serial_exchange(products, workers):
+    bots = [NoiseBot(products, f"Noise{i}") for i in range(4)]
+    serial = Exchange(products)
+    order_id = 0
+    with ShardedExchange(products, workers=workers) as sharded:
+        for loop in range(60):
+            messages = []
+            for bot in bots:
+                bot.set_idx(order_id)
+                order_id += 10000
+                messages += bot.send_messages(serial.book)
+            if serial.order_ids:
+                messages += [Msg("REMOVE", random.choice(list(serial.order_ids))) for _ in range(3)]
+
+            trades, removed = [], {}
+            sharded_messages = copy.deepcopy(messages)
+            for message in messages:
+                if message.msg_type == "ORDER":
+                    trades += serial.process_order(message.message, loop)
+                elif message.msg_type == "REMOVE":
+                    removed[message.message] = serial.remove_order(message.message)
+            result = sharded.match(sharded_messages, loop)
+
+            assert [_trade_key(t) for t in result.trades] == [_trade_key(t) for t in trades]
+            assert result.removed == removed
+            assert _book_key(sharded.book) == _book_key(serial.book)
+
+
+class RejectingExchange(Exchange):
+    """Refuses orders at a negative price, after the ShardedExchange has accepted the batch"""
+    def process_order(self, order, loop_num):
+        if order.price < 0:
+            raise ValueError("negative price")
+        return super().process_order(order, loop_num)
+
+
+def _order(ticker, price, order_id, side="Buy"):
+    return Msg("ORDER", Order(ticker, price, 5, order_id, side, "Bot"))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_rejected_batches_leave_no_trace(products, workers):
+    with ShardedExchange(products, workers=workers, exchange_class=RejectingExchange) as sharded:
+        sharded.match([_order("UEC", 10, 1), _order("QFIN", 20, 2, "Sell")], 0)
+        before = _book_key(sharded.book)
+
+        # an id repeated after its first order came to rest is refused, and the first order is undone
+        with pytest.raises(ValueError, match="Already Seen"):
+            sharded.match([_order("UEC", 11, 3), _order("QFIN", 21, 3)], 1)
+        # one shard failing undoes what the other shards matched
+        with pytest.raises(ValueError, match="negative price"):
+            sharded.match([_order("UEC", 9, 4, "Sell"), _order("SOBER", 5, 5), _order("QFIN", -1, 6)], 1)
+        assert _book_key(sharded.book) == before
+        assert set(sharded.order_ids) == {1, 2}
+
+        result = sharded.match([_order("UEC", 9, 3, "Sell"), _order("SOBER", 5, 4), _order("QFIN", 21, 6)], 1)
+        assert [(t.agg_order_id, t.rest_order_id, t.size) for t in result.trades] == [(3, 1, 5), (6, 2, 5)]
+        assert _book_key(sharded.book) == {"UEC": {"Bids": [], "Asks": []}, "QFIN": {"Bids": [], "Asks": []},
+                                           "SOBER": {"Bids": [(4, 5, 5)], "Asks": []},
+                                           "GUILD": {"Bids": [], "Asks": []}}
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_order_ids_are_taken_like_the_exchange(products, workers):
+    ticks = [
+        [_order("UEC", 100, 1, "Sell"), _order("QFIN", 50, 7)],
+        [_order("UEC", 100, 2)],                                  # fills completely, id 2 never rests
+        [Msg("REMOVE", 2), _order("UEC", 90, 2)],                 # so REMOVE 2 misses and id 2 can be reused
+        [_order("QFIN", 40, 8), _order("QFIN", 45, 8)],           # 8 rests: the repeat is refused
+        [Msg("REMOVE", 2), _order("SOBER", 5, 9, "Sell"), _order("SOBER", 5, 10), _order("GUILD", 3, 10)],
+        [_order("UEC", 90, 2)],                                   # 2 rested on tick 2
+        [_order("UEC", 10, 11), _order("QFIN", 10, 11)],          # 11 rests, then comes again on another shard
+    ]
+    serial = Exchange(products)
+    with ShardedExchange(products, workers=workers) as sharded:
+        for loop, messages in enumerate(ticks):
+            trades, removed, error = [], {}, None
+            try:
+                for message in copy.deepcopy(messages):
+                    if message.msg_type == "ORDER":
+                        trades += serial.process_order(message.message, loop)
+                    else:
+                        removed[message.message] = serial.remove_order(message.message)
+            except ValueError as e:
+                error = e
+            if error is not None:
+                serial = copy.deepcopy(backup)  # a sharded batch is all or nothing
+                with pytest.raises(ValueError, match="Already Seen"):
+                    sharded.match(copy.deepcopy(messages), loop)
+            else:
+                result = sharded.match(copy.deepcopy(messages), loop)
+                assert [_trade_key(t) for t in result.trades] == [_trade_key(t) for t in trades]
+                assert result.removed == removed
+            assert _book_key(sharded.book) == _book_key(serial.book)
+            assert set(sharded.order_ids) == set(serial.order_ids)
+            backup = copy.deepcopy(serial)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import runner
+from profiler import LatencyHistogram, deep_sizeof
+
+
+def test_memory_profile_attributes_history_growth(products, player):
+    result = runner.run_game(player, 300, products, visualiser=False, memory_profile=True, memory_every=100,
+                             print_profile=False)
+    memory = result.memory
+    assert memory["snapshots"] >= 3
+    history = memory["structures"]["orderbook_history"]
+    assert history["mb"] > 0
+    # history is a deep copy of the book per tick, it's what grows fastest
+    assert history["mb_per_1000_ticks"] == max(s["mb_per_1000_ticks"] for s in memory["structures"].values())
+    assert memory["traced"]["mb"] >= history["mb"]
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = list(range(1000))
+    assert deep_sizeof([shared, shared], set()) < 2 * deep_sizeof(shared, set())
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    durations = np.random.default_rng(0).lognormal(11, 1, 10000).astype(int)
+    for duration in durations:
+        histogram.record(int(duration))
+    summary = histogram.summary()
+    assert summary["calls"] == 10000
+    assert summary["max_ms"] == durations.max() / 1e6
+    for q in (10, 50, 90, 99):
+        assert histogram.percentile(q) == pytest.approx(np.percentile(durations, q) / 1e6, rel=0.2)
+    assert histogram.percentile(100) == summary["max_ms"]
+
+
+def test_latency_histogram_single_bucket():
+    histogram = LatencyHistogram()
+    for duration in (1500, 1600, 1700, 1800):  # all in the 1-2us bucket
+        histogram.record(duration)
+    assert 0.001 <= histogram.percentile(50) <= 0.0018
@@ -0,0 +1,54 @@
+import random
+
+import runner
+from base_algo import PlayerAlgorithm
+
+
+def _brute_force_queue(book, order_id):
+    """(size ahead, size behind) of order_id at its price level, walking the book"""
+    for side in ("Bids", "Asks"):
+        for rest in book[side]:
+            if rest.order_id == order_id:
+                level = [other for other in book[side] if other.price == rest.price]
+                i = level.index(rest)
+                return sum(other.size for other in level[:i]), sum(other.size for other in level[i + 1:])
+    return None
+
+
+def test_queue_positions_match_the_book(products):
+    checked = []
+
+    class Quoter(PlayerAlgorithm):
+        def send_messages(self, book):
+            super().send_messages(book)
+            live = self.queue_tracker.live_orders(self.name)
+            for order_id, info in live.items():
+                assert _brute_force_queue(book[info["ticker"]], order_id) == (info["ahead"], info["behind"])
+                checked.append(order_id)
+            messages = []
+            if random.random() < 0.5:
+                side = random.choice(["Buy", "Sell"])
+                messages.append(self.create_order(random.choice(["QFIN", "UEC"]), 999.0 if side == "Buy" else 1001.0,
+                                                  random.randint(1, 5), side))
+            if live and random.random() < 0.2:
+                order_id = random.choice(list(live))
+                messages.append(self.cancel_order(live[order_id]["ticker"], order_id))
+            return messages
+
+    runner.run_game(Quoter, 500, products, visualiser=False, track_queues=True)
+    assert len(checked) > 100
+
+
+def test_live_orders_only_reads_the_bots_own_orders():
+    from queue_tracker import QueueTracker
+    tracker = QueueTracker(watch=["me"])
+    for i in range(1000):
+        tracker.on_add(i, "QFIN", "Bids", 900.0 + i % 50, 5, "other")
+    tracker.on_add(5000, "QFIN", "Bids", 910.0, 3, "me")
+    tracker.on_add(5001, "QFIN", "Asks", 1100.0, 2, "me")
+    tracker.on_fill(10, 5)  # the front order at 910
+    tracker.on_cancel(5001)
+    tracker.levels = None  # anything that walks the levels would now fail
+    assert tracker.live_orders("me") == {
+        5000: {"ticker": "QFIN", "side": "Bids", "price": 910.0, "remaining": 3, "ahead": 95, "behind": 0}}
+    assert tracker.live_orders("nobody") == {}
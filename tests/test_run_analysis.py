@@ -0,0 +1,87 @@
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+import run_analysis
+import runner
+from conftest import log_path
+
+LOGS = ("log_game_record.csv", "log_orderbook_data.csv", "log_trades_data.csv")
+
+
+@pytest.fixture
+def runs(tmp_path, products, trader):
+    for seed in range(2):
+        random.seed(seed)
+        runner.run_game(trader, 300, products, visualiser=True)
+        run = tmp_path / f"seed{seed}"
+        run.mkdir()
+        for name in LOGS:
+            shutil.copy(log_path(name), run / name)
+    return tmp_path
+
+
+def test_run_stats(runs, products):
+    frames = run_analysis.load_run(str(runs / "seed0"))
+    stats = run_analysis.run_stats(frames, products)
+    record = frames["game_record"]
+    assert stats["player"] == "PlayerAlgorithm"
+    assert stats["timestamps"] == 300
+    assert stats["total_pnl"] == pytest.approx(record["PlayerAlgorithm_PnL"].iloc[-1])
+    assert stats["fills"] > 0
+    assert stats["volume[QFIN]"] == stats["volume"]
+
+
+def test_analyze_runs(runs, products):
+    table = run_analysis.analyze_runs(str(runs), products, workers=1)
+    assert len(table) == 2
+    assert list(table["run"]) == [str(runs / "seed0"), str(runs / "seed1")]
+
+
+def test_bootstrap_score_is_reproducible_across_pools():
+    pnls = np.random.default_rng(1).normal(1000, 500, 20)
+    serial = run_analysis.bootstrap_score(pnls, seed=1)
+    assert serial["low"] < serial["score"] < serial["high"]
+    assert run_analysis.bootstrap_score(pnls, seed=1, workers=4) == serial
+    assert run_analysis.bootstrap_score(pnls, seed=1, workers=2, pool="process") == serial
+
+
+def test_compare_scores():
+    rng = np.random.default_rng(2)
+    better, worse = rng.normal(1000, 100, 30), rng.normal(500, 100, 30)
+    assert run_analysis.compare_scores(better, worse, seed=0)["differs"]
+    assert not run_analysis.compare_scores(better, better + rng.normal(0, 1, 30), seed=0)["differs"]
+
+
+def test_block_bootstrap_of_pnl_paths():
+    paths = np.cumsum(np.random.default_rng(3).normal(0.05, 1, (10, 5000)), axis=1)
+    stats = run_analysis.bootstrap_score(paths, block_size=500, resamples=2000, seed=3)
+    assert stats["score"] == pytest.approx(run_analysis.score(paths[:, -1]))
+    assert stats["low"] < stats["score"] < stats["high"]
+
+
+def test_fill_markouts_match_the_record(runs):
+    frames = run_analysis.load_run(str(runs / "seed0"))
+    fills = run_analysis.fill_markouts(frames, (1, 10))
+    assert len(fills) > 0
+    mids = frames["game_record"]["QFIN"].astype(float).to_numpy()
+    for _, fill in fills[(fills.timestamp > 0) & (fills.timestamp < 280)].iterrows():
+        sign = 1 if fill.side == "buy" else -1
+        assert fill.edge == pytest.approx(sign * (mids[fill.timestamp - 1] - fill.price))
+        assert fill["markout[10]"] == pytest.approx(sign * (mids[fill.timestamp + 10] - fill.price))
+        assert fill["adverse[10]"] == pytest.approx(fill.edge - fill["markout[10]"])
+    summary = run_analysis.markout_summary(fills)
+    assert "markout[10]" in summary.columns or "markout[10]" in summary.index
+
+
+def test_fill_markouts_without_an_earlier_mid(runs):
+    frames = run_analysis.load_run(str(runs / "seed0"))
+    trades = frames["trades"].copy()
+    trades["timestamp"] = 0
+    fills = run_analysis.fill_markouts({**frames, "trades": trades}, (1,))
+    assert len(fills) > 0
+    assert fills.edge.isna().all()
+    assert fills["adverse[1]"].isna().all()
+    assert fills["markout[1]"].notna().all()
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import game_setup
+import runner
+from conftest import Trader
+from base_algo import PlayerAlgorithm
+
+
+def test_pnl_is_the_engines_return_value(products, player):
+    result = runner.run_game(player, 100, products, visualiser=False)
+    assert isinstance(result, runner.RunResult)
+    assert isinstance(result.pnl, float)
+    assert result.profile is None and result.bot_timings is None and result.missed_deadlines is None
+
+
+def test_hooks_are_restored(products, trader):
+    originals = (PlayerAlgorithm.send_messages, PlayerAlgorithm.process_trades, game_setup.Exchange.process_order)
+    runner.run_game(trader, 50, products, visualiser=False, profile=True, print_profile=False, time_bots=True,
+                    track_queues=True, lazy_book=True, shared_history=True)
+    assert (PlayerAlgorithm.send_messages, PlayerAlgorithm.process_trades,
+            game_setup.Exchange.process_order) == originals
+
+
+def test_profile(products, trader):
+    result = runner.run_game(trader, 200, products, visualiser=False, profile=True, print_profile=False)
+    assert result.profile["ticks"] == 200
+    phases = result.profile["phases"]
+    assert any(phase.startswith("send_messages") for phase in phases)
+    assert "matching" in phases
+
+
+def test_bot_budget_skip(products):
+    class Slow(PlayerAlgorithm):
+        def send_messages(self, book):
+            if self.timestamp % 50 == 0:
+                time.sleep(0.01)
+            return super().send_messages(book)
+
+    result = runner.run_game(Slow, 200, products, visualiser=False, bot_budget_ms=5, on_budget="skip",
+                             print_profile=False)
+    assert "PlayerAlgorithm" in result.over_budget_bots()
+    # ticks are the game's loop numbers
+    assert {0, 50, 100, 150} <= set(result.bot_timings["PlayerAlgorithm"]["first_over_budget"])
+    assert result.bot_timings["PlayerAlgorithm"]["skipped"] >= 4
+
+
+def test_invalid_on_budget(products, player):
+    with pytest.raises(ValueError):
+        runner.run_game(player, 10, products, on_budget="drop")
+
+
+def test_async_scheduler_only_for_async_bots(products, player, monkeypatch):
+    def no_scheduler(*args, **kwargs):
+        raise AssertionError("no bot is async")
+
+    monkeypatch.setattr(runner, "AsyncBotScheduler", no_scheduler)
+    result = runner.run_game(player, 20, products, visualiser=False, async_deadline_ms=10)
+    assert result.missed_deadlines is None
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from base import Exchange, Rest
+from base_algo import PlayerAlgorithm
+from bots1 import NoiseBot
+from shared_book import BotPool, SharedBook, SharedBookView, _levels
+
+
+class Crash(NoiseBot):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.ticks = 0
+
+    def send_messages(self, book):
+        if self.ticks == 5:
+            raise RuntimeError("boom")
+        self.ticks += 1
+        return super().send_messages(book)
+
+
+class ReadOnlyCheck(PlayerAlgorithm):
+    def send_messages(self, book):
+        messages = super().send_messages(book)
+        prices, _ = book.levels("QFIN", "Bids")
+        if prices.flags.writeable:
+            raise AssertionError("bots must not be able to write the shared book")
+        return messages + [self.create_order("QFIN", 1000, 1, "Buy")]
+
+
+def _play(pool, exchange, ticks):
+    trades = []
+    for loop in range(ticks):
+        decisions = pool.tick(exchange.book, trades)
+        trades = []
+        for message in decisions.messages:
+            if message.msg_type == "ORDER":
+                trades += exchange.process_order(message.message, loop)
+            elif message.msg_type == "REMOVE":
+                exchange.remove_order(message.message)
+    return decisions
+
+
+def test_pool_survives_a_crashing_bot(products):
+    exchange = Exchange(products)
+    tickers = [p.ticker for p in products]
+    bots = [(NoiseBot, (products, "N1")), (Crash, (products, "C")), (ReadOnlyCheck, (products, 100)),
+            (NoiseBot, (products, "N2"))]
+    with BotPool(bots, tickers, depth=50) as pool:
+        decisions = _play(pool, exchange, 20)
+        assert list(pool.crashed) == ["C"]
+        assert list(decisions.by_bot) == ["N1", "PlayerAlgorithm", "N2"]
+        assert len(decisions.by_bot["PlayerAlgorithm"]) == 1
+
+
+def test_view_matches_the_book(products):
+    exchange = Exchange(products)
+    tickers = [p.ticker for p in products]
+    bot = NoiseBot(products, "N")
+    for loop in range(20):
+        for message in bot.send_messages(exchange.book):
+            if message.msg_type == "ORDER":
+                exchange.process_order(message.message, loop)
+    book = SharedBook(tickers, 50)
+    view = SharedBookView(book.name, tickers, 50)
+    try:
+        book.publish(exchange.book, 7)
+        assert view.tick == 0
+        view.refresh()
+        assert view.tick == 7
+        for ticker in tickers:
+            for side in ("Bids", "Asks"):
+                prices, sizes = _levels(exchange.book[ticker][side])
+                assert [(r.price, r.size) for r in view[ticker][side]] == list(zip(prices[:50], sizes[:50].astype(int)))
+    finally:
+        view.close()
+        book.close()
+
+
+def test_late_bot_misses_ticks_without_falling_behind(products):
+    class Slow(PlayerAlgorithm):
+        def send_messages(self, book):
+            if self.timestamp % 3 == 0:
+                time.sleep(0.06)
+            super().send_messages(book)
+            return [self.create_order("UEC", 900 + self.timestamp, 1, "Buy")]
+
+    exchange = Exchange(products)
+    with BotPool([(Slow, (products, 10))], [p.ticker for p in products], deadline_ms=20) as pool:
+        prices = []
+        for _ in range(9):
+            decisions = pool.tick(exchange.book)
+            prices.append([m.message.price for m in decisions.messages])
+            time.sleep(0.02)
+    # the slow tick's answer is dropped, the bot is left out while busy and answers again once caught up
+    assert prices[0] == []
+    assert any(prices[1:])
+
+
+def test_refresh_never_sees_a_half_published_book():
+    tickers = [f"T{i}" for i in range(8)]
+
+    def book_at(price):
+        return {ticker: {"Bids": [Rest(1, price - k, "Buy", k, ticker, price - k, "b") for k in range(20)],
+                         "Asks": [Rest(1, price + 1 + k, "Sell", k, ticker, -(price + 1 + k), "b") for k in range(20)]}
+                for ticker in tickers}
+
+    books = [book_at(100.0), book_at(200.0)]
+    shared = SharedBook(tickers, 20)
+    view = SharedBookView(shared.name, tickers, 20)
+    stop = threading.Event()
+
+    def publish():
+        tick = 0
+        while not stop.is_set():
+            shared.publish(books[tick % 2], tick)
+            tick += 1
+            time.sleep(0)  # lets the reader in between publishes as well as during them
+
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    try:
+        for _ in range(2000):
+            view.refresh()
+            best = 100.0 if view.tick % 2 == 0 else 200.0
+            for ticker in tickers:
+                assert view.levels(ticker, "Bids")[0][0] == best
+                assert view.levels(ticker, "Asks")[0][-1] == best + 20
+    finally:
+        stop.set()
+        publisher.join()
+        view.close()
+        shared.close()
+
+
+def test_bot_is_asked_again_once_its_late_reply_is_in(products):
+    class SlowStart(PlayerAlgorithm):
+        def send_messages(self, book):
+            if self.timestamp == 0:
+                time.sleep(0.06)
+            super().send_messages(book)
+            return [self.create_order("UEC", 900, 1, "Buy")]
+
+    exchange = Exchange(products)
+    with BotPool([(SlowStart, (products, 10))], [p.ticker for p in products], deadline_ms=20) as pool:
+        assert pool.tick(exchange.book).missed == ["PlayerAlgorithm"]
+        time.sleep(0.1)  # the late reply has arrived by the next tick
+        decisions = pool.tick(exchange.book)
+    assert decisions.missed == []
+    assert len(decisions.messages) == 1
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trade_tape import TradeTape
+
+
+def _trades(n):
+    return [SimpleNamespace(ticker="A", loop_num=i // 3, price=100 + i % 7, size=1 + i % 3,
+                            agg_dir="Buy" if i % 2 else "Sell") for i in range(n)]
+
+
+def test_live_tape_windows():
+    tape = TradeTape()
+    trades = _trades(5000)
+    for trade in trades:
+        tape.add_trades([trade])
+    a = tape["A"]
+    window = [t for t in trades if 0 <= t.loop_num < 10]
+    assert len(a) == 5000
+    assert a.volume(0, 10) == sum(t.size for t in window)
+    assert a.signed_volume(0, 10) == sum(t.size * (1 if t.agg_dir == "Buy" else -1) for t in window)
+    assert a.vwap(0, 10) == pytest.approx(sum(t.price * t.size for t in window) / sum(t.size for t in window))
+    assert a.last_price(5) == [t.price for t in trades if t.loop_num < 5][-1]
+    with pytest.raises(ValueError):
+        a.append(0, 1, 1, 1)  # out of order
+
+
+def test_from_frame_and_rolling_vwap():
+    frame = pd.DataFrame({"timestamp": [t.loop_num for t in _trades(600)], "ticker": "A",
+                          "price": [t.price for t in _trades(600)], "size": [t.size for t in _trades(600)],
+                          "side": [t.agg_dir.lower() for t in _trades(600)]})
+    tape = TradeTape.from_frame(frame)["A"]
+    assert tape.count(10, 20) == ((frame.timestamp >= 10) & (frame.timestamp < 20)).sum()
+    ends = np.arange(50, 200, 50)
+    rolling = tape.rolling_vwap(ends, 40)
+    assert rolling == pytest.approx([tape.vwap(end - 40, end) for end in ends])
@@ -0,0 +1,200 @@
+"""
+Per-ticker trade tape with time-range queries.
+
+Trades are stored per ticker as columnar NumPy arrays in loop_num order (they arrive that way), with
+running totals of volume, notional and signed volume alongside. A window is found with two bisects
+(np.searchsorted) and its aggregates are a difference of running totals, so "what traded in QFIN in
+the last 50 ticks" is O(log n) no matter how long the run is.
+
+Live, in a bot:
+
+    self.tape = TradeTape()                      # in __init__
+    self.tape.add_trades(trades)                 # in process_trades
+    self.tape["QFIN"].vwap(self.timestamp - 50, self.timestamp)
+
+Offline, from an exported run:
+
+    tape = TradeTape.from_frame(run_analysis.load_run('visualizer')['trades'])
+    tape["QFIN"].rolling_vwap(np.arange(0, 20000, 100), window=500)
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+class TickerTape:
+    """Trades of one ticker. Arrays grow by doubling, so appends are amortized O(1)"""
+    def __init__(self, capacity: int = 1024):
+        self.n = 0
+        self._loop = np.empty(capacity, dtype=np.int64)
+        self._price = np.empty(capacity)
+        self._size = np.empty(capacity)
+        self._sign = np.empty(capacity, dtype=np.int8)  # aggressor side, +1 buy / -1 sell
+        # running totals with a leading 0, so the sum over trades [lo, hi) is cum[hi] - cum[lo]
+        self._cum_volume = np.zeros(capacity + 1)
+        self._cum_notional = np.zeros(capacity + 1)
+        self._cum_signed = np.zeros(capacity + 1)
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self, needed):
+        capacity = len(self._loop)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_loop", "_price", "_size", "_sign"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+        for name in ("_cum_volume", "_cum_notional", "_cum_signed"):
+            old = getattr(self, name)
+            new = np.zeros(capacity + 1)
+            new[:self.n + 1] = old[:self.n + 1]
+            setattr(self, name, new)
+
+    def append(self, loop_num: int, price: float, size: float, sign: int):
+        self.extend([loop_num], [price], [size], [sign])
+
+    def extend(self, loops, prices, sizes, signs):
+        """Appends trades given as columns. loop_nums must not go back in time"""
+        loops = np.asarray(loops, dtype=np.int64)
+        count = len(loops)
+        if not count:
+            return
+        if (self.n and loops[0] < self._loop[self.n - 1]) or (np.diff(loops) < 0).any():
+            raise ValueError("Trades must be added in loop_num order")
+        if self.n + count > len(self._loop):
+            self._grow(self.n + count)
+
+        lo, hi = self.n, self.n + count
+        prices = np.asarray(prices, dtype=float)
+        sizes = np.asarray(sizes, dtype=float)
+        signs = np.asarray(signs, dtype=np.int8)
+        self._loop[lo:hi] = loops
+        self._price[lo:hi] = prices
+        self._size[lo:hi] = sizes
+        self._sign[lo:hi] = signs
+        self._cum_volume[lo + 1:hi + 1] = self._cum_volume[lo] + np.cumsum(sizes)
+        self._cum_notional[lo + 1:hi + 1] = self._cum_notional[lo] + np.cumsum(sizes * prices)
+        self._cum_signed[lo + 1:hi + 1] = self._cum_signed[lo] + np.cumsum(sizes * signs)
+        self.n = hi
+
+    # ===== Columns (views of the live arrays, don't write to them) =====
+    @property
+    def loop_num(self):
+        return self._loop[:self.n]
+
+    @property
+    def price(self):
+        return self._price[:self.n]
+
+    @property
+    def size(self):
+        return self._size[:self.n]
+
+    @property
+    def sign(self):
+        return self._sign[:self.n]
+
+    # ===== Queries over start <= loop_num < end =====
+    def bounds(self, start, end):
+        """Index range [lo, hi) of the trades with start <= loop_num < end"""
+        loops = self._loop[:self.n]
+        return int(np.searchsorted(loops, start, side="left")), int(np.searchsorted(loops, end, side="left"))
+
+    def trades(self, start, end) -> Dict[str, np.ndarray]:
+        lo, hi = self.bounds(start, end)
+        return {"loop_num": self._loop[lo:hi], "price": self._price[lo:hi],
+                "size": self._size[lo:hi], "sign": self._sign[lo:hi]}
+
+    def count(self, start, end) -> int:
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def volume(self, start, end) -> float:
+        lo, hi = self.bounds(start, end)
+        return float(self._cum_volume[hi] - self._cum_volume[lo])
+
+    def notional(self, start, end) -> float:
+        lo, hi = self.bounds(start, end)
+        return float(self._cum_notional[hi] - self._cum_notional[lo])
+
+    def signed_volume(self, start, end) -> float:
+        """Buy-initiated minus sell-initiated volume"""
+        lo, hi = self.bounds(start, end)
+        return float(self._cum_signed[hi] - self._cum_signed[lo])
+
+    def vwap(self, start, end) -> float:
+        """Volume-weighted average price, NaN if nothing traded in the window"""
+        lo, hi = self.bounds(start, end)
+        volume = self._cum_volume[hi] - self._cum_volume[lo]
+        return float((self._cum_notional[hi] - self._cum_notional[lo]) / volume) if volume else float("nan")
+
+    def last_price(self, before=None) -> float:
+        """Price of the last trade (with loop_num < before, if given)"""
+        hi = self.n if before is None else self.bounds(before, before)[0]
+        return float(self._price[hi - 1]) if hi else float("nan")
+
+    # ===== Vectorized over many windows (offline analytics) =====
+    def _window_bounds(self, ends, window):
+        ends = np.asarray(ends, dtype=np.int64)
+        loops = self._loop[:self.n]
+        return np.searchsorted(loops, ends - window, side="left"), np.searchsorted(loops, ends, side="left")
+
+    def rolling_volume(self, ends, window) -> np.ndarray:
+        """Volume over [end - window, end) for every end"""
+        lo, hi = self._window_bounds(ends, window)
+        return self._cum_volume[hi] - self._cum_volume[lo]
+
+    def rolling_vwap(self, ends, window) -> np.ndarray:
+        """VWAP over [end - window, end) for every end (NaN where nothing traded)"""
+        lo, hi = self._window_bounds(ends, window)
+        volume = self._cum_volume[hi] - self._cum_volume[lo]
+        notional = self._cum_notional[hi] - self._cum_notional[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(volume > 0, notional / volume, np.nan)
+
+    def rolling_signed_volume(self, ends, window) -> np.ndarray:
+        lo, hi = self._window_bounds(ends, window)
+        return self._cum_signed[hi] - self._cum_signed[lo]
+
+
+class TradeTape:
+    """One TickerTape per ticker, created on first use"""
+    def __init__(self, tickers: Iterable[str] = ()):
+        self.tapes: Dict[str, TickerTape] = {ticker: TickerTape() for ticker in tickers}
+
+    def __getitem__(self, ticker) -> TickerTape:
+        tape = self.tapes.get(ticker)
+        if tape is None:
+            tape = self.tapes[ticker] = TickerTape()
+        return tape
+
+    def __contains__(self, ticker):
+        return ticker in self.tapes
+
+    def add_trades(self, trades):
+        """Appends base.Trade objects (e.g. what process_trades receives)"""
+        columns = {}
+        for trade in trades:
+            loops, prices, sizes, signs = columns.setdefault(trade.ticker, ([], [], [], []))
+            loops.append(trade.loop_num)
+            prices.append(trade.price)
+            sizes.append(trade.size)
+            signs.append(1 if trade.agg_dir == "Buy" else -1)
+        for ticker, (loops, prices, sizes, signs) in columns.items():
+            self[ticker].extend(loops, prices, sizes, signs)
+
+    @classmethod
+    def from_frame(cls, trades):
+        """Tape of a trades log DataFrame (log_trades_data.csv / .parquet columns)"""
+        tape = cls()
+        frame = trades.sort_values("timestamp", kind="stable")
+        signs = np.where(frame["side"].astype(str).str.lower().to_numpy() == "buy", 1, -1)
+        tickers = frame["ticker"].astype(str).to_numpy()
+        for ticker in np.unique(tickers):
+            rows = tickers == ticker
+            tape[ticker].extend(frame["timestamp"].to_numpy()[rows], frame["price"].to_numpy()[rows],
+                                frame["size"].to_numpy()[rows], signs[rows])
+        return tape
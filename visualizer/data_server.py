@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Local data server for the visualiser.
+
+Serves the project folder like `python -m http.server` does, plus an API that returns only the part
+of log_orderbook_data.csv the page is looking at, so the browser never has to load or filter the
+whole orderbook log:
+
+    /api/orderbook/meta                               tickers and timestamp range
+    /api/orderbook?ticker=QFIN&start=100&end=600      CSV rows for start <= timestamp < end
+    /api/orderbook/first?ticker=QFIN&start=1          {"timestamp": first one >= start with rows, or null}
+
+Slices are found with an offset index of the CSV (byte range of every (timestamp, ticker) block),
+read from the exporter's log_orderbook_data.index.json or built once per file version. Responses are
+gzipped when the browser accepts it and carry an ETag per encoding, so revisiting a slice costs a 304.
+
+    python visualizer/data_server.py [port]
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(DATA_DIR)
+ORDERBOOK_FILE = 'log_orderbook_data.csv'
+INDEX_FILE = 'log_orderbook_data.index.json'  # written by the exporter next to the CSV
+MAX_SLICE = 5000  # timestamps per request
+
+
+class OrderbookIndex:
+    """
+    Byte offsets of every (timestamp, ticker) block in the orderbook CSV. The exporter writes rows grouped
+    by timestamp and then ticker, so each block is one contiguous byte range. Uses the exporter's index
+    file when it matches the CSV, otherwise scans the CSV once.
+    """
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        self.by_ticker = {}  # ticker -> (timestamps, starts, ends), all sorted by timestamp
+
+        with open(path, 'rb') as f:
+            self.header = f.readline()
+        if not self._load_exported(stat):
+            self._scan()
+
+    def _load_exported(self, stat):
+        index_path = os.path.join(os.path.dirname(self.path), INDEX_FILE)
+        if not os.path.exists(index_path) or os.stat(index_path).st_mtime_ns < stat.st_mtime_ns:
+            return False
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get('size') != stat.st_size:
+            return False
+        for ticker, blocks in index['blocks'].items():
+            self.by_ticker[ticker] = ([block[0] for block in blocks], [block[4] for block in blocks],
+                                      [block[5] for block in blocks])
+        return True
+
+    def _scan(self):
+        with open(self.path, 'rb') as f:
+            f.readline()
+            offset = len(self.header)
+            current = None
+            block_start = offset
+            for line in f:
+                first = line.find(b',')
+                second = line.find(b',', first + 1)
+                key = (int(line[:first]), line[first + 1:second].decode())
+                if key != current:
+                    if current is not None:
+                        self._add(current, block_start, offset)
+                    current = key
+                    block_start = offset
+                offset += len(line)
+            if current is not None:
+                self._add(current, block_start, offset)
+
+    def _add(self, key, start, end):
+        timestamp, ticker = key
+        timestamps, starts, ends = self.by_ticker.setdefault(ticker, ([], [], []))
+        timestamps.append(timestamp)
+        starts.append(start)
+        ends.append(end)
+
+    def meta(self):
+        first = [entry[0][0] for entry in self.by_ticker.values() if entry[0]]
+        last = [entry[0][-1] for entry in self.by_ticker.values() if entry[0]]
+        return {
+            'tickers': sorted(self.by_ticker),
+            'first_timestamp': min(first) if first else 0,
+            'last_timestamp': max(last) if last else 0,
+            'version': self.version,
+        }
+
+    def first_timestamp(self, ticker, start=0):
+        """First timestamp >= start that has rows for ticker, None if there is none"""
+        timestamps = self.by_ticker.get(ticker, ([], [], []))[0]
+        i = bisect_left(timestamps, start)
+        return timestamps[i] if i < len(timestamps) else None
+
+    def slice(self, ticker, start, end):
+        """
+        CSV text (with header) of the rows for start <= timestamp < end. If there is no block at start,
+        the latest earlier block is included too, so logs written with changed_only can be carried forward.
+        """
+        timestamps, starts, ends = self.by_ticker.get(ticker, ([], [], []))
+        lo = bisect_left(timestamps, start)
+        hi = bisect_left(timestamps, end)
+        if lo > 0 and (lo == len(timestamps) or timestamps[lo] != start):
+            lo -= 1
+
+        chunks = [self.header]
+        with open(self.path, 'rb') as f:
+            for i in range(lo, hi):
+                f.seek(starts[i])
+                chunks.append(f.read(ends[i] - starts[i]))
+        return b''.join(chunks)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The index for the current orderbook file, rebuilt if the file was re-exported. None if there is no file"""
+    global _index
+    path = os.path.join(DATA_DIR, ORDERBOOK_FILE)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    with _index_lock:
+        if _index is None or _index.version != f"{stat.st_mtime_ns:x}-{stat.st_size:x}":
+            _index = OrderbookIndex(path)
+        return _index
+
+
+class DataRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=PROJECT_ROOT, **kwargs)
+
+    def log_message(self, format, *args):
+        pass  # the launcher runs us with output discarded anyway
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/api/orderbook/meta':
+            self._api(lambda index, query: json.dumps(index.meta()).encode(), 'application/json')
+        elif url.path == '/api/orderbook/first':
+            self._api(self._first_timestamp, 'application/json')
+        elif url.path == '/api/orderbook':
+            self._api(self._orderbook_slice, 'text/csv')
+        else:
+            super().do_GET()
+
+    def _first_timestamp(self, index, query):
+        ticker = query.get('ticker', [''])[0]
+        start = int(query.get('start', ['0'])[0])
+        return json.dumps({'timestamp': index.first_timestamp(ticker, start)}).encode()
+
+    def _orderbook_slice(self, index, query):
+        ticker = query.get('ticker', [''])[0]
+        start = int(query.get('start', ['0'])[0])
+        end = int(query.get('end', [str(start + 1)])[0])
+        end = min(end, start + MAX_SLICE)
+        return index.slice(ticker, start, end)
+
+    def _api(self, build, content_type):
+        try:
+            index = get_index()
+            if index is None:
+                self.send_error(404, f"{ORDERBOOK_FILE} not exported yet")
+                return
+            query = parse_qs(urlparse(self.path).query)
+            query.pop('_', None)  # cache busters don't change the content
+            tag = hashlib.sha1(f"{index.version}|{sorted(query.items())}|{urlparse(self.path).path}"
+                               .encode()).hexdigest()[:20]
+            accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            # each encoding is its own representation, so it gets its own ETag; a client that accepts gzip
+            # may hold either one (small bodies are sent uncompressed)
+            valid = {f'"{tag}-gz"', f'"{tag}"'} if accepts_gzip else {f'"{tag}"'}
+            cached = [etag.strip() for etag in self.headers.get('If-None-Match', '').split(',')]
+            matched = next((etag for etag in cached if etag in valid), None)
+            if matched is not None:
+                self.send_response(304)
+                self.send_header('ETag', matched)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return
+
+            body = build(index, query)
+            gzipped = accepts_gzip and len(body) > 1024
+            if gzipped:
+                body = gzip.compress(body, compresslevel=5)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"{tag}-gz"' if gzipped else f'"{tag}"')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')  # always revalidate, the ETag makes that cheap
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=8000):
+    server = ThreadingHTTPServer(('', port), DataRequestHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)